@@ -0,0 +1,111 @@
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.db import connection
+from django.http import HttpRequest, QueryDict
+from django.urls import resolve, Resolver404
+from rest_framework import permissions, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+logger = logging.getLogger(__name__)
+
+API_PREFIX = '/api/'
+BATCH_PATH = '/api/batch/'
+
+
+class BatchView(APIView):
+    """
+    Run several GET requests against the API in one round trip.
+    Request body:
+    - requests: list of relative GET paths, e.g. ["units/", "notifications/unread_count/"]
+    Authentication and the license check run once for the whole batch; each
+    sub-request is dispatched straight to its view as the same user.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        paths = request.data.get('requests')
+        if not isinstance(paths, list) or not paths:
+            return Response({'error': 'requests must be a non-empty list of paths'}, status=status.HTTP_400_BAD_REQUEST)
+
+        max_requests = getattr(settings, 'BATCH_MAX_REQUESTS', 20)
+        if len(paths) > max_requests:
+            return Response({'error': f'A batch can contain at most {max_requests} requests'}, status=status.HTTP_400_BAD_REQUEST)
+
+        max_workers = min(getattr(settings, 'BATCH_MAX_WORKERS', 4), len(paths))
+        if max_workers > 1:
+            with ThreadPoolExecutor(max_workers=max_workers) as pool:
+                results = list(pool.map(lambda path: self._dispatch_in_thread(request, path), paths))
+        else:
+            results = [self._dispatch(request, path) for path in paths]
+
+        return Response({'responses': results})
+
+    def _dispatch_in_thread(self, request, path):
+        try:
+            return self._dispatch(request, path)
+        finally:
+            # Worker threads get their own DB connection; don't leak it
+            connection.close()
+
+    def _dispatch(self, request, raw_path):
+        if not isinstance(raw_path, str) or not raw_path:
+            return {'path': raw_path, 'status': status.HTTP_400_BAD_REQUEST, 'data': {'error': 'invalid path'}}
+
+        parts = urlsplit(raw_path)
+        path = parts.path
+        if not path.startswith('/'):
+            path = API_PREFIX + path[len('api/'):] if path.startswith('api/') else API_PREFIX + path
+
+        if not path.startswith(API_PREFIX) or path.startswith(BATCH_PATH):
+            return {'path': raw_path, 'status': status.HTTP_400_BAD_REQUEST, 'data': {'error': 'path not allowed in a batch'}}
+
+        try:
+            match = resolve(path)
+        except Resolver404:
+            return {'path': raw_path, 'status': status.HTTP_404_NOT_FOUND, 'data': {'detail': 'Not found.'}}
+
+        sub_request = self._build_sub_request(request, path, parts.query, match)
+        try:
+            response = match.func(sub_request, *match.args, **match.kwargs)
+        except Exception:
+            # Same as a standalone request: log the details, don't send them to the client
+            logger.exception('Batch sub-request %s failed', path)
+            return {'path': raw_path, 'status': status.HTTP_500_INTERNAL_SERVER_ERROR,
+                    'data': {'error': 'Internal server error'}}
+
+        return {'path': raw_path, 'status': response.status_code, 'data': self._response_data(response)}
+
+    def _build_sub_request(self, request, path, query, match):
+        outer = request._request
+        sub_request = HttpRequest()
+        sub_request.method = 'GET'
+        sub_request.path = sub_request.path_info = path
+        sub_request.META = {
+            key: value for key, value in outer.META.items()
+            if key not in ('CONTENT_TYPE', 'CONTENT_LENGTH', 'wsgi.input')
+        }
+        sub_request.META.update({'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': query})
+        sub_request.GET = QueryDict(query)
+        sub_request.resolver_match = match
+        # Reuse the already authenticated user instead of re-validating the JWT
+        sub_request.user = request.user
+        sub_request._force_auth_user = request.user
+        sub_request._force_auth_token = request.auth
+        return sub_request
+
+    def _response_data(self, response):
+        if hasattr(response, 'data'):
+            return response.data
+        if getattr(response, 'streaming', False):
+            content = b''.join(response.streaming_content)
+        else:
+            content = response.content
+        try:
+            return json.loads(content or b'null')
+        except ValueError:
+            return content.decode('utf-8', errors='replace')
@@ -0,0 +1,54 @@
+from django.conf import settings
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+from core.models import AVAILABILITY_STATES, availability_rank_expression
+
+
+class IdsFilterBackend(BaseFilterBackend):
+    """
+    Multi-id fetch for list endpoints: ?ids=1,2,3 narrows get_queryset()
+    to those primary keys in the same query, so visibility rules still apply.
+    """
+    param = 'ids'
+
+    def filter_queryset(self, request, queryset, view):
+        raw = request.query_params.get(self.param)
+        if raw is None or getattr(view, 'detail', False):
+            return queryset
+
+        try:
+            ids = {int(part) for part in raw.split(',') if part.strip()}
+        except ValueError:
+            raise ValidationError({self.param: 'Expected a comma-separated list of integer ids.'})
+
+        max_ids = getattr(settings, 'IDS_FILTER_MAX', 100)
+        if len(ids) > max_ids:
+            raise ValidationError({self.param: f'At most {max_ids} ids can be requested at once.'})
+
+        return queryset.filter(pk__in=ids)
+
+
+class AvailabilityFilterBackend(BaseFilterBackend):
+    """
+    ?availability=open,late keeps assessments in those window states and
+    ?ordering=availability sorts by state; both run on the queryset's
+    `annotated_availability` annotation, so the database does the work.
+    """
+    param = 'availability'
+
+    def filter_queryset(self, request, queryset, view):
+        if getattr(view, 'detail', False):
+            return queryset
+
+        raw = request.query_params.get(self.param)
+        if raw:
+            states = {part.strip() for part in raw.split(',') if part.strip()}
+            unknown = states.difference(AVAILABILITY_STATES)
+            if unknown:
+                raise ValidationError({self.param: f'Expected any of {", ".join(AVAILABILITY_STATES)}.'})
+            queryset = queryset.filter(annotated_availability__in=states)
+
+        if request.query_params.get('ordering') == self.param:
+            queryset = queryset.order_by(availability_rank_expression(), 'scheduled_start', 'id')
+        return queryset
@@ -1,9 +1,19 @@
-from rest_framework import viewsets, permissions
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from core.models import Question, QuestionOption, Answer, StudentAnswer
+from core.models import Question, QuestionOption, Answer, StudentAnswer, Submission, Assessment
+from core.utils.answer_clusters import CLUSTERED_TYPES, cluster_answers
+from core.utils.drafts import draft_buffer, load_drafts, merge_drafts, discard_drafts
+from core.utils.grading import apply_manual_grades, get_answer_key, grade_submission, resolve_answers
+from core.utils.similarity import schedule_fingerprint
+from core.utils.question_import import FORMATS, QuestionImportError, parse_questions, import_questions
+from core.utils.scopes import student_course_group_ids
+from core.utils.variants import allowed_question_ids
 from .serializers import QuestionSerializer, QuestionOptionSerializer, AnswerSerializer, StudentAnswerSerializer
-from .permissions import IsTrainer
+from .permissions import IsTrainer, IsStudent
 
 class QuestionViewSet(viewsets.ModelViewSet):
     queryset = Question.objects.all()
@@ -17,10 +27,127 @@ class QuestionViewSet(viewsets.ModelViewSet):
         return queryset
     
     def get_permissions(self):
+        if self.action in ['answer_clusters', 'grade_cluster']:
+            return [IsTrainer()]
         if self.request.method in permissions.SAFE_METHODS:
             return [permissions.IsAuthenticated()]
         return [IsTrainer()]
 
+    def _gradable_question(self, request):
+        """The question for a cluster action, or an error Response."""
+        question = self.get_object()
+        if question.question_type not in CLUSTERED_TYPES:
+            return None, Response({'error': f'Only {", ".join(CLUSTERED_TYPES)} answers are clustered'}, status=status.HTTP_400_BAD_REQUEST)
+        if request.user.role == 'Trainer' and question.assessment.unit.trainer_id != request.user.id:
+            return None, Response({'error': 'Question not found'}, status=status.HTTP_404_NOT_FOUND)
+        return question, None
+
+    @action(detail=True, methods=['get'])
+    def answer_clusters(self, request, pk=None):
+        """
+        Students' answers to a free-text question grouped by normalized text,
+        so each distinct answer is graded once. ?threshold=0.8 also merges
+        answers that are at least that similar (0-1).
+        """
+        question, error = self._gradable_question(request)
+        if error:
+            return error
+        try:
+            threshold = float(request.query_params.get('threshold') or 1)
+        except ValueError:
+            threshold = -1
+        if not 0 < threshold <= 1:
+            return Response({'error': 'threshold must be a number above 0 and at most 1'}, status=status.HTTP_400_BAD_REQUEST)
+        clusters = cluster_answers(question, threshold)
+        return Response({'question': question.id, 'points': question.points, 'threshold': threshold, 'clusters': clusters})
+
+    @action(detail=True, methods=['post'])
+    def grade_cluster(self, request, pk=None):
+        """
+        Give every answer of a cluster the same mark and feedback:
+        {"answer_ids": [...], "points_earned": 2, "feedback": "..."}. The
+        answers are written in one bulk update and the affected submission
+        totals are recomputed together.
+        """
+        question, error = self._gradable_question(request)
+        if error:
+            return error
+        answer_ids = request.data.get('answer_ids')
+        if not isinstance(answer_ids, list) or not answer_ids:
+            return Response({'error': 'answer_ids must be a non-empty list'}, status=status.HTTP_400_BAD_REQUEST)
+        answer_ids = set(answer_ids)
+        if StudentAnswer.objects.filter(id__in=[i for i in answer_ids if str(i).isdigit()], question=question).count() != len(answer_ids):
+            return Response({'error': 'Every answer must belong to this question'}, status=status.HTTP_400_BAD_REQUEST)
+
+        grade = {'points_earned': request.data.get('points_earned')}
+        if 'feedback' in request.data:
+            grade['feedback'] = request.data['feedback']
+        try:
+            graded = apply_manual_grades(
+                [{'answer_id': answer_id, **grade} for answer_id in answer_ids],
+                assessment_id=question.assessment_id,
+                trainer_id=request.user.id if request.user.role == 'Trainer' else None
+            )
+        except ValidationError as e:
+            # Every row carries the same mark, so one message is enough
+            return Response({'error': e.messages[:1]}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'graded_answers': len(answer_ids), 'graded_submissions': len(graded)})
+
+    @action(detail=False, methods=['post'], url_path='import')
+    def import_questions(self, request):
+        """
+        Create a whole paper in one request.
+        Body: assessment, format (json, csv or gift) and either `questions`
+        (a JSON list) or the CSV/GIFT text as `content` or an uploaded `file`.
+        Nothing is created unless every row is valid.
+        """
+        assessment_id = request.data.get('assessment')
+        assessment = (Assessment.objects.filter(id=assessment_id).select_related('unit').first()
+                      if str(assessment_id).isdigit() else None)
+        # Trainers only write papers of their own units
+        if assessment is None or (request.user.role == 'Trainer' and assessment.unit.trainer_id != request.user.id):
+            return Response({'error': 'Assessment not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        upload = request.FILES.get('file')
+        import_format = (request.data.get('format') or '').lower()
+        if not import_format:
+            if 'questions' in request.data:
+                import_format = 'json'
+            elif upload and upload.name.lower().endswith('.csv'):
+                import_format = 'csv'
+            else:
+                import_format = 'gift'
+        if import_format not in FORMATS:
+            return Response({'error': f'format must be one of {", ".join(FORMATS)}'}, status=status.HTTP_400_BAD_REQUEST)
+
+        if import_format == 'json':
+            content = request.data.get('questions')
+        elif upload:
+            try:
+                content = upload.read().decode('utf-8-sig')
+            except UnicodeDecodeError:
+                return Response({'error': 'File must be UTF-8 text'}, status=status.HTTP_400_BAD_REQUEST)
+        else:
+            content = request.data.get('content') or ''
+
+        try:
+            rows = parse_questions(content, import_format)
+            max_rows = getattr(settings, 'QUESTION_IMPORT_MAX', 500)
+            if len(rows) > max_rows:
+                return Response({'error': f'An import can contain at most {max_rows} questions'}, status=status.HTTP_400_BAD_REQUEST)
+            if not rows:
+                return Response({'error': 'No questions found'}, status=status.HTTP_400_BAD_REQUEST)
+            questions = import_questions(assessment, rows)
+        except QuestionImportError as e:
+            return Response({'errors': e.errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        created = (Question.objects.filter(id__in=[q.id for q in questions])
+                   .prefetch_related('options', 'correct_answers'))
+        return Response({
+            'created': len(questions),
+            'questions': self.get_serializer(created, many=True).data
+        }, status=status.HTTP_201_CREATED)
+
 class QuestionOptionViewSet(viewsets.ModelViewSet):
     queryset = QuestionOption.objects.all()
     serializer_class = QuestionOptionSerializer
@@ -65,58 +192,90 @@ class StudentAnswerViewSet(viewsets.ModelViewSet):
         return queryset
     
     def get_permissions(self):
+        if self.action in ['autosave', 'drafts']:
+            return [IsStudent()]
         return [permissions.IsAuthenticated()]
-    
+
+    def _student_assessment(self, request, assessment_id):
+        """An approved, active assessment in one of the student's course groups, or None."""
+        if not str(assessment_id).isdigit():
+            return None
+        return Assessment.objects.filter(
+            id=assessment_id,
+            is_approved=True,
+            is_active=True,
+            unit__course_group_id__in=student_course_group_ids(request.user.id)
+        ).first()
+
+    @action(detail=False, methods=['post'])
+    def autosave(self, request):
+        """
+        Save in-progress answers for an open assessment. Send as often as you
+        like: only the latest answer per question is kept and drafts reach the
+        database in batches. Body: {assessment_id, answers: [{question_id, selected_option_id, answer_text}]}
+        """
+        assessment = self._student_assessment(request, request.data.get('assessment_id'))
+        if assessment is None:
+            return Response({'error': 'Assessment not found'}, status=status.HTTP_404_NOT_FOUND)
+        if not assessment.can_submit():
+            return Response({'error': 'This assessment is not open for answers'}, status=status.HTTP_400_BAD_REQUEST)
+
+        answers = request.data.get('answers', [])
+        if not isinstance(answers, list):
+            return Response({'error': 'answers must be a list'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            key = get_answer_key(assessment.id)
+            allowed_ids = allowed_question_ids(assessment, request.user.id, key.question_order)
+            resolved = resolve_answers(answers, key, allowed_ids)
+        except ValidationError as e:
+            return Response({'error': e.messages}, status=status.HTTP_400_BAD_REQUEST)
+
+        draft_buffer.put(request.user.id, assessment.id, resolved)
+        return Response({'saved': len(resolved)}, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=False, methods=['get'])
+    def drafts(self, request):
+        """The student's latest autosaved answers for ?assessment=<id>"""
+        assessment = self._student_assessment(request, request.query_params.get('assessment'))
+        if assessment is None:
+            return Response({'error': 'Assessment not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        drafts = load_drafts(request.user.id, assessment.id)
+        return Response([
+            {
+                'question_id': draft.question_id,
+                'selected_option_id': draft.selected_option_id,
+                'answer_text': draft.answer_text,
+                'saved_at': draft.saved_at,
+            }
+            for draft in sorted(drafts.values(), key=lambda d: d.question_id)
+        ])
+
     @action(detail=False, methods=['post'])
     def submit_answers(self, request):
-        """Bulk create student answers and auto-grade MCQ/TF"""
+        """Bulk create student answers and auto-grade MCQ/TF/SHORT/FILL"""
         submission_id = request.data.get('submission_id')
         answers = request.data.get('answers', [])
-        
-        created_answers = []
-        auto_grade_score = 0
-        
-        for answer_data in answers:
-            question_id = answer_data.get('question_id')
-            question = Question.objects.get(id=question_id)
-            
-            student_answer = StudentAnswer.objects.create(
-                submission_id=submission_id,
-                question_id=question_id,
-                selected_option_id=answer_data.get('selected_option_id'),
-                answer_text=answer_data.get('answer_text', '')
-            )
-            
-            # Auto-grade MCQ and TF
-            if question.question_type == 'MCQ' and student_answer.selected_option:
-                student_answer.is_correct = student_answer.selected_option.is_correct
-                if student_answer.is_correct:
-                    student_answer.points_earned = question.points
-                    auto_grade_score += question.points
-                else:
-                    student_answer.points_earned = 0
-                student_answer.save()
-            
-            elif question.question_type == 'TF':
-                correct_answer = Answer.objects.filter(question=question).first()
-                if correct_answer:
-                    is_true = student_answer.answer_text.lower() == 'true'
-                    student_answer.is_correct = (is_true == correct_answer.is_correct_for_tf)
-                    if student_answer.is_correct:
-                        student_answer.points_earned = question.points
-                        auto_grade_score += question.points
-                    else:
-                        student_answer.points_earned = 0
-                    student_answer.save()
-            
-            created_answers.append(student_answer)
-        
-        # Update submission with auto-graded score
-        from core.models import Submission
-        submission = Submission.objects.get(id=submission_id)
-        submission.auto_graded_score = auto_grade_score
-        submission.save()
-        
+        if not isinstance(answers, list):
+            return Response({'error': 'answers must be a list'}, status=status.HTTP_400_BAD_REQUEST)
+
+        submission = None
+        if str(submission_id).isdigit():
+            submission = (Submission.objects.filter(id=submission_id, student=request.user)
+                          .select_related('assessment').first())
+        if submission is None:
+            return Response({'error': 'Submission not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        # Autosaved answers the client didn't resend are graded too
+        answers = merge_drafts(request.user.id, submission.assessment, answers)
+        try:
+            with transaction.atomic():
+                created_answers, auto_grade_score = grade_submission(submission, answers)
+                discard_drafts(request.user.id, submission.assessment_id)
+        except ValidationError as e:
+            return Response({'error': e.messages}, status=status.HTTP_400_BAD_REQUEST)
+        schedule_fingerprint(submission.id)
+
         serializer = self.get_serializer(created_answers, many=True)
         return Response({
             'answers': serializer.data,
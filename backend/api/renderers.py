@@ -0,0 +1,30 @@
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+_json_encoder = JSONEncoder()
+
+
+def encode_msgpack_default(obj):
+    """Fallback for types msgpack can't pack (dates, decimals, UUIDs...), same rules as JSON."""
+    return _json_encoder.default(obj)
+
+
+class MessagePackRenderer(BaseRenderer):
+    """
+    Compact binary alternative to JSON for mobile clients.
+    Selected with Accept: application/msgpack (or ?format=msgpack); JSON stays the default.
+    """
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=encode_msgpack_default, use_bin_type=True)
@@ -1,10 +1,14 @@
 import rest_framework
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
+from django.db import transaction
 from core.models import (School, Course, Intake, Semester, CourseGroup, Unit, Lesson, LessonPlanActivity, Resource, 
                           Assessment, Submission, Attendance, StudentEnrollment, Module, LearningPath,
                           Question, QuestionOption, Answer, StudentAnswer, Announcement, ForumTopic, 
-                          ForumMessage, Notification, StudentResourceProgress, StudentAssessmentProgress)
+                          ForumMessage, Notification, StudentResourceProgress, StudentAssessmentProgress, RegradeJob,
+                          assessment_availability, assessment_window_flags)
+from core.utils.grading import answer_key_errors
+from core.utils.papers import invalidate_paper
 
 User = get_user_model()
 
@@ -183,9 +187,22 @@ class AnswerSerializer(serializers.ModelSerializer):
         fields = '__all__'
         extra_kwargs = {'question': {'required': False}}
 
+    def validate_answer_text(self, value):
+        errors = answer_key_errors(value)
+        if errors:
+            raise serializers.ValidationError(errors)
+        return value
+
+class NestedQuestionOptionSerializer(QuestionOptionSerializer):
+    """Option nested in a question; `id` is writable so edits can match existing rows."""
+    id = serializers.IntegerField(required=False)
+
+class NestedAnswerSerializer(AnswerSerializer):
+    id = serializers.IntegerField(required=False)
+
 class QuestionSerializer(serializers.ModelSerializer):
-    options = QuestionOptionSerializer(many=True, required=False)
-    correct_answers = AnswerSerializer(many=True, required=False)
+    options = NestedQuestionOptionSerializer(many=True, required=False)
+    correct_answers = NestedAnswerSerializer(many=True, required=False)
     
     class Meta:
         model = Question
@@ -194,39 +211,85 @@ class QuestionSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         options_data = validated_data.pop('options', [])
         answers_data = validated_data.pop('correct_answers', [])
-        
-        question = Question.objects.create(**validated_data)
-        
-        for option in options_data:
-            QuestionOption.objects.create(question=question, **option)
-            
-        for answer in answers_data:
-            Answer.objects.create(question=question, **answer)
-            
+
+        with transaction.atomic():
+            question = Question.objects.create(**validated_data)
+            QuestionOption.objects.bulk_create([
+                QuestionOption(question=question, **self._child_fields(option)) for option in options_data
+            ])
+            Answer.objects.bulk_create([
+                Answer(question=question, **self._child_fields(answer)) for answer in answers_data
+            ])
+        # Bulk writes don't send the signals that keep the paper fresh
+        invalidate_paper(question.assessment_id)
         return question
 
     def update(self, instance, validated_data):
-        options_data = validated_data.pop('options', [])
-        answers_data = validated_data.pop('correct_answers', [])
-        
-        for attr, value in validated_data.items():
-            setattr(instance, attr, value)
-        instance.save()
-        
-        instance.options.all().delete()
-        for option in options_data:
-            QuestionOption.objects.create(question=instance, **option)
-            
-        instance.correct_answers.all().delete()
-        for answer in answers_data:
-            Answer.objects.create(question=instance, **answer)
-            
+        """
+        Options and answers are matched by id: changed rows are bulk-updated,
+        rows without an id are created and rows left out are deleted, so
+        unchanged options keep their ids (and the student answers that point
+        at them). Omitting `options` or `correct_answers` leaves them as they are.
+        """
+        options_data = validated_data.pop('options', None)
+        answers_data = validated_data.pop('correct_answers', None)
+
+        with transaction.atomic():
+            for attr, value in validated_data.items():
+                setattr(instance, attr, value)
+            instance.save()
+
+            if options_data is not None:
+                self._sync_children(instance, QuestionOption, instance.options.all(), options_data, 'options')
+            if answers_data is not None:
+                self._sync_children(instance, Answer, instance.correct_answers.all(), answers_data, 'correct_answers')
+
+        if options_data is not None or answers_data is not None:
+            invalidate_paper(instance.assessment_id)
         return instance
 
+    def _child_fields(self, data):
+        return {key: value for key, value in data.items() if key not in ('id', 'question')}
+
+    def _sync_children(self, question, model, queryset, items, field_name):
+        existing = {obj.id: obj for obj in queryset}
+        unknown = [item['id'] for item in items if item.get('id') is not None and item['id'] not in existing]
+        if unknown:
+            raise serializers.ValidationError({
+                field_name: [f'{model._meta.verbose_name} {obj_id} does not belong to this question' for obj_id in unknown]
+            })
+
+        to_create = []
+        to_update = []
+        changed_fields = set()
+        kept = set()
+        for item in items:
+            fields = self._child_fields(item)
+            obj = existing.get(item.get('id'))
+            if obj is None:
+                to_create.append(model(question=question, **fields))
+                continue
+            kept.add(obj.id)
+            changed = [attr for attr, value in fields.items() if getattr(obj, attr) != value]
+            for attr in changed:
+                setattr(obj, attr, fields[attr])
+            if changed:
+                to_update.append(obj)
+                changed_fields.update(changed)
+
+        removed = [obj_id for obj_id in existing if obj_id not in kept]
+        if removed:
+            model.objects.filter(id__in=removed).delete()
+        if to_update:
+            model.objects.bulk_update(to_update, sorted(changed_fields))
+        if to_create:
+            model.objects.bulk_create(to_create)
+
 class AssessmentSerializer(serializers.ModelSerializer):
     unit_name = serializers.ReadOnlyField(source='unit.name')
     questions = QuestionSerializer(many=True, read_only=True)
     question_count = serializers.SerializerMethodField()
+    availability = serializers.SerializerMethodField()
     is_available = serializers.SerializerMethodField()
     is_expired = serializers.SerializerMethodField()
     can_submit = serializers.SerializerMethodField()
@@ -238,16 +301,24 @@ class AssessmentSerializer(serializers.ModelSerializer):
         read_only_fields = ['created_at', 'updated_at']
     
     def get_question_count(self, obj):
-        return obj.questions.count()
+        val = getattr(obj, 'annotated_question_count', None)
+        return val if val is not None else obj.questions.count()
+
+    def get_availability(self, obj):
+        val = getattr(obj, 'annotated_availability', None)
+        return val if val is not None else assessment_availability(obj)
+
+    def _window_flags(self, obj):
+        return assessment_window_flags(obj, availability=self.get_availability(obj))
     
     def get_is_available(self, obj):
-        return obj.is_available()
+        return self._window_flags(obj)[0]
     
     def get_is_expired(self, obj):
-        return obj.is_expired()
+        return self._window_flags(obj)[1]
     
     def get_can_submit(self, obj):
-        return obj.can_submit()
+        return self._window_flags(obj)[2]
 
     def get_is_completed(self, obj):
         request = self.context.get('request')
@@ -255,6 +326,13 @@ class AssessmentSerializer(serializers.ModelSerializer):
             return obj.student_progress.filter(student=request.user, is_completed=True).exists()
         return False
 
+class StudentAssessmentSerializer(AssessmentSerializer):
+    """
+    Assessments as students see them: no nested questions (and so no answer
+    keys); the detail view adds them from the precompiled paper instead.
+    """
+    questions = None
+
 class UnitListSerializer(serializers.ModelSerializer):
     course_group_name = serializers.ReadOnlyField(source='course_group.course.name')
     course_group_code = serializers.ReadOnlyField(source='course_group.group_display_code')
@@ -398,6 +476,10 @@ class UnitSerializer(serializers.ModelSerializer):
             return round((completed / total) * 100)
         return 0
 
+class StudentUnitSerializer(UnitSerializer):
+    """Unit detail for students; its assessments come without questions or answer keys."""
+    assessments = StudentAssessmentSerializer(many=True, read_only=True)
+
 class StudentAnswerSerializer(serializers.ModelSerializer):
     question_text = serializers.ReadOnlyField(source='question.question_text')
     question_type = serializers.ReadOnlyField(source='question.question_type')
@@ -432,6 +514,33 @@ class SubmissionSerializer(serializers.ModelSerializer):
             return "Unknown Assessment"
         return f"{obj.assessment.assessment_type}: {obj.assessment.title}"
 
+class SubmissionListSerializer(SubmissionSerializer):
+    """Submission row for lists: status, grade and student, without the answers."""
+    status = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Submission
+        fields = [
+            'id', 'assessment', 'assessment_name', 'assessment_title', 'assessment_type', 'student', 'student_name',
+            'student_email', 'file', 'grade', 'auto_graded_score', 'total_points', 'feedback', 'submitted_at',
+            'is_graded', 'is_late', 'is_zero_graded', 'status',
+        ]
+        read_only_fields = fields
+
+    def get_status(self, obj):
+        if obj.is_graded:
+            return 'graded'
+        return 'late' if obj.is_late else 'submitted'
+
+class RegradeJobSerializer(serializers.ModelSerializer):
+    assessment_title = serializers.ReadOnlyField(source='assessment.title')
+    requested_by_name = serializers.ReadOnlyField(source='requested_by.username')
+
+    class Meta:
+        model = RegradeJob
+        fields = '__all__'
+        read_only_fields = [f.name for f in RegradeJob._meta.fields]
+
 class AttendanceSerializer(serializers.ModelSerializer):
     student_name = serializers.ReadOnlyField(source='student.username')
     lesson_title = serializers.ReadOnlyField(source='lesson.title')
@@ -0,0 +1,66 @@
+import json
+
+from django.http import StreamingHttpResponse
+from rest_framework.utils.encoders import JSONEncoder
+
+# Rows fetched from the database and serialized per round trip when streaming.
+STREAM_CHUNK_SIZE = 500
+
+
+def wants_stream(request):
+    """True when the client asked for a streamed list with ?stream=true."""
+    return request.query_params.get('stream', '').lower() in ('1', 'true', 'yes')
+
+
+def _encode_chunk(serializer_class, rows, context):
+    data = serializer_class(rows, many=True, context=context).data
+    # Drop the surrounding brackets so chunks can be joined into one array
+    return json.dumps(data, cls=JSONEncoder, ensure_ascii=False)[1:-1]
+
+
+def iter_json_array(queryset, serializer_class, context, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Yield a JSON array for a queryset piece by piece.
+    Rows are read with .iterator(chunk_size=...) (prefetches run per chunk),
+    so only one chunk of model instances is held in memory at a time.
+    """
+    yield '['
+    first = True
+    rows = []
+    for obj in queryset.iterator(chunk_size=chunk_size):
+        rows.append(obj)
+        if len(rows) >= chunk_size:
+            yield ('' if first else ',') + _encode_chunk(serializer_class, rows, context)
+            first = False
+            rows = []
+    if rows:
+        yield ('' if first else ',') + _encode_chunk(serializer_class, rows, context)
+    yield ']'
+
+
+def streaming_json_response(queryset, serializer_class, context, chunk_size=STREAM_CHUNK_SIZE):
+    return StreamingHttpResponse(
+        iter_json_array(queryset, serializer_class, context, chunk_size),
+        content_type='application/json'
+    )
+
+
+class StreamingListMixin:
+    """
+    Adds a streaming mode to list(): ?stream=true writes the filtered queryset
+    through a StreamingHttpResponse instead of building the full list in memory.
+    """
+    stream_chunk_size = STREAM_CHUNK_SIZE
+
+    def stream_queryset(self, queryset, serializer_class=None):
+        return streaming_json_response(
+            queryset,
+            serializer_class or self.get_serializer_class(),
+            self.get_serializer_context(),
+            self.stream_chunk_size
+        )
+
+    def list(self, request, *args, **kwargs):
+        if wants_stream(request):
+            return self.stream_queryset(self.filter_queryset(self.get_queryset()))
+        return super().list(request, *args, **kwargs)
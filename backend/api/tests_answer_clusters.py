@@ -0,0 +1,104 @@
+from unittest import mock
+
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+from core.utils import answer_clusters
+from core.utils.answer_clusters import cluster_answers
+from core.models import Assessment, Question, StudentAnswer, Submission
+from core.testing import create_user, create_course_group, create_unit
+
+
+class AnswerClusterTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.trainer = create_user('trainer', 'Trainer')
+
+        course_group = create_course_group()
+        self.unit = create_unit(course_group, trainer=self.trainer)
+        self.assessment = Assessment.objects.create(
+            unit=self.unit, assessment_type='CAT', title='CAT 1', points=10,
+            due_date=timezone.now(), is_approved=True
+        )
+        self.question = Question.objects.create(assessment=self.assessment, question_text='Capital of Kenya?',
+                                                question_type='SHORT', points=2, order=1)
+
+        self.answers = {}
+        for i, text in enumerate(['Nairobi', 'nairobi.', '  NAIROBI ', 'Nairobbi', 'Mombasa']):
+            student = create_user(f'student{i}')
+            submission = Submission.objects.create(assessment=self.assessment, student=student)
+            self.answers[text] = StudentAnswer.objects.create(submission=submission, question=self.question, answer_text=text)
+        self.client.force_authenticate(user=self.trainer)
+
+    def url(self, action):
+        return f'/api/questions/{self.question.id}/{action}/'
+
+    def test_identical_answers_share_a_cluster(self):
+        response = self.client.get(self.url('answer_clusters'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([c['size'] for c in response.data['clusters']], [3, 1, 1])
+        self.assertEqual(response.data['clusters'][0]['text'], 'Nairobi')
+        self.assertIsNone(response.data['clusters'][0]['points_earned'])
+
+    def test_threshold_merges_near_duplicates(self):
+        response = self.client.get(self.url('answer_clusters'), {'threshold': '0.8'})
+        clusters = response.data['clusters']
+        self.assertEqual([(c['size'], c['variants']) for c in clusters], [(4, 2), (1, 1)])
+
+        response = self.client.get(self.url('answer_clusters'), {'threshold': '2'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_long_answers_are_signed_once(self):
+        essay = ' '.join(f'word{i}' for i in range(60))
+        for i in range(6):
+            student = create_user(f'writer{i}')
+            submission = Submission.objects.create(assessment=self.assessment, student=student)
+            StudentAnswer.objects.create(submission=submission, question=self.question, answer_text=f'{essay} extra{i}')
+
+        with mock.patch.object(answer_clusters, 'minhash_signature', wraps=answer_clusters.minhash_signature) as signer:
+            clusters = cluster_answers(self.question, threshold=0.8)
+        self.assertEqual(signer.call_count, 6)
+        self.assertIn((6, 6), [(c['size'], c['variants']) for c in clusters])
+
+    def test_grade_cluster_marks_every_answer(self):
+        ids = [answer['id'] for answer in self.client.get(self.url('answer_clusters')).data['clusters'][0]['answers']]
+        response = self.client.post(self.url('grade_cluster'), {
+            'answer_ids': ids, 'points_earned': 2, 'feedback': 'Correct'
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {'graded_answers': 3, 'graded_submissions': 3})
+
+        for answer in StudentAnswer.objects.filter(id__in=ids).select_related('submission'):
+            self.assertEqual(answer.points_earned, 2)
+            self.assertEqual(answer.feedback, 'Correct')
+            self.assertEqual(answer.submission.grade, 2)
+            self.assertTrue(answer.submission.is_graded)
+        self.assertEqual(self.client.get(self.url('answer_clusters')).data['clusters'][0]['points_earned'], 2)
+
+    def test_grade_cluster_rejects_foreign_answers_and_bad_marks(self):
+        other = Question.objects.create(assessment=self.assessment, question_text='Explain', question_type='ESSAY', points=5, order=2)
+        foreign = StudentAnswer.objects.create(submission=self.answers['Mombasa'].submission, question=other, answer_text='x')
+        response = self.client.post(self.url('grade_cluster'), {
+            'answer_ids': [self.answers['Nairobi'].id, foreign.id], 'points_earned': 1
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.post(self.url('grade_cluster'), {
+            'answer_ids': [self.answers['Nairobi'].id], 'points_earned': 3
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIsNone(StudentAnswer.objects.get(pk=self.answers['Nairobi'].id).points_earned)
+
+    def test_only_the_unit_trainer_and_free_text_questions(self):
+        other = create_user('other', 'Trainer')
+        self.client.force_authenticate(user=other)
+        self.assertEqual(self.client.get(self.url('answer_clusters')).status_code, status.HTTP_404_NOT_FOUND)
+
+        self.client.force_authenticate(user=self.answers['Nairobi'].submission.student)
+        self.assertEqual(self.client.get(self.url('answer_clusters')).status_code, status.HTTP_403_FORBIDDEN)
+
+        self.client.force_authenticate(user=self.trainer)
+        self.question.question_type = 'MCQ'
+        self.question.save()
+        self.assertEqual(self.client.get(self.url('answer_clusters')).status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,189 @@
+from unittest import mock
+
+from django.db import OperationalError
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from rest_framework import status
+from core.models import Lesson, StudentEnrollment, Attendance, Assessment
+from core.utils.attendance import attendance_buffer
+from core.testing import create_user, create_course_group, create_unit
+
+
+class AttendanceTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.trainer = create_user('trainer', 'Trainer')
+
+        self.course_group = create_course_group()
+        self.unit = create_unit(self.course_group, trainer=self.trainer)
+        self.lesson = Lesson.objects.create(unit=self.unit, title='Lesson 1', order=1)
+
+        self.students = []
+        for i in range(3):
+            student = create_user(f'student{i}')
+            StudentEnrollment.objects.create(student=student, course_group=self.course_group)
+            self.students.append(student)
+        self.client.force_authenticate(user=self.trainer)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class BulkAttendanceTests(AttendanceTestCase):
+    def test_bulk_mark_upserts_and_returns_rows(self):
+        Attendance.objects.create(lesson=self.lesson, student=self.students[0], status='Absent')
+        records = [{'lesson': self.lesson.id, 'student': s.id, 'status': 'Late'} for s in self.students]
+        response = self.client.post('/api/attendance/bulk_mark/', {'records': records}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([row['student_name'] for row in response.data], ['student0', 'student1', 'student2'])
+        self.assertEqual({row['status'] for row in response.data}, {'Late'})
+        self.assertEqual(response.data[0]['marked_by_name'], 'trainer')
+        self.assertEqual(Attendance.objects.filter(lesson=self.lesson, status='Late').count(), 3)
+
+    def test_bulk_mark_rejects_bad_rows(self):
+        response = self.client.post('/api/attendance/bulk_mark/', {'records': [
+            {'lesson': self.lesson.id, 'student': self.students[0].id, 'status': 'Asleep'},
+            {'lesson': self.lesson.id, 'student': 999999},
+        ]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(len(response.data['error']), 2)
+        self.assertFalse(Attendance.objects.exists())
+
+    def test_bulk_auto_mark_query_count_does_not_grow_with_the_class(self):
+        self.client.post('/api/attendance/bulk_auto_mark/', {'lesson_id': self.lesson.id}, format='json')
+        for i in range(3, 40):
+            student = create_user(f'student{i}')
+            StudentEnrollment.objects.create(student=student, course_group=self.course_group)
+
+        # lesson, class list, one upsert, one joined read back
+        with self.assertNumQueries(4):
+            response = self.client.post('/api/attendance/bulk_auto_mark/', {'lesson_id': self.lesson.id}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data), 40)
+        self.assertEqual(Attendance.objects.filter(lesson=self.lesson, status='Present').count(), 40)
+
+    def test_students_cannot_bulk_mark(self):
+        self.client.force_authenticate(user=self.students[0])
+        response = self.client.post('/api/attendance/bulk_auto_mark/', {'lesson_id': self.lesson.id}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class AttendanceMatrixTests(AttendanceTestCase):
+    def setUp(self):
+        super().setUp()
+        self.lesson2 = Lesson.objects.create(unit=self.unit, title='Lesson 2', order=2)
+        self.lesson3 = Lesson.objects.create(unit=self.unit, title='Lesson 3', order=3)
+        Attendance.objects.create(lesson=self.lesson, student=self.students[0], status='Present')
+        Attendance.objects.create(lesson=self.lesson, student=self.students[1], status='Late')
+        Attendance.objects.create(lesson=self.lesson2, student=self.students[0], status='Present')
+        self.url = f'/api/units/{self.unit.id}/attendance/'
+
+    def test_matrix_and_percentages(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['held_lessons'], 2)
+        self.assertEqual([lesson['held'] for lesson in response.data['lessons']], [True, True, False])
+        rows = {row['username']: row for row in response.data['students']}
+        self.assertEqual(rows['student0']['statuses'], ['Present', 'Present', None])
+        self.assertEqual(rows['student1']['statuses'], ['Late', 'Absent', None])
+        self.assertEqual([rows[f'student{i}']['percentage'] for i in range(3)], [100.0, 50.0, 0.0])
+
+    def test_cached_until_a_new_mark(self):
+        self.client.get(self.url)
+        # Only the unit lookup; the matrix comes from the cache
+        with self.assertNumQueries(1):
+            self.client.get(self.url)
+
+        self.client.post('/api/attendance/bulk_mark/', {'records': [
+            {'lesson': self.lesson2.id, 'student': self.students[1].id, 'status': 'Present'}
+        ]}, format='json')
+        rows = {row['username']: row for row in self.client.get(self.url).data['students']}
+        self.assertEqual(rows['student1']['percentage'], 100.0)
+
+        Attendance.objects.create(lesson=self.lesson3, student=self.students[2], status='Present')
+        response = self.client.get(self.url)
+        self.assertEqual(response.data['held_lessons'], 3)
+
+    def test_threshold_and_csv_export(self):
+        response = self.client.get(self.url, {'threshold': '75'})
+        self.assertEqual([row['username'] for row in response.data['students']], ['student1', 'student2'])
+
+        response = self.client.get(self.url, {'export': 'csv', 'threshold': '75'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'Username,Name,1. Lesson 1,2. Lesson 2,3. Lesson 3,Present,Late,Absent,Attendance %')
+        self.assertEqual(lines[1], 'student1,student1,Late,Absent,,0,1,1,50.0')
+        self.assertEqual(len(lines), 3)
+
+    def test_students_cannot_read_the_matrix(self):
+        self.client.force_authenticate(user=self.students[0])
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_403_FORBIDDEN)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+                   ATTENDANCE_FLUSH_INTERVAL=3600)
+class AutoAttendanceTests(AttendanceTestCase):
+    def setUp(self):
+        super().setUp()
+        attendance_buffer.reset()
+        self.addCleanup(attendance_buffer.reset)
+        self.client.force_authenticate(user=self.students[0])
+
+    def mark(self, **data):
+        return self.client.post('/api/attendance/mark_auto/', data or {'lesson_id': self.lesson.id}, format='json')
+
+    def test_repeat_views_are_answered_from_memory(self):
+        self.assertEqual(self.mark().status_code, status.HTTP_202_ACCEPTED)
+        with self.assertNumQueries(0):
+            response = self.mark()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(Attendance.objects.exists())
+
+        self.client.force_authenticate(user=self.students[1])
+        self.mark()
+        self.assertEqual(attendance_buffer.flush(), 2)
+        self.assertEqual(Attendance.objects.filter(lesson=self.lesson, status='Present', marked_by=None).count(), 2)
+        self.assertEqual(attendance_buffer.flush(), 0)
+
+    def test_flush_is_idempotent_and_keeps_manual_marks(self):
+        Attendance.objects.create(lesson=self.lesson, student=self.students[1], status='Late')
+        Attendance.objects.create(lesson=self.lesson, student=self.students[2], status='Absent')
+        for student in self.students:
+            self.client.force_authenticate(user=student)
+            self.mark()
+        attendance_buffer.flush()
+        attendance_buffer.reset()
+        for student in self.students:
+            self.client.force_authenticate(user=student)
+            self.mark()
+        attendance_buffer.flush()
+
+        statuses = dict(Attendance.objects.filter(lesson=self.lesson).values_list('student__username', 'status'))
+        self.assertEqual(statuses, {'student0': 'Present', 'student1': 'Late', 'student2': 'Present'})
+
+    def test_deleted_students_do_not_fail_the_batch(self):
+        for student in self.students:
+            self.client.force_authenticate(user=student)
+            self.mark()
+        self.students[2].delete()
+        attendance_buffer.flush()
+        self.assertEqual(sorted(Attendance.objects.values_list('student__username', flat=True)), ['student0', 'student1'])
+
+    def test_failed_flush_keeps_the_batch(self):
+        self.mark()
+        with mock.patch('core.utils.attendance.write_auto_attendance', side_effect=OperationalError('gone away')):
+            with self.assertRaises(OperationalError):
+                attendance_buffer.flush()
+        self.assertEqual(attendance_buffer.flush(), 1)
+        self.assertTrue(Attendance.objects.filter(lesson=self.lesson, student=self.students[0]).exists())
+
+    def test_assessment_views_and_unknown_lessons(self):
+        assessment = Assessment.objects.create(unit=self.unit, lesson=self.lesson, assessment_type='CAT', title='CAT 1',
+                                               points=10, due_date='2024-03-01T00:00:00Z', is_approved=True)
+        self.assertEqual(self.mark(assessment_id=assessment.id).status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(self.mark(lesson_id=999999).status_code, status.HTTP_404_NOT_FOUND)
+
+    @override_settings(ATTENDANCE_FLUSH_INTERVAL=0)
+    def test_unbuffered_views_are_written_through(self):
+        self.assertEqual(self.mark().status_code, status.HTTP_201_CREATED)
+        self.assertTrue(Attendance.objects.filter(lesson=self.lesson, student=self.students[0]).exists())
+        self.assertEqual(self.mark().status_code, status.HTTP_200_OK)
@@ -0,0 +1,69 @@
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+from core.models import Assessment, Question, StudentEnrollment, assessment_availability
+from core.testing import create_user, create_course_group, create_unit
+
+class AssessmentAvailabilityTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.student = create_user('student')
+        self.trainer = create_user('trainer', 'Trainer')
+        course_group = create_course_group()
+        unit = create_unit(course_group)
+        StudentEnrollment.objects.create(student=self.student, course_group=course_group)
+
+        now = timezone.now()
+        hour = timedelta(hours=1)
+
+        def assessment(title, **kwargs):
+            return Assessment.objects.create(
+                unit=unit, assessment_type='CAT', title=title, points=10, due_date=now, is_approved=True, **kwargs
+            )
+
+        self.open = assessment('Open', scheduled_start=now - hour, scheduled_end=now + hour)
+        self.late = assessment('Late', scheduled_start=now - 2 * hour, scheduled_end=now - hour, allow_late_submission=True)
+        self.upcoming = assessment('Upcoming', scheduled_start=now + hour)
+        self.closed = assessment('Closed', scheduled_end=now - hour)
+        self.draft = Assessment.objects.create(unit=unit, assessment_type='CAT', title='Draft', points=10, due_date=now)
+        for order in (1, 2):
+            Question.objects.create(assessment=self.open, question_text=f'Q{order}', question_type='ESSAY', order=order)
+
+    def test_sql_state_matches_python(self):
+        self.client.force_authenticate(user=self.trainer)
+        response = self.client.get('/api/assessments/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        states = {a['id']: a['availability'] for a in response.data}
+        for assessment in Assessment.objects.all():
+            self.assertEqual(states[assessment.id], assessment_availability(assessment))
+        self.assertEqual(states[self.late.id], 'late')
+        self.assertEqual(states[self.draft.id], 'unapproved')
+
+        by_id = {a['id']: a for a in response.data}
+        self.assertEqual(by_id[self.open.id]['question_count'], 2)
+        self.assertFalse(by_id[self.closed.id]['can_submit'])
+        self.assertTrue(by_id[self.late.id]['can_submit'])
+
+    def test_students_filter_open_assessments(self):
+        self.client.force_authenticate(user=self.student)
+        response = self.client.get('/api/assessments/')
+        self.assertEqual({a['id'] for a in response.data}, {self.open.id, self.late.id, self.upcoming.id})
+
+        response = self.client.get('/api/assessments/?availability=open,late')
+        self.assertEqual({a['id'] for a in response.data}, {self.open.id, self.late.id})
+
+    def test_ordering_by_availability(self):
+        self.client.force_authenticate(user=self.trainer)
+        response = self.client.get('/api/assessments/?ordering=availability')
+        self.assertEqual(
+            [a['id'] for a in response.data],
+            [self.open.id, self.late.id, self.upcoming.id, self.closed.id, self.draft.id]
+        )
+
+    def test_unknown_state_rejected(self):
+        self.client.force_authenticate(user=self.student)
+        response = self.client.get('/api/assessments/?availability=soon')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
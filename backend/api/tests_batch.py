@@ -0,0 +1,54 @@
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from rest_framework import status
+from core.models import School, Notification
+from core.testing import create_user
+
+@override_settings(BATCH_MAX_WORKERS=1, BATCH_MAX_REQUESTS=3)
+class BatchEndpointTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.student = create_user('student')
+        School.objects.create(name='Test School')
+        Notification.objects.create(user=self.student, title='Hello', message='World')
+        self.client.force_authenticate(user=self.student)
+
+    def test_batch_returns_each_response_in_order(self):
+        response = self.client.post('/api/batch/', {
+            'requests': ['schools/', '/api/notifications/unread_count/', 'api/courses/']
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        first, second, third = response.data['responses']
+        self.assertEqual(first['status'], 200)
+        self.assertEqual(first['data'][0]['name'], 'Test School')
+        self.assertEqual(second['data'], {'total': 1, 'critical': 0})
+        self.assertEqual(third['path'], 'api/courses/')
+        self.assertEqual(third['data'], [])
+
+    def test_sub_requests_keep_permissions(self):
+        response = self.client.post('/api/batch/', {'requests': ['users/1/activate/', 'no-such-endpoint/']}, format='json')
+        statuses = [r['status'] for r in response.data['responses']]
+        self.assertEqual(statuses, [status.HTTP_403_FORBIDDEN, status.HTTP_404_NOT_FOUND])
+
+    def test_unhandled_errors_are_not_leaked(self):
+        with mock.patch('api.views.SchoolViewSet.list', side_effect=RuntimeError('secret connection string')), \
+                self.assertLogs('api.batch_views', level='ERROR'):
+            response = self.client.post('/api/batch/', {'requests': ['schools/']}, format='json')
+        result = response.data['responses'][0]
+        self.assertEqual(result['status'], status.HTTP_500_INTERNAL_SERVER_ERROR)
+        self.assertEqual(result['data'], {'error': 'Internal server error'})
+
+    def test_rejects_nested_and_oversized_batches(self):
+        nested = self.client.post('/api/batch/', {'requests': ['batch/']}, format='json')
+        self.assertEqual(nested.data['responses'][0]['status'], status.HTTP_400_BAD_REQUEST)
+
+        too_many = self.client.post('/api/batch/', {'requests': ['schools/'] * 4}, format='json')
+        self.assertEqual(too_many.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_requires_authentication(self):
+        self.client.force_authenticate(user=None)
+        response = self.client.post('/api/batch/', {'requests': ['schools/']}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -0,0 +1,137 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.db import OperationalError
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+from core.utils.drafts import DraftBuffer, draft_buffer
+from core.models import (Assessment, Question, QuestionOption, DraftAnswer, StudentAnswer, StudentEnrollment,
+                         Submission)
+from core.testing import create_user, create_course_group, create_unit
+
+# A long interval keeps the background flusher asleep; tests flush explicitly
+@override_settings(DRAFT_FLUSH_INTERVAL=3600,
+                   CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class DraftAutosaveTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.student = create_user('student')
+
+        course_group = create_course_group()
+        unit = create_unit(course_group)
+        StudentEnrollment.objects.create(student=self.student, course_group=course_group)
+
+        self.assessment = Assessment.objects.create(
+            unit=unit, assessment_type='CAT', title='CAT 1', points=10, due_date=timezone.now(), is_approved=True
+        )
+        self.mcq = Question.objects.create(assessment=self.assessment, question_text='2 + 2?', question_type='MCQ', points=2, order=1)
+        self.right = QuestionOption.objects.create(question=self.mcq, option_text='4', is_correct=True, order=1)
+        self.wrong = QuestionOption.objects.create(question=self.mcq, option_text='5', is_correct=False, order=2)
+        self.essay = Question.objects.create(assessment=self.assessment, question_text='Explain', question_type='ESSAY', points=5, order=2)
+
+        self.client.force_authenticate(user=self.student)
+        self.addCleanup(draft_buffer.discard, self.student.id, self.assessment.id)
+
+    def autosave(self, answers):
+        return self.client.post('/api/student-answers/autosave/', {
+            'assessment_id': self.assessment.id, 'answers': answers
+        }, format='json')
+
+    def test_autosaves_are_coalesced_until_flushed(self):
+        self.autosave([{'question_id': self.mcq.id, 'selected_option_id': self.wrong.id}])
+        self.autosave([{'question_id': self.essay.id, 'answer_text': 'Be'}])
+        response = self.autosave([
+            {'question_id': self.mcq.id, 'selected_option_id': self.right.id},
+            {'question_id': self.essay.id, 'answer_text': 'Because'},
+        ])
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertFalse(DraftAnswer.objects.exists())
+
+        drafts = self.client.get(f'/api/student-answers/drafts/?assessment={self.assessment.id}').data
+        self.assertEqual([(d['selected_option_id'], d['answer_text']) for d in drafts], [(self.right.id, ''), (None, 'Because')])
+
+        # Live questions and options, then one upsert in a savepoint
+        with self.assertNumQueries(5):
+            self.assertEqual(draft_buffer.flush(), 2)
+        self.assertEqual(DraftAnswer.objects.get(question=self.essay).answer_text, 'Because')
+
+        # Flushing again updates the same rows
+        self.autosave([{'question_id': self.essay.id, 'answer_text': 'Because of this'}])
+        draft_buffer.flush()
+        self.assertEqual(DraftAnswer.objects.count(), 2)
+        self.assertEqual(DraftAnswer.objects.get(question=self.essay).answer_text, 'Because of this')
+
+    def test_submit_promotes_drafts(self):
+        self.autosave([{'question_id': self.mcq.id, 'selected_option_id': self.right.id}])
+        draft_buffer.flush()
+        self.autosave([{'question_id': self.essay.id, 'answer_text': 'Because'}])
+
+        submission = Submission.objects.create(assessment=self.assessment, student=self.student)
+        response = self.client.post('/api/student-answers/submit_answers/', {
+            'submission_id': submission.id, 'answers': []
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['auto_graded_score'], 2)
+        self.assertEqual(StudentAnswer.objects.filter(submission=submission).count(), 2)
+
+        self.assertFalse(DraftAnswer.objects.exists())
+        self.assertEqual(draft_buffer.pending(self.student.id, self.assessment.id), {})
+
+    def test_autosaves_do_not_touch_the_cache_unless_shared(self):
+        with mock.patch('core.utils.drafts.cache') as shared:
+            self.autosave([{'question_id': self.essay.id, 'answer_text': 'Because'}])
+        shared.set_many.assert_not_called()
+
+    @override_settings(DRAFT_SHARED_CACHE=True)
+    def test_drafts_buffered_by_another_process_are_submitted(self):
+        other_process = DraftBuffer()
+        self.addCleanup(other_process.discard, self.student.id, self.assessment.id)
+        other_process.put(self.student.id, self.assessment.id, [(self.mcq, self.right, '')])
+
+        submission = Submission.objects.create(assessment=self.assessment, student=self.student)
+        response = self.client.post('/api/student-answers/submit_answers/', {
+            'submission_id': submission.id, 'answers': []
+        }, format='json')
+        self.assertEqual(response.data['auto_graded_score'], 2)
+
+        # Its flush after the submission must not bring the draft back
+        self.assertEqual(other_process.flush(), 0)
+        self.assertFalse(DraftAnswer.objects.exists())
+        self.assertEqual(self.client.get(f'/api/student-answers/drafts/?assessment={self.assessment.id}').data, [])
+
+    def test_flush_drops_drafts_of_deleted_questions(self):
+        self.autosave([
+            {'question_id': self.mcq.id, 'selected_option_id': self.wrong.id},
+            {'question_id': self.essay.id, 'answer_text': 'Because'},
+        ])
+        self.essay.delete()
+        self.wrong.delete()
+        self.assertEqual(draft_buffer.flush(), 1)
+        draft = DraftAnswer.objects.get()
+        self.assertEqual((draft.question_id, draft.selected_option_id), (self.mcq.id, None))
+
+    def test_failed_flush_keeps_the_batch(self):
+        self.autosave([{'question_id': self.essay.id, 'answer_text': 'Because'}])
+        with mock.patch('core.utils.drafts.save_drafts', side_effect=OperationalError('gone away')):
+            with self.assertRaises(OperationalError):
+                draft_buffer.flush()
+        self.autosave([{'question_id': self.mcq.id, 'selected_option_id': self.right.id}])
+        self.assertEqual(draft_buffer.flush(), 2)
+        self.assertEqual(DraftAnswer.objects.count(), 2)
+
+    @override_settings(DRAFT_FLUSH_INTERVAL=0)
+    def test_zero_interval_writes_through(self):
+        self.autosave([{'question_id': self.essay.id, 'answer_text': 'Because'}])
+        self.assertEqual(DraftAnswer.objects.get().answer_text, 'Because')
+
+    def test_rejects_closed_assessments_and_foreign_questions(self):
+        response = self.autosave([{'question_id': self.mcq.id + 100}])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.assessment.scheduled_start = timezone.now() - timedelta(hours=2)
+        self.assessment.scheduled_end = timezone.now() - timedelta(hours=1)
+        self.assessment.save()
+        response = self.autosave([{'question_id': self.essay.id, 'answer_text': 'Late'}])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,39 @@
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from rest_framework import status
+from core.models import Lesson, Resource, StudentEnrollment
+from core.testing import create_user, create_course_group, create_unit
+
+class IdsFilterTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.student = create_user('student')
+
+        course_group = create_course_group()
+        unit = create_unit(course_group)
+        lesson = Lesson.objects.create(unit=unit, title='Lesson 1', order=1, is_approved=True, is_active=True)
+
+        self.approved = Resource.objects.create(lesson=lesson, title='Notes', resource_type='PDF', is_approved=True)
+        self.approved_2 = Resource.objects.create(lesson=lesson, title='Slides', resource_type='PPT', is_approved=True)
+        self.draft = Resource.objects.create(lesson=lesson, title='Draft', resource_type='PDF', is_approved=False)
+
+        StudentEnrollment.objects.create(student=self.student, course_group=course_group)
+        self.client.force_authenticate(user=self.student)
+
+    def test_ids_filter_returns_requested_rows(self):
+        response = self.client.get(f'/api/resources/?ids={self.approved.id},{self.approved_2.id}')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual({r['id'] for r in response.data}, {self.approved.id, self.approved_2.id})
+
+    def test_ids_filter_keeps_visibility_rules(self):
+        response = self.client.get(f'/api/resources/?ids={self.approved.id},{self.draft.id}')
+        self.assertEqual([r['id'] for r in response.data], [self.approved.id])
+
+    def test_invalid_ids_rejected(self):
+        response = self.client.get('/api/resources/?ids=1,abc')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(IDS_FILTER_MAX=2)
+    def test_ids_upper_bound(self):
+        response = self.client.get('/api/resources/?ids=1,2,3')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
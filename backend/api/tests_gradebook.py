@@ -0,0 +1,100 @@
+import csv
+import io
+
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+from core.utils.unit_grades import compute_unit_grades
+from core.models import Assessment, Submission, StudentEnrollment
+from core.testing import create_user, create_course_group, create_unit
+
+class UnitGradebookTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.trainer = create_user('trainer', 'Trainer')
+        self.other_trainer = create_user('other', 'Trainer')
+        self.hod = create_user('hod', 'HOD')
+        course_group = create_course_group()
+        self.unit = create_unit(course_group, trainer=self.trainer, cat_total_points=30, assessment_total_points=20)
+
+        now = timezone.now()
+        self.cat = Assessment.objects.create(unit=self.unit, assessment_type='CAT', title='CAT 1', points=20, due_date=now, is_approved=True)
+        self.assignment = Assessment.objects.create(unit=self.unit, assessment_type='Assignment', title='Essay', points=10, due_date=now, is_approved=True)
+
+        self.alice = create_user('alice', first_name='Alice')
+        self.bob = create_user('bob')
+        for student in (self.alice, self.bob):
+            StudentEnrollment.objects.create(student=student, course_group=course_group)
+
+        Submission.objects.create(assessment=self.cat, student=self.alice, grade=10, is_graded=True)
+        Submission.objects.create(assessment=self.assignment, student=self.alice, grade=5, is_graded=True, is_late=True)
+        Submission.objects.create(assessment=self.cat, student=self.bob, auto_graded_score=4)
+        self.url = f'/api/units/{self.unit.id}/gradebook/'
+
+    def test_matrix_and_weighted_totals(self):
+        self.client.force_authenticate(user=self.trainer)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([a['id'] for a in response.data['assessments']], [self.cat.id, self.assignment.id])
+
+        alice, bob = response.data['students']
+        self.assertEqual(alice['name'], 'Alice')
+        self.assertTrue(alice['cells'][1]['is_late'])
+        self.assertEqual((alice['cat_score'], alice['assessment_score'], alice['total']), (15, 10, 25))
+        self.assertEqual(bob['cells'][1], None)
+        self.assertEqual((bob['total'], bob['pending']), (0, 1))
+
+    def test_counts_the_same_work_as_unit_grades(self):
+        retired = Assessment.objects.create(unit=self.unit, assessment_type='CAT', title='Old CAT', points=7,
+                                            due_date=timezone.now(), is_approved=True, is_active=False)
+        Submission.objects.create(assessment=retired, student=self.bob, grade=7, is_graded=True)
+        quiz = Assessment.objects.create(unit=self.unit, assessment_type='Test', title='Quiz', points=3,
+                                         due_date=timezone.now(), is_approved=True)
+        Submission.objects.create(assessment=quiz, student=self.bob, grade=1, is_graded=True)
+
+        self.client.force_authenticate(user=self.trainer)
+        response = self.client.get(self.url)
+        self.assertNotIn(retired.id, [a['id'] for a in response.data['assessments']])
+        grades = compute_unit_grades(self.unit)
+        for row in response.data['students']:
+            grade = grades[row['id']]
+            self.assertEqual((row['cat_score'], row['total']), (float(grade['cat_score']), float(grade['total'])))
+        self.assertEqual(response.data['students'][1]['cat_score'], 1.30)
+
+    def test_cached_until_a_submission_changes(self):
+        self.client.force_authenticate(user=self.hod)
+        self.client.get(self.url)
+        with self.assertNumQueries(4):  # unit, assessment ids, versions, cached gradebook
+            self.client.get(self.url)
+
+        Submission.objects.filter(student=self.bob).update(grade=20, is_graded=True)
+        self.assertEqual(self.client.get(self.url).data['students'][1]['total'], 0)  # .update() sends no signal
+        Submission.objects.get(student=self.bob).save()
+        self.assertEqual(self.client.get(self.url).data['students'][1]['total'], 30)
+
+    def test_csv_and_xlsx_export(self):
+        self.client.force_authenticate(user=self.trainer)
+        response = self.client.get(self.url, {'export': 'csv'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        rows = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(rows[1][:4], ['alice', 'Alice', '10.0', '5.0 (late)'])
+        self.assertEqual(rows[2][2], 'pending')
+
+        response = self.client.get(self.url, {'export': 'xlsx'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(b''.join(response.streaming_content)[:2], b'PK')
+
+    def test_xlsx_export_of_a_code_with_slashes(self):
+        self.unit.code = 'ICT/CU/01'
+        self.unit.save()
+        self.client.force_authenticate(user=self.trainer)
+        response = self.client.get(self.url, {'export': 'xlsx'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(b''.join(response.streaming_content)[:2], b'PK')
+
+    def test_other_trainers_and_students_denied(self):
+        self.client.force_authenticate(user=self.other_trainer)
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_404_NOT_FOUND)
+        self.client.force_authenticate(user=self.alice)
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_403_FORBIDDEN)
@@ -0,0 +1,288 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+from core.utils.grading import AnswerMatcher, apply_manual_grades, grade_submission
+from core.models import Assessment, Question, QuestionOption, Answer, StudentAnswer, Submission, RegradeJob
+from core.testing import create_user, create_course_group, create_unit
+
+class GradingEngineTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.student = create_user('student')
+        self.other = create_user('other')
+
+        course_group = create_course_group()
+        unit = create_unit(course_group)
+
+        self.assessment = Assessment.objects.create(
+            unit=unit, assessment_type='CAT', title='CAT 1', points=10,
+            due_date=timezone.now(), is_approved=True
+        )
+        self.mcq = Question.objects.create(assessment=self.assessment, question_text='2 + 2?', question_type='MCQ', points=2, order=1)
+        self.right = QuestionOption.objects.create(question=self.mcq, option_text='4', is_correct=True, order=1)
+        self.wrong = QuestionOption.objects.create(question=self.mcq, option_text='5', is_correct=False, order=2)
+        self.tf = Question.objects.create(assessment=self.assessment, question_text='Sky is blue', question_type='TF', points=1, order=2)
+        Answer.objects.create(question=self.tf, is_correct_for_tf=True)
+        self.essay = Question.objects.create(assessment=self.assessment, question_text='Explain', question_type='ESSAY', points=5, order=3)
+
+        self.submission = Submission.objects.create(assessment=self.assessment, student=self.student)
+        self.client.force_authenticate(user=self.student)
+
+    def test_submit_answers_scores_mcq_and_tf(self):
+        response = self.client.post('/api/student-answers/submit_answers/', {
+            'submission_id': self.submission.id,
+            'answers': [
+                {'question_id': self.mcq.id, 'selected_option_id': self.right.id, 'answer_text': ''},
+                {'question_id': self.tf.id, 'selected_option_id': None, 'answer_text': 'False'},
+                {'question_id': self.essay.id, 'selected_option_id': None, 'answer_text': 'Because'},
+            ]
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['auto_graded_score'], 2)
+        self.assertEqual([a['is_correct'] for a in response.data['answers']], [True, False, None])
+        self.assertEqual(response.data['answers'][0]['selected_option_text'], '4')
+
+        self.submission.refresh_from_db()
+        self.assertEqual(self.submission.auto_graded_score, 2)
+        self.assertEqual(StudentAnswer.objects.filter(submission=self.submission).count(), 3)
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_query_count_does_not_grow_with_answers(self):
+        answers = [{'question_id': self.mcq.id, 'selected_option_id': self.wrong.id}] * 30
+        grade_submission(self.submission, answers[:1])
+        # 1 insert, 1 submission update, 2 for the savepoint (versions live in the cache)
+        with self.assertNumQueries(4):
+            grade_submission(self.submission, answers)
+
+    def test_short_answers_graded_and_key_changes_picked_up(self):
+        short = Question.objects.create(assessment=self.assessment, question_text='Capital of Kenya?', question_type='SHORT', points=3, order=4)
+        key = Answer.objects.create(question=short, answer_text='Nairobi\nNairobi City')
+        answers = [{'question_id': short.id, 'answer_text': '  nairobi city. '}]
+
+        _, score = grade_submission(self.submission, answers)
+        self.assertEqual(score, 3)
+
+        key.answer_text = 'Mombasa'
+        key.save()
+        _, score = grade_submission(self.submission, answers)
+        self.assertEqual(score, 0)
+
+    def test_rejects_foreign_questions_and_options(self):
+        other_question = Question.objects.create(assessment=Assessment.objects.create(
+            unit=self.assessment.unit, assessment_type='CAT', title='CAT 2', points=10, due_date=timezone.now()
+        ), question_text='Other', question_type='MCQ', points=1, order=1)
+        for answer in ({'question_id': other_question.id}, {'question_id': self.tf.id, 'selected_option_id': self.right.id}):
+            response = self.client.post('/api/student-answers/submit_answers/', {
+                'submission_id': self.submission.id, 'answers': [answer]
+            }, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(StudentAnswer.objects.exists())
+
+    def test_cannot_submit_to_another_students_submission(self):
+        self.client.force_authenticate(user=self.other)
+        response = self.client.post('/api/student-answers/submit_answers/', {
+            'submission_id': self.submission.id, 'answers': []
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class AnswerMatcherTests(TestCase):
+    def test_text_variants_ignore_case_spacing_and_punctuation(self):
+        matcher = AnswerMatcher(['Photosynthesis', 'U.S.A'])
+        self.assertTrue(matcher.matches('  PHOTOSYNTHESIS!'))
+        self.assertTrue(matcher.matches('usa'))
+        self.assertFalse(matcher.matches('respiration'))
+
+    def test_meaningful_symbols_are_kept(self):
+        matcher = AnswerMatcher(['C#', '50%'])
+        self.assertTrue(matcher.matches('c# '))
+        self.assertFalse(matcher.matches('C'))
+        self.assertTrue(matcher.matches('50%.'))
+        self.assertFalse(matcher.matches('50'))
+
+    def test_numeric_tolerance(self):
+        matcher = AnswerMatcher(['9.81 ± 0.05', '42'])
+        self.assertTrue(matcher.matches('9.78'))
+        self.assertFalse(matcher.matches('9.9'))
+        self.assertTrue(matcher.matches('42.0'))
+        self.assertFalse(matcher.matches('forty two'))
+
+    def test_regex_variants(self):
+        matcher = AnswerMatcher(['re:colou?r', 're:('])
+        self.assertTrue(matcher.matches('Color'))
+        self.assertFalse(matcher.matches('colours'))
+        # An invalid pattern (only in keys saved before they were validated) matches nothing
+        self.assertFalse(matcher.matches('re:('))
+
+
+class RegradeTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.trainer = create_user('trainer', 'Trainer')
+        course_group = create_course_group()
+        unit = create_unit(course_group)
+
+        self.assessment = Assessment.objects.create(
+            unit=unit, assessment_type='CAT', title='CAT 1', points=10, due_date=timezone.now(), is_approved=True
+        )
+        self.mcq = Question.objects.create(assessment=self.assessment, question_text='2 + 2?', question_type='MCQ', points=2, order=1)
+        self.four = QuestionOption.objects.create(question=self.mcq, option_text='4', is_correct=False, order=1)
+        self.five = QuestionOption.objects.create(question=self.mcq, option_text='5', is_correct=True, order=2)
+        essay = Question.objects.create(assessment=self.assessment, question_text='Explain', question_type='ESSAY', points=5, order=2)
+
+        self.submissions = []
+        for i in range(3):
+            student = create_user(f'student{i}')
+            submission = Submission.objects.create(assessment=self.assessment, student=student)
+            grade_submission(submission, [
+                {'question_id': self.mcq.id, 'selected_option_id': self.four.id},
+                {'question_id': essay.id, 'answer_text': 'Because'},
+            ])
+            self.submissions.append(submission)
+
+        # Trainer grades the essay of the first submission
+        StudentAnswer.objects.filter(submission=self.submissions[0], question=essay).update(points_earned=4)
+        Submission.objects.filter(pk=self.submissions[0].pk).update(grade=4, is_graded=True)
+        self.client.force_authenticate(user=self.trainer)
+
+    def test_regrade_after_key_fix(self):
+        self.four.is_correct = True
+        self.four.save()
+        self.five.is_correct = False
+        self.five.save()
+
+        response = self.client.post(f'/api/assessments/{self.assessment.id}/regrade/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['status'], 'Completed')
+        self.assertEqual(response.data['processed_submissions'], 3)
+        self.assertEqual(response.data['answers_changed'], 3)
+
+        graded = Submission.objects.get(pk=self.submissions[0].pk)
+        self.assertEqual(graded.auto_graded_score, 2)
+        self.assertEqual(graded.grade, 6)
+        self.assertEqual(Submission.objects.get(pk=self.submissions[1].pk).grade, None)
+        self.assertEqual(StudentAnswer.objects.filter(question=self.mcq, is_correct=True).count(), 3)
+
+        job = self.client.get(f'/api/regrade-jobs/?assessment={self.assessment.id}').data[0]
+        self.assertEqual(job['status'], 'Completed')
+
+    def test_regrade_with_unchanged_key_writes_nothing(self):
+        response = self.client.post(f'/api/assessments/{self.assessment.id}/regrade/')
+        self.assertEqual(response.data['answers_changed'], 0)
+
+    @override_settings(REGRADE_INLINE_LIMIT=1)
+    def test_large_cohort_is_queued_and_command_finishes_it(self):
+        response = self.client.post(f'/api/assessments/{self.assessment.id}/regrade/')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data['status'], 'Pending')
+
+        # on_commit never fires inside a TestCase, so the command picks the job up
+        call_command('regrade_assessments', stdout=StringIO())
+        self.assertEqual(RegradeJob.objects.get(pk=response.data['id']).status, 'Completed')
+
+    def test_students_cannot_regrade(self):
+        self.client.force_authenticate(user=self.submissions[0].student)
+        response = self.client.post(f'/api/assessments/{self.assessment.id}/regrade/')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class ManualGradingTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.trainer = create_user('trainer', 'Trainer')
+        course_group = create_course_group()
+        unit = create_unit(course_group, trainer=self.trainer)
+        self.assessment = Assessment.objects.create(
+            unit=unit, assessment_type='CAT', title='CAT 1', points=10, due_date=timezone.now(), is_approved=True
+        )
+        mcq = Question.objects.create(assessment=self.assessment, question_text='2 + 2?', question_type='MCQ', points=2, order=1)
+        right = QuestionOption.objects.create(question=mcq, option_text='4', is_correct=True, order=1)
+        self.essay = Question.objects.create(assessment=self.assessment, question_text='Explain', question_type='ESSAY', points=5, order=2)
+
+        self.submissions = []
+        self.essay_answers = []
+        for i in range(3):
+            student = create_user(f'student{i}')
+            submission = Submission.objects.create(assessment=self.assessment, student=student)
+            grade_submission(submission, [
+                {'question_id': mcq.id, 'selected_option_id': right.id},
+                {'question_id': self.essay.id, 'answer_text': 'Because'},
+            ])
+            self.submissions.append(submission)
+            self.essay_answers.append(StudentAnswer.objects.get(submission=submission, question=self.essay))
+        self.client.force_authenticate(user=self.trainer)
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_bulk_write_query_count(self):
+        grades = [{'answer_id': answer.id, 'points_earned': 2} for answer in self.essay_answers]
+        # Answer lookup, 2 updates, 2 for the savepoint, assessment lookup for the version bump
+        with self.assertNumQueries(6):
+            apply_manual_grades(grades)
+        self.assertEqual(
+            list(Submission.objects.order_by('id').values_list('grade', flat=True)), [4, 4, 4]
+        )
+
+    def test_grade_answers_sets_grade_and_feedback(self):
+        submission, answer = self.submissions[0], self.essay_answers[0]
+        response = self.client.post(f'/api/submissions/{submission.id}/grade_answers/', {
+            'feedback': 'Good work',
+            'graded_answers': [{'answer_id': answer.id, 'points_earned': '3.5', 'feedback': 'Thin'}]
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(float(response.data['grade']), 5.5)
+        self.assertEqual(response.data['feedback'], 'Good work')
+        self.assertTrue(response.data['is_graded'])
+        answer.refresh_from_db()
+        self.assertEqual((answer.points_earned, answer.feedback), (3.5, 'Thin'))
+
+    def test_rejects_foreign_answers_and_out_of_range_marks(self):
+        submission = self.submissions[0]
+        for graded in ({'answer_id': self.essay_answers[1].id, 'points_earned': 1},
+                       {'answer_id': self.essay_answers[0].id, 'points_earned': 6},
+                       {'answer_id': self.essay_answers[0].id, 'points_earned': 'abc'}):
+            response = self.client.post(f'/api/submissions/{submission.id}/grade_answers/', {
+                'graded_answers': [graded]
+            }, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Submission.objects.filter(is_graded=True).exists())
+
+    def test_bulk_grade_one_question_across_the_class(self):
+        response = self.client.post('/api/submissions/bulk_grade/', {
+            'assessment': self.assessment.id,
+            'graded_answers': [
+                {'answer_id': answer.id, 'points_earned': points}
+                for answer, points in zip(self.essay_answers[:2], (4, 1))
+            ],
+            'feedback': {str(self.submissions[0].id): 'Well argued'}
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(s['id'], float(s['grade'])) for s in response.data['submissions']],
+            [(self.submissions[0].id, 6), (self.submissions[1].id, 3)]
+        )
+        self.assertEqual(response.data['submissions'][0]['feedback'], 'Well argued')
+        self.assertFalse(Submission.objects.get(pk=self.submissions[2].pk).is_graded)
+
+    def test_trainers_only_grade_their_units(self):
+        other = create_user('other', 'Trainer')
+        self.client.force_authenticate(user=other)
+        response = self.client.post('/api/submissions/bulk_grade/', {
+            'graded_answers': [{'answer_id': self.essay_answers[0].id, 'points_earned': 5}]
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post(f'/api/submissions/{self.submissions[0].id}/grade_answers/', {
+            'graded_answers': [{'answer_id': self.essay_answers[0].id, 'points_earned': 5}]
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertIsNone(StudentAnswer.objects.get(pk=self.essay_answers[0].id).points_earned)
+
+    def test_students_cannot_grade(self):
+        self.client.force_authenticate(user=self.submissions[0].student)
+        response = self.client.post(f'/api/submissions/{self.submissions[0].id}/grade_answers/', {
+            'graded_answers': [{'answer_id': self.essay_answers[0].id, 'points_earned': 5}]
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
@@ -0,0 +1,102 @@
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+from core.utils.grading import grade_submission
+from core.utils.variants import allowed_question_ids
+from core.models import Assessment, Question, QuestionOption, Submission
+from core.testing import create_user, create_course_group, create_unit
+
+User = get_user_model()
+
+class ItemAnalysisTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.trainer = create_user('trainer', 'Trainer')
+        course_group = create_course_group()
+        unit = create_unit(course_group)
+        self.assessment = Assessment.objects.create(
+            unit=unit, assessment_type='CAT', title='CAT 1', points=10, due_date=timezone.now(), is_approved=True
+        )
+
+        self.easy = Question.objects.create(assessment=self.assessment, question_text='Easy', question_type='MCQ', points=1, order=1)
+        self.easy_right = QuestionOption.objects.create(question=self.easy, option_text='a', is_correct=True, order=1)
+        self.easy_wrong = QuestionOption.objects.create(question=self.easy, option_text='b', order=2)
+        self.hard = Question.objects.create(assessment=self.assessment, question_text='Hard', question_type='MCQ', points=3, order=2)
+        self.hard_right = QuestionOption.objects.create(question=self.hard, option_text='c', is_correct=True, order=1)
+        self.hard_wrong = QuestionOption.objects.create(question=self.hard, option_text='d', order=2)
+
+        # Only the strongest student gets the hard question; one student skips it
+        picks = [
+            (self.easy_right, self.hard_right),
+            (self.easy_right, self.hard_wrong),
+            (self.easy_right, None),
+            (self.easy_wrong, self.hard_wrong),
+        ]
+        for i, (easy, hard) in enumerate(picks):
+            student = create_user(f'student{i}')
+            answers = [{'question_id': self.easy.id, 'selected_option_id': easy.id}]
+            if hard:
+                answers.append({'question_id': self.hard.id, 'selected_option_id': hard.id})
+            grade_submission(Submission.objects.create(assessment=self.assessment, student=student), answers)
+
+        self.client.force_authenticate(user=self.trainer)
+
+    def test_item_statistics(self):
+        response = self.client.get(f'/api/assessments/{self.assessment.id}/item_analysis/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['students'], 4)
+
+        easy, hard = response.data['questions']
+        self.assertEqual(easy['difficulty'], 0.75)
+        self.assertEqual(hard['difficulty'], 0.25)
+        self.assertEqual(hard['discrimination'], 1.0)
+        self.assertGreater(hard['point_biserial'], 0)
+        self.assertEqual([o['count'] for o in hard['options']], [1, 2])
+        self.assertEqual(hard['no_answer'], 1)
+
+        distribution = response.data['distribution']
+        self.assertEqual(distribution['max'], 4)
+        self.assertEqual(distribution['percentiles']['50'], 1)
+        self.assertEqual(sum(b['count'] for b in distribution['histogram']), 4)
+
+    def test_cached_until_a_new_submission(self):
+        url = f'/api/assessments/{self.assessment.id}/item_analysis/'
+        self.client.get(url)
+        self.assertEqual(self.client.get(url).data['students'], 4)
+
+        student = create_user('late')
+        Submission.objects.create(assessment=self.assessment, student=student)
+        self.assertEqual(self.client.get(url).data['students'], 5)
+
+    def test_questions_outside_a_variant_are_not_scored(self):
+        self.assessment.questions_per_student = 1
+        self.assessment.save()
+        Submission.objects.all().delete()
+        right = {self.easy.id: self.easy_right, self.hard.id: self.hard_right}
+        for i in range(6):
+            student = create_user(f'variant{i}')
+            question_id, = allowed_question_ids(self.assessment, student.id, [self.easy.id, self.hard.id])
+            grade_submission(Submission.objects.create(assessment=self.assessment, student=student),
+                             [{'question_id': question_id, 'selected_option_id': right[question_id].id}])
+
+        data = self.client.get(f'/api/assessments/{self.assessment.id}/item_analysis/').data
+        self.assertEqual(sum(q['served'] for q in data['questions']), 6)
+        for question in data['questions']:
+            if question['served']:
+                self.assertEqual(question['difficulty'], 1.0)
+                self.assertEqual(question['no_answer'], 0)
+        self.assertEqual(data['distribution']['histogram'][-1]['count'], 6)
+
+    def test_cached_until_the_paper_changes(self):
+        url = f'/api/assessments/{self.assessment.id}/item_analysis/'
+        self.client.get(url)
+        self.easy.question_text = 'Easier'
+        self.easy.save()
+        self.assertEqual(self.client.get(url).data['questions'][0]['question_text'], 'Easier')
+
+    def test_students_cannot_see_item_analysis(self):
+        self.client.force_authenticate(user=User.objects.get(username='student0'))
+        response = self.client.get(f'/api/assessments/{self.assessment.id}/item_analysis/')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
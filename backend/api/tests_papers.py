@@ -0,0 +1,89 @@
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+from core.utils.papers import get_paper
+from core.models import Assessment, AssessmentPaper, Question, QuestionOption, Answer, StudentEnrollment
+from core.testing import create_user, create_course_group, create_unit
+
+class AssessmentPaperTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.student = create_user('student')
+        self.trainer = create_user('trainer', 'Trainer')
+
+        course_group = create_course_group()
+        unit = create_unit(course_group)
+        StudentEnrollment.objects.create(student=self.student, course_group=course_group)
+
+        self.assessment = Assessment.objects.create(
+            unit=unit, assessment_type='CAT', title='CAT 1', points=10,
+            due_date=timezone.now(), is_approved=True
+        )
+        self.mcq = Question.objects.create(assessment=self.assessment, question_text='2 + 2?', question_type='MCQ', points=2, order=1)
+        self.right = QuestionOption.objects.create(question=self.mcq, option_text='4', is_correct=True, order=1)
+        QuestionOption.objects.create(question=self.mcq, option_text='5', is_correct=False, order=2)
+        self.tf = Question.objects.create(assessment=self.assessment, question_text='Sky is blue', question_type='TF', points=1, order=2)
+        Answer.objects.create(question=self.tf, is_correct_for_tf=True)
+
+        self.client.force_authenticate(user=self.student)
+
+    def test_student_detail_has_no_answer_keys(self):
+        response = self.client.get(f'/api/assessments/{self.assessment.id}/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        questions = response.data['questions']
+        self.assertEqual([q['id'] for q in questions], [self.mcq.id, self.tf.id])
+        self.assertNotIn('correct_answers', questions[0])
+        self.assertEqual([o['option_text'] for o in questions[0]['options']], ['4', '5'])
+        self.assertNotIn('is_correct', questions[0]['options'][0])
+
+    def test_student_list_and_unit_detail_have_no_questions(self):
+        response = self.client.get('/api/assessments/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        rows = response.data['results'] if isinstance(response.data, dict) else response.data
+        self.assertEqual([row['id'] for row in rows], [self.assessment.id])
+        self.assertNotIn('questions', rows[0])
+        self.assertEqual(rows[0]['question_count'], 2)
+
+        response = self.client.get(f'/api/units/{self.assessment.unit_id}/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('questions', response.data['assessments'][0])
+
+        # Staff still get the full questions with their keys
+        self.client.force_authenticate(user=self.trainer)
+        rows = self.client.get('/api/assessments/').data
+        rows = rows['results'] if isinstance(rows, dict) else rows
+        self.assertIn('is_correct', rows[0]['questions'][0]['options'][0])
+
+    def test_paper_served_from_snapshot(self):
+        self.client.get(f'/api/assessments/{self.assessment.id}/paper/')
+        self.assertFalse(AssessmentPaper.objects.get(assessment=self.assessment).is_stale)
+
+        # A fresh paper is one lookup; questions and options are not re-queried
+        with self.assertNumQueries(1):
+            version, payload = get_paper(self.assessment.id)
+        self.assertEqual(len(payload['questions']), 2)
+
+    def test_paper_rebuilt_after_question_change(self):
+        first = self.client.get(f'/api/assessments/{self.assessment.id}/paper/').data
+
+        self.right.option_text = 'Four'
+        self.right.save()
+
+        second = self.client.get(f'/api/assessments/{self.assessment.id}/paper/').data
+        self.assertGreater(second['version'], first['version'])
+        self.assertEqual(second['questions'][0]['options'][0]['option_text'], 'Four')
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_question_changes_refresh_cached_unit_detail(self):
+        url = f'/api/units/{self.assessment.unit_id}/'
+        self.assertEqual(self.client.get(url).data['assessments'][0]['question_count'], 2)
+
+        Question.objects.create(assessment=self.assessment, question_text='3 + 3?', question_type='SHORT', points=1, order=3)
+        self.assertEqual(self.client.get(url).data['assessments'][0]['question_count'], 3)
+
+    def test_staff_still_see_answer_keys(self):
+        self.client.force_authenticate(user=self.trainer)
+        response = self.client.get(f'/api/assessments/{self.assessment.id}/')
+        self.assertIn('correct_answers', response.data['questions'][0])
@@ -0,0 +1,132 @@
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+from core.utils.question_import import import_questions
+from core.models import Assessment, Question, QuestionOption, Answer
+from core.testing import create_user, create_course_group, create_unit
+
+GIFT = """// Sample bank
+::Q1:: [2] 2 + 2 is {=4 ~5 ~22}
+
+The sky is blue {TRUE}
+
+Capital of Kenya? {=Nairobi =Nairobi City}
+
+Water boils at {=100} degrees Celsius.
+
+Explain osmosis. {}
+"""
+
+class QuestionImportTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.trainer = create_user('trainer', 'Trainer')
+        course_group = create_course_group()
+        unit = create_unit(course_group, trainer=self.trainer)
+        self.assessment = Assessment.objects.create(
+            unit=unit, assessment_type='CAT', title='CAT 1', points=10, due_date=timezone.now(), is_approved=True
+        )
+        Question.objects.create(assessment=self.assessment, question_text='Existing', question_type='ESSAY', points=1, order=1)
+        self.client.force_authenticate(user=self.trainer)
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_json_import_uses_a_fixed_number_of_queries(self):
+        rows = [
+            {'question_text': f'Q{i}', 'question_type': 'MCQ', 'points': 1,
+             'options': [{'option_text': 'a', 'is_correct': True}, {'option_text': 'b'}]}
+            for i in range(100)
+        ]
+        # max(order), questions and options inserts, 2 for the savepoint, paper invalidation
+        with self.assertNumQueries(6):
+            import_questions(self.assessment, rows)
+        self.assertEqual(Question.objects.filter(assessment=self.assessment).count(), 101)
+        self.assertEqual(QuestionOption.objects.filter(question__assessment=self.assessment).count(), 200)
+        self.assertEqual(Question.objects.get(question_text='Q0').order, 2)
+
+    def test_gift_import(self):
+        response = self.client.post('/api/questions/import/', {
+            'assessment': self.assessment.id, 'format': 'gift', 'content': GIFT
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['created'], 5)
+
+        types = [q['question_type'] for q in response.data['questions']]
+        self.assertEqual(types, ['MCQ', 'TF', 'SHORT', 'FILL', 'ESSAY'])
+        mcq = response.data['questions'][0]
+        self.assertEqual(mcq['points'], 2)
+        self.assertEqual([(o['option_text'], o['is_correct']) for o in mcq['options']], [('4', True), ('5', False), ('22', False)])
+        self.assertEqual(response.data['questions'][2]['correct_answers'][0]['answer_text'], 'Nairobi\nNairobi City')
+        self.assertEqual(response.data['questions'][3]['question_text'], 'Water boils at _____ degrees Celsius.')
+
+    def test_csv_upload(self):
+        csv_file = SimpleUploadedFile('bank.csv', (
+            'question_type,question_text,points,options,answer\n'
+            'MCQ,2 + 2?,2,4|5|22,1\n'
+            'TF,Sky is blue,1,,true\n'
+        ).encode())
+        response = self.client.post('/api/questions/import/', {'assessment': self.assessment.id, 'file': csv_file})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(QuestionOption.objects.get(option_text='4').is_correct)
+        self.assertTrue(Answer.objects.get(question__question_text='Sky is blue').is_correct_for_tf)
+
+    def test_invalid_rows_reported_and_nothing_created(self):
+        response = self.client.post('/api/questions/import/', {
+            'assessment': self.assessment.id,
+            'questions': [
+                {'question_text': 'Fine', 'question_type': 'ESSAY'},
+                {'question_text': 'No key', 'question_type': 'MCQ', 'options': [{'option_text': 'a'}, {'option_text': 'b'}]},
+                {'question_text': '', 'question_type': 'ESSAY', 'points': -1},
+                {'question_text': 'Colour?', 'question_type': 'SHORT', 'correct_answers': [{'answer_text': 're:colou(r'}]},
+            ]
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual([e['row'] for e in response.data['errors']], [2, 3, 4])
+        self.assertEqual(Question.objects.count(), 1)
+
+    def test_students_cannot_import(self):
+        student = create_user('student')
+        self.client.force_authenticate(user=student)
+        response = self.client.post('/api/questions/import/', {'assessment': self.assessment.id, 'questions': []}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_string_flags_are_parsed(self):
+        import_questions(self.assessment, [{
+            'question_text': 'Pick', 'question_type': 'MCQ',
+            'options': [{'option_text': 'a', 'is_correct': 'false'}, {'option_text': 'b', 'is_correct': 'true'}]
+        }])
+        self.assertEqual(list(QuestionOption.objects.order_by('option_text').values_list('is_correct', flat=True)),
+                         [False, True])
+
+    def test_trainers_only_import_into_their_units(self):
+        other = create_user('other', 'Trainer')
+        self.client.force_authenticate(user=other)
+        response = self.client.post('/api/questions/import/', {
+            'assessment': self.assessment.id, 'questions': [{'question_text': 'Q', 'question_type': 'ESSAY'}]
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(Question.objects.count(), 1)
+
+    def test_bad_flags_and_out_of_range_numbers_are_row_errors(self):
+        response = self.client.post('/api/questions/import/', {
+            'assessment': self.assessment.id,
+            'questions': [
+                {'question_text': 'Short', 'question_type': 'SHORT',
+                 'correct_answers': [{'answer_text': 'x', 'is_correct_for_tf': 'maybe'}]},
+                {'question_text': 'Huge', 'question_type': 'ESSAY', 'points': 10 ** 12},
+                {'question_text': 'Far', 'question_type': 'ESSAY', 'order': 2 ** 31},
+                {'question_text': 'Sky', 'question_type': 'TF', 'correct_answers': [{'is_correct_for_tf': 'maybe'}]},
+            ]
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual([e['row'] for e in response.data['errors']], [2, 3, 4])
+        self.assertEqual(Question.objects.count(), 1)
+
+        import_questions(self.assessment, [
+            {'question_text': 'Short', 'question_type': 'SHORT',
+             'correct_answers': [{'answer_text': 'x', 'is_correct_for_tf': 'maybe'}]},
+            {'question_text': 'Sky', 'question_type': 'TF', 'correct_answers': [{'is_correct_for_tf': 'false'}]},
+        ])
+        self.assertIsNone(Answer.objects.get(question__question_text='Short').is_correct_for_tf)
+        self.assertIs(Answer.objects.get(question__question_text='Sky').is_correct_for_tf, False)
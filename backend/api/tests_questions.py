@@ -0,0 +1,86 @@
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+from core.utils.papers import get_paper
+from core.models import Assessment, Question, QuestionOption, Answer, StudentAnswer, Submission
+from core.testing import create_user, create_course_group, create_unit
+
+class QuestionNestedUpdateTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.trainer = create_user('trainer', 'Trainer')
+        student = create_user('student')
+
+        course_group = create_course_group()
+        unit = create_unit(course_group)
+        self.assessment = Assessment.objects.create(
+            unit=unit, assessment_type='CAT', title='CAT 1', points=10, due_date=timezone.now(), is_approved=True
+        )
+        self.client.force_authenticate(user=self.trainer)
+
+        response = self.client.post('/api/questions/', {
+            'assessment': self.assessment.id, 'question_text': '2 + 2?', 'question_type': 'MCQ', 'points': 2, 'order': 1,
+            'options': [
+                {'option_text': '4', 'is_correct': True, 'order': 1},
+                {'option_text': '5', 'is_correct': False, 'order': 2},
+                {'option_text': '22', 'is_correct': False, 'order': 3},
+            ],
+            'correct_answers': []
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.question_id = response.data['id']
+        self.options = response.data['options']
+
+        submission = Submission.objects.create(assessment=self.assessment, student=student)
+        self.student_answer = StudentAnswer.objects.create(
+            submission=submission, question_id=self.question_id, selected_option_id=self.options[0]['id']
+        )
+
+    def put(self, options, **extra):
+        return self.client.put(f'/api/questions/{self.question_id}/', {
+            'assessment': self.assessment.id, 'question_text': '2 + 2?', 'question_type': 'MCQ', 'points': 2, 'order': 1,
+            'options': options, **extra
+        }, format='json')
+
+    def test_update_keeps_unchanged_options(self):
+        four, five, _ = self.options
+        get_paper(self.assessment.id)
+
+        response = self.put([
+            {'id': four['id'], 'option_text': '4', 'is_correct': True, 'order': 1},
+            {'id': five['id'], 'option_text': 'Five', 'is_correct': False, 'order': 2},
+            {'option_text': '3', 'is_correct': False, 'order': 3},
+        ])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        options = list(QuestionOption.objects.filter(question_id=self.question_id).order_by('order'))
+        self.assertEqual([o.option_text for o in options], ['4', 'Five', '3'])
+        self.assertEqual(options[0].id, four['id'])
+        self.student_answer.refresh_from_db()
+        self.assertEqual(self.student_answer.selected_option_id, four['id'])
+
+        _, payload = get_paper(self.assessment.id)
+        self.assertEqual([o['option_text'] for o in payload['questions'][0]['options']], ['4', 'Five', '3'])
+
+    def test_omitted_lists_are_left_alone(self):
+        Answer.objects.create(question_id=self.question_id, answer_text='four')
+        response = self.client.patch(f'/api/questions/{self.question_id}/', {'points': 3}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(QuestionOption.objects.filter(question_id=self.question_id).count(), 3)
+        self.assertEqual(Answer.objects.filter(question_id=self.question_id).count(), 1)
+
+    def test_rejects_options_of_other_questions(self):
+        other = Question.objects.create(assessment=self.assessment, question_text='Other', question_type='MCQ', points=1, order=2)
+        foreign = QuestionOption.objects.create(question=other, option_text='x', order=1)
+        response = self.put([{'id': foreign.id, 'option_text': 'hijacked', 'is_correct': True, 'order': 1}])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        foreign.refresh_from_db()
+        self.assertEqual(foreign.option_text, 'x')
+        self.assertEqual(QuestionOption.objects.filter(question_id=self.question_id).count(), 3)
+
+    def test_rejects_invalid_answer_patterns(self):
+        response = self.put([], question_type='SHORT', correct_answers=[{'answer_text': 'colour\nre:colou(r'}])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('correct_answers', response.data)
+        self.assertFalse(Answer.objects.filter(question_id=self.question_id).exists())
@@ -0,0 +1,101 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+from core.utils.minhash import estimated_similarity, minhash_signature
+from core.models import Assessment, Submission, StudentEnrollment, SubmissionSignature, SimilarityMatch
+from core.testing import create_user, create_course_group, create_unit
+
+ESSAY = (
+    'Photosynthesis is the process by which green plants use sunlight to make food from carbon dioxide '
+    'and water. It takes place in the chloroplasts, which contain chlorophyll, the pigment that absorbs light. '
+    'The light reactions split water and release oxygen, while the Calvin cycle fixes carbon into glucose. '
+    'Without photosynthesis there would be no oxygen in the atmosphere and no food for animals.'
+)
+OTHER = (
+    'Cellular respiration breaks glucose down in the mitochondria to release energy as ATP. Glycolysis happens '
+    'in the cytoplasm, then the Krebs cycle and the electron transport chain complete the process, producing '
+    'carbon dioxide and water as waste products that the organism must remove.'
+)
+
+
+@override_settings(SIMILARITY_WORKERS=0)
+class SimilarityTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.trainer = create_user('trainer', 'Trainer')
+        course_group = create_course_group()
+        unit = create_unit(course_group)
+        self.assessment = Assessment.objects.create(
+            unit=unit, assessment_type='Assignment', title='Essay', points=10, due_date=timezone.now(), is_approved=True
+        )
+        self.students = []
+        for i in range(3):
+            student = create_user(f'student{i}')
+            StudentEnrollment.objects.create(student=student, course_group=course_group)
+            self.students.append(student)
+
+    def _submit(self, student, content):
+        self.client.force_authenticate(user=student)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/submissions/', {'assessment': self.assessment.id, 'content': content})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response.data['id']
+
+    def test_signature_estimates_jaccard(self):
+        signature, shingles = minhash_signature(ESSAY)
+        self.assertEqual(shingles, len(ESSAY.split()) - 4)
+        self.assertEqual(estimated_similarity(signature, minhash_signature(ESSAY.upper())[0]), 1.0)
+        self.assertLess(estimated_similarity(signature, minhash_signature(OTHER)[0]), 0.2)
+        self.assertEqual(minhash_signature('  '), ([], 0))
+
+    def test_near_copies_reported_as_a_cluster(self):
+        original = self._submit(self.students[0], ESSAY)
+        copy = self._submit(self.students[1], ESSAY.replace('green plants', 'plants'))
+        self._submit(self.students[2], OTHER)
+        self.assertEqual(SubmissionSignature.objects.filter(assessment=self.assessment).count(), 3)
+
+        self.client.force_authenticate(user=self.trainer)
+        response = self.client.get(f'/api/assessments/{self.assessment.id}/similarity/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['clusters']), 1)
+        cluster = response.data['clusters'][0]
+        self.assertEqual([s['id'] for s in cluster['submissions']], [original, copy])
+        self.assertGreater(cluster['max_similarity'], 0.7)
+
+        response = self.client.get(f'/api/assessments/{self.assessment.id}/similarity/', {'threshold': 0.99})
+        self.assertEqual(response.data['clusters'], [])
+
+    def test_short_texts_never_match(self):
+        self._submit(self.students[0], 'N/A')
+        self._submit(self.students[1], 'n/a')
+        self.assertEqual(list(SubmissionSignature.objects.values_list('minhash', flat=True)), [[], []])
+        self.assertFalse(SimilarityMatch.objects.exists())
+
+    def test_edited_submissions_are_fingerprinted_again(self):
+        self._submit(self.students[0], ESSAY)
+        submission_id = self._submit(self.students[1], OTHER)
+        self.assertFalse(SimilarityMatch.objects.exists())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.put(f'/api/submissions/{submission_id}/', {
+                'assessment': self.assessment.id, 'content': ESSAY
+            })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(SimilarityMatch.objects.filter(submission_b_id=submission_id).exists())
+
+    @override_settings(SIMILARITY_WORKERS=2)
+    def test_backfill_command_uses_process_pool(self):
+        for student, content in zip(self.students, (ESSAY, ESSAY, OTHER)):
+            Submission.objects.create(assessment=self.assessment, student=student, content=content)
+        out = StringIO()
+        call_command('fingerprint_submissions', self.assessment.id, stdout=out)
+        self.assertIn('3 submissions fingerprinted, 1 matches recorded', out.getvalue())
+
+    def test_students_cannot_see_report(self):
+        self.client.force_authenticate(user=self.students[0])
+        response = self.client.get(f'/api/assessments/{self.assessment.id}/similarity/')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
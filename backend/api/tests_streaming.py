@@ -0,0 +1,46 @@
+import json
+from unittest import mock
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+from rest_framework import status
+from api.views import UserViewSet
+from core.models import StudentEnrollment
+from core.testing import create_user, create_course_group
+
+User = get_user_model()
+
+class StreamingListTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = create_user('admin', 'Admin')
+
+        self.course_group = create_course_group()
+
+        for i in range(5):
+            student = create_user(f'student{i}', is_activated=False)
+            StudentEnrollment.objects.create(student=student, course_group=self.course_group)
+
+        self.client.force_authenticate(user=self.admin)
+
+    def _stream_json(self, response):
+        return json.loads(b''.join(response.streaming_content))
+
+    def test_streamed_list_matches_regular_list(self):
+        regular = self.client.get('/api/student-enrollments/')
+        streamed = self.client.get('/api/student-enrollments/?stream=true')
+        self.assertEqual(streamed.status_code, status.HTTP_200_OK)
+        self.assertTrue(streamed.streaming)
+        self.assertEqual(
+            sorted(row['id'] for row in self._stream_json(streamed)),
+            sorted(row['id'] for row in regular.data)
+        )
+
+    def test_stream_spans_multiple_chunks(self):
+        with mock.patch.object(UserViewSet, 'stream_chunk_size', 2):
+            response = self.client.get('/api/users/?stream=true')
+        self.assertEqual(len(self._stream_json(response)), User.objects.count())
+
+    def test_empty_stream_is_valid_json(self):
+        response = self.client.get('/api/attendance/?stream=true')
+        self.assertEqual(self._stream_json(response), [])
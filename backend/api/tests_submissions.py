@@ -0,0 +1,47 @@
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+from core.utils.grading import grade_submission
+from core.models import Assessment, Question, Submission
+from core.testing import create_user, create_course_group, create_unit
+
+class SubmissionListTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.trainer = create_user('trainer', 'Trainer')
+        self.other_trainer = create_user('other', 'Trainer')
+        course_group = create_course_group()
+        self.unit = create_unit(course_group, name='Unit 1', trainer=self.trainer)
+        other_unit = create_unit(course_group, name='Unit 2', code='TU-102', trainer=self.other_trainer)
+
+        self.assessment = Assessment.objects.create(unit=self.unit, assessment_type='CAT', title='CAT 1', points=10, due_date=timezone.now(), is_approved=True)
+        question = Question.objects.create(assessment=self.assessment, question_text='Explain', question_type='ESSAY', points=5, order=1)
+        other_assessment = Assessment.objects.create(unit=other_unit, assessment_type='CAT', title='CAT 2', points=10, due_date=timezone.now(), is_approved=True)
+
+        self.submissions = []
+        for i in range(3):
+            student = create_user(f'student{i}')
+            submission = Submission.objects.create(assessment=self.assessment, student=student, is_graded=i == 0, is_late=i == 2)
+            grade_submission(submission, [{'question_id': question.id, 'answer_text': 'Because'}])
+            self.submissions.append(submission)
+        self.foreign = Submission.objects.create(assessment=other_assessment, student=student)
+        self.client.force_authenticate(user=self.trainer)
+
+    def test_list_is_scoped_and_has_no_answers(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/submissions/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual({s['id'] for s in response.data}, {s.id for s in self.submissions})
+        self.assertNotIn('student_answers', response.data[0])
+        self.assertEqual({s['status'] for s in response.data}, {'graded', 'submitted', 'late'})
+
+        detail = self.client.get(f'/api/submissions/{self.submissions[0].id}/')
+        self.assertEqual(len(detail.data['student_answers']), 1)
+        self.assertEqual(self.client.get(f'/api/submissions/{self.foreign.id}/').status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_filters(self):
+        response = self.client.get('/api/submissions/', {'unit': self.unit.id, 'is_graded': 'false', 'is_late': 'true'})
+        self.assertEqual([s['id'] for s in response.data], [self.submissions[2].id])
+        response = self.client.get('/api/submissions/', {'assessment': self.assessment.id, 'is_graded': 'true'})
+        self.assertEqual([s['id'] for s in response.data], [self.submissions[0].id])
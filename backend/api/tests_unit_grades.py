@@ -0,0 +1,100 @@
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from core.utils.grading import apply_manual_grades
+from core.utils.unit_grades import refresh_unit_grades
+from core.models import Assessment, Question, StudentAnswer, StudentEnrollment, Submission, UnitGrade
+from core.testing import create_user, create_course_group, create_unit
+
+
+class UnitGradeTests(TestCase):
+    def setUp(self):
+        self.student = create_user('student')
+
+        self.course_group = create_course_group()
+        self.unit = create_unit(self.course_group, cat_total_points=30, assessment_total_points=20)
+
+        def assessment(assessment_type, title, points):
+            return Assessment.objects.create(unit=self.unit, assessment_type=assessment_type, title=title,
+                                             points=points, due_date=timezone.now(), is_approved=True)
+
+        self.cat1 = assessment('CAT', 'CAT 1', 10)
+        self.cat2 = assessment('CAT', 'CAT 2', 10)
+        self.project = assessment('Assignment', 'Project', 20)
+
+    def grade(self):
+        return UnitGrade.objects.get(student=self.student, unit=self.unit)
+
+    def test_enrolled_student_gets_an_empty_row(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            StudentEnrollment.objects.create(student=self.student, course_group=self.course_group)
+        grade = self.grade()
+        self.assertEqual((grade.cat_possible, grade.assessment_possible), (20, 20))
+        self.assertEqual((grade.total, grade.graded_count, grade.pending_count), (0, 0, 0))
+
+    def test_graded_submissions_are_scaled_to_the_unit_weights(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Submission.objects.create(assessment=self.cat1, student=self.student, grade=8, is_graded=True)
+            Submission.objects.create(assessment=self.project, student=self.student, grade=15, is_graded=True)
+            Submission.objects.create(assessment=self.cat2, student=self.student)
+        grade = self.grade()
+        self.assertEqual(grade.cat_earned, Decimal('8'))
+        self.assertEqual(grade.cat_score, Decimal('12.00'))  # 8 / 20 * 30
+        self.assertEqual(grade.assessment_score, Decimal('15.00'))  # 15 / 20 * 20
+        self.assertEqual(grade.total, Decimal('27.00'))
+        self.assertEqual((grade.graded_count, grade.pending_count), (2, 1))
+
+        # Deactivating an assessment takes it out of every student's result
+        with self.captureOnCommitCallbacks(execute=True):
+            self.cat2.is_active = False
+            self.cat2.save()
+        self.assertEqual(self.grade().cat_score, Decimal('24.00'))
+
+    def test_bulk_manual_grading_updates_the_row(self):
+        question = Question.objects.create(assessment=self.cat1, question_text='Explain', question_type='ESSAY', points=10, order=1)
+        with self.captureOnCommitCallbacks(execute=True):
+            submission = Submission.objects.create(assessment=self.cat1, student=self.student)
+            answer = StudentAnswer.objects.create(submission=submission, question=question, answer_text='Because')
+        self.assertEqual(self.grade().pending_count, 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            apply_manual_grades([{'answer_id': answer.id, 'points_earned': 5}])
+        grade = self.grade()
+        self.assertEqual(grade.cat_score, Decimal('7.50'))
+        self.assertEqual((grade.graded_count, grade.pending_count), (1, 0))
+
+    def test_only_grade_inputs_schedule_a_unit_refresh(self):
+        def refreshed_units(change):
+            with mock.patch('core.signals.schedule_refresh') as schedule:
+                change()
+            return [call.args[1] for call in schedule.call_args_list if call.args[0] is refresh_unit_grades]
+
+        self.cat1.title = 'CAT 1 (renamed)'
+        self.assertEqual(refreshed_units(self.cat1.save), [])
+        self.unit.name = 'Renamed Unit'
+        self.assertEqual(refreshed_units(self.unit.save), [])
+        self.assertEqual(refreshed_units(lambda: self.cat1.save(update_fields=['title'])), [])
+
+        self.cat1.points = 15
+        self.assertEqual(refreshed_units(self.cat1.save), [self.unit.pk])
+        self.unit.cat_total_points = 40
+        self.assertEqual(refreshed_units(self.unit.save), [self.unit.pk])
+
+        other = create_unit(self.course_group, name='Other Unit', code='OU-101')
+        self.cat2.unit = other
+        self.assertEqual(sorted(refreshed_units(self.cat2.save)), sorted([self.unit.pk, other.pk]))
+        self.assertEqual(refreshed_units(self.project.delete), [self.unit.pk])
+
+    def test_rebuild_command_recomputes_everything(self):
+        Submission.objects.create(assessment=self.cat1, student=self.student, grade=10, is_graded=True)
+        # No commit callbacks ran, so nothing was materialized yet
+        self.assertFalse(UnitGrade.objects.exists())
+
+        out = StringIO()
+        call_command('rebuild_unit_grades', stdout=out)
+        self.assertIn('1 grades rebuilt across 1 units', out.getvalue())
+        self.assertEqual(self.grade().cat_score, Decimal('15.00'))
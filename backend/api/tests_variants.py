@@ -0,0 +1,66 @@
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+from core.models import Assessment, Question, QuestionOption, StudentEnrollment, Submission
+from core.testing import create_user, create_course_group, create_unit
+
+class AssessmentVariantTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.alice = create_user('alice')
+        self.bob = create_user('bob')
+
+        course_group = create_course_group()
+        unit = create_unit(course_group)
+        for student in (self.alice, self.bob):
+            StudentEnrollment.objects.create(student=student, course_group=course_group)
+
+        self.assessment = Assessment.objects.create(
+            unit=unit, assessment_type='CAT', title='CAT 1', points=10, due_date=timezone.now(), is_approved=True,
+            shuffle_questions=True, shuffle_options=True, questions_per_student=5
+        )
+        self.right_options = {}
+        for i in range(10):
+            question = Question.objects.create(assessment=self.assessment, question_text=f'Q{i}', question_type='MCQ', points=1, order=i + 1)
+            for j in range(4):
+                option = QuestionOption.objects.create(question=question, option_text=f'{i}-{j}', is_correct=j == 0, order=j + 1)
+                if j == 0:
+                    self.right_options[question.id] = option.id
+
+    def paper(self, student):
+        self.client.force_authenticate(user=student)
+        response = self.client.get(f'/api/assessments/{self.assessment.id}/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data['questions']
+
+    def test_each_student_gets_a_stable_variant(self):
+        alice_paper = self.paper(self.alice)
+        self.assertEqual(len(alice_paper), 5)
+        self.assertEqual(alice_paper, self.paper(self.alice))
+
+        bob_paper = self.paper(self.bob)
+        self.assertNotEqual([q['id'] for q in alice_paper], [q['id'] for q in bob_paper])
+        self.assertEqual(self.client.get(f'/api/assessments/{self.assessment.id}/paper/').data['questions'], bob_paper)
+
+        all_option_orders = [[o['order'] for o in q['options']] for q in alice_paper + bob_paper]
+        self.assertTrue(any(order != [1, 2, 3, 4] for order in all_option_orders))
+
+    def test_grading_follows_the_students_variant(self):
+        questions = self.paper(self.alice)
+        submission = Submission.objects.create(assessment=self.assessment, student=self.alice)
+        answers = [{'question_id': q['id'], 'selected_option_id': self.right_options[q['id']]} for q in questions]
+
+        served = {q['id'] for q in questions}
+        other = next(qid for qid in self.right_options if qid not in served)
+        response = self.client.post('/api/student-answers/submit_answers/', {
+            'submission_id': submission.id,
+            'answers': answers + [{'question_id': other, 'selected_option_id': self.right_options[other]}]
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.post('/api/student-answers/submit_answers/', {
+            'submission_id': submission.id, 'answers': answers
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['auto_graded_score'], 5)
@@ -0,0 +1,41 @@
+import unittest
+from django.test import TestCase
+from rest_framework.test import APIClient
+from rest_framework import status
+from core.models import School
+from core.testing import create_user
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+@unittest.skipUnless(msgpack, 'msgpack is not installed')
+class MessagePackFormatTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = create_user('admin', 'Admin')
+        School.objects.create(name='Test School', description='Main campus')
+        self.client.force_authenticate(user=self.admin)
+
+    def test_json_is_default(self):
+        response = self.client.get('/api/schools/')
+        self.assertEqual(response['Content-Type'], 'application/json')
+
+    def test_msgpack_response(self):
+        response = self.client.get('/api/schools/', HTTP_ACCEPT='application/msgpack')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/msgpack')
+        data = msgpack.unpackb(response.content, raw=False)
+        self.assertEqual(data[0]['name'], 'Test School')
+
+    def test_msgpack_request_body(self):
+        response = self.client.post(
+            '/api/schools/',
+            data=msgpack.packb({'name': 'Second School', 'description': ''}),
+            content_type='application/msgpack',
+            HTTP_ACCEPT='application/msgpack'
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(msgpack.unpackb(response.content, raw=False)['name'], 'Second School')
+        self.assertTrue(School.objects.filter(name='Second School').exists())
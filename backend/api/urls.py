@@ -6,11 +6,12 @@ from .views import (
     ResourceViewSet, AssessmentViewSet, SubmissionViewSet,
     AttendanceViewSet, StudentEnrollmentViewSet, ModuleViewSet, LearningPathViewSet,
     AnnouncementViewSet, ForumTopicViewSet, ForumMessageViewSet, NotificationViewSet,
-    LessonPlanActivityViewSet, ActivateLicenseView
+    LessonPlanActivityViewSet, RegradeJobViewSet, ActivateLicenseView
 )
 from .question_views import (
     QuestionViewSet, QuestionOptionViewSet, AnswerViewSet, StudentAnswerViewSet
 )
+from .batch_views import BatchView
 
 router = DefaultRouter()
 router.register(r'users', UserViewSet)
@@ -24,6 +25,7 @@ router.register(r'lessons', LessonViewSet)
 router.register(r'resources', ResourceViewSet)
 router.register(r'assessments', AssessmentViewSet)
 router.register(r'submissions', SubmissionViewSet)
+router.register(r'regrade-jobs', RegradeJobViewSet)
 router.register(r'attendance', AttendanceViewSet)
 router.register(r'student-enrollments', StudentEnrollmentViewSet)
 router.register(r'modules', ModuleViewSet)
@@ -40,5 +42,6 @@ router.register(r'lesson-plan-activities', LessonPlanActivityViewSet)
 
 urlpatterns = [
     path('license/activate/', ActivateLicenseView.as_view(), name='activate_license'),
+    path('batch/', BatchView.as_view(), name='batch'),
     path('', include(router.urls)),
 ]
@@ -2,33 +2,62 @@ import re
 from django.db import models
 from django.db.models import Sum, Q, Count, OuterRef, Exists, Value, IntegerField, BooleanField, Prefetch, Subquery
 from django.db.models.functions import Coalesce
+from django.core.cache import cache
 from django.utils import timezone
 import datetime
 from rest_framework import viewsets, permissions, status, filters
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from rest_framework.views import APIView
 from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.http import FileResponse, StreamingHttpResponse
 from core.models import (School, Course, Intake, Semester, CourseGroup, Unit, Lesson, Resource,
                           Assessment, Submission, Attendance, StudentEnrollment, Module, LearningPath,
                           Question, QuestionOption, Answer, StudentAnswer, Announcement, ForumTopic,
                           ForumMessage, Notification, StudentLessonProgress, LessonPlanActivity,
-                          StudentResourceProgress, StudentAssessmentProgress)
+                          StudentResourceProgress, StudentAssessmentProgress, RegradeJob,
+                          assessment_window_flags, assessment_availability, availability_expression,
+                          AVAILABILITY_CLOSED)
 from .serializers import (
     UserSerializer, StudentRegistrationSerializer, SchoolSerializer, CourseSerializer, IntakeSerializer,
     SemesterSerializer, CourseGroupSerializer, UnitListSerializer, UnitSerializer, LessonSerializer,
-    ResourceSerializer, AssessmentSerializer, SubmissionSerializer,
-    AttendanceSerializer, StudentEnrollmentSerializer, ModuleSerializer, LearningPathSerializer,
+    ResourceSerializer, AssessmentSerializer, StudentAssessmentSerializer, StudentUnitSerializer, SubmissionSerializer,
+    SubmissionListSerializer, AttendanceSerializer, StudentEnrollmentSerializer, ModuleSerializer, LearningPathSerializer,
     QuestionSerializer, QuestionOptionSerializer, AnswerSerializer, StudentAnswerSerializer,
     AnnouncementSerializer, ForumTopicSerializer, ForumMessageSerializer, NotificationSerializer,
-    LessonPlanActivitySerializer
+    LessonPlanActivitySerializer, RegradeJobSerializer
 )
 from .permissions import IsAdmin, IsCourseMaster, IsHOD, IsTrainer, IsStudent, IsStaff
+from .filters import AvailabilityFilterBackend
+from .streaming import StreamingListMixin, wants_stream
+from core.utils.attendance import (attendance_buffer, attendance_matrix_rows, below_threshold,
+                                   cached_attendance_matrix, parse_attendance_records, upsert_attendance)
+from core.utils.gradebook import cached_gradebook, gradebook_xlsx, iter_csv, iter_gradebook_csv
+from core.utils.grading import apply_manual_grades
+from core.utils.papers import get_paper
+from core.utils.regrade import start_regrade
+from core.utils.scopes import student_course_group_ids
+from core.utils.similarity import schedule_fingerprint, similarity_report
+from core.utils.cache_versions import get_versions
+from core.utils.item_analysis import cached_item_analysis
+from core.utils.variants import student_paper
 
 User = get_user_model()
 
+UNIT_DETAIL_CACHE_TIMEOUT = 60 * 60
 
-class UserViewSet(viewsets.ModelViewSet):
+
+def unit_detail_cache_key(request, unit_id):
+    """Cache key for one student's view of a unit's detail."""
+    unit_version, progress_version = get_versions(('unit', unit_id), ('progress', request.user.id))
+    base_url = request.build_absolute_uri('/')
+    return f'unit-detail:{unit_id}:{unit_version}:{request.user.id}:{progress_version}:{base_url}'
+
+
+class UserViewSet(StreamingListMixin, viewsets.ModelViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [IsAdmin]
@@ -160,6 +189,8 @@ class UnitViewSet(viewsets.ModelViewSet):
     def get_serializer_class(self):
         if self.action == 'list':
             return UnitListSerializer
+        if getattr(self.request.user, 'role', None) == 'Student':
+            return StudentUnitSerializer
         return UnitSerializer
 
     def get_queryset(self):
@@ -236,10 +267,7 @@ class UnitViewSet(viewsets.ModelViewSet):
         # 3. Role-specific logic
         if user.role == 'Student':
             # Students only see units in their active course groups
-            queryset = queryset.filter(
-                course_group__enrolled_students__student=user,
-                course_group__enrolled_students__is_active=True
-            )
+            queryset = queryset.filter(course_group_id__in=student_course_group_ids(user.id))
 
             queryset = queryset.annotate(
                 annotated_lessons_completed=Coalesce(
@@ -278,7 +306,10 @@ class UnitViewSet(viewsets.ModelViewSet):
             # Add deep prefetch for detailed view and updates
             # For students, we ONLY prefetch approved lessons and approved assessments
             lesson_qs = Lesson.objects.select_related('trainer', 'unit', 'module')
-            assessment_qs = Assessment.objects.select_related('unit')
+            assessment_qs = Assessment.objects.select_related('unit').annotate(
+                annotated_availability=availability_expression(),
+                annotated_question_count=Count('questions', distinct=True)
+            )
             resource_qs = Resource.objects.all()
 
             if user.role == 'Student':
@@ -297,6 +328,30 @@ class UnitViewSet(viewsets.ModelViewSet):
 
         return queryset
 
+    def retrieve(self, request, *args, **kwargs):
+        user = request.user
+        if user.role != 'Student':
+            return super().retrieve(request, *args, **kwargs)
+
+        # Students get a cached copy of the unit detail, keyed on the versions of
+        # everything it is built from (unit content, their progress)
+        key = unit_detail_cache_key(request, kwargs['pk'])
+        data = cache.get(key)
+        if data is None:
+            data = super().retrieve(request, *args, **kwargs).data
+            cache.set(key, data, UNIT_DETAIL_CACHE_TIMEOUT)
+        elif data['course_group'] not in student_course_group_ids(user.id):
+            raise NotFound()
+
+        # is_available / can_submit depend on the clock, not on the cached content
+        now = timezone.now()
+        for assessment in data.get('assessments', []):
+            assessment['availability'] = assessment_availability(assessment, now)
+            (assessment['is_available'],
+             assessment['is_expired'],
+             assessment['can_submit']) = assessment_window_flags(assessment, now, assessment['availability'])
+        return Response(data)
+
     @action(detail=True, methods=['get'], permission_classes=[permissions.IsAuthenticated])
     def content_status(self, request, pk=None):
         """
@@ -352,6 +407,8 @@ class UnitViewSet(viewsets.ModelViewSet):
         return Response({'message': 'Enrollment successful'}, status=status.HTTP_201_CREATED)
 
     def get_permissions(self):
+        if self.action in ['gradebook', 'attendance']:
+            return [IsStaff()]
         if self.request.method in permissions.SAFE_METHODS:
             return [permissions.IsAuthenticated()]
         if self.action == 'enroll':
@@ -360,6 +417,58 @@ class UnitViewSet(viewsets.ModelViewSet):
             return [permissions.IsAuthenticated()]
         return [IsHOD()]
 
+    @action(detail=True, methods=['get'])
+    def gradebook(self, request, pk=None):
+        """
+        Students x assessments grades for the unit with weighted CAT and
+        assessment totals. ?export=csv or ?export=xlsx downloads it instead.
+        """
+        unit = self.get_object()
+        gradebook = cached_gradebook(unit)
+        export = request.query_params.get('export')
+        filename = f"gradebook-{re.sub(r'[^A-Za-z0-9_-]+', '-', unit.code)}"
+        if export == 'csv':
+            response = StreamingHttpResponse(iter_gradebook_csv(gradebook), content_type='text/csv')
+            response['Content-Disposition'] = f'attachment; filename="{filename}.csv"'
+            return response
+        if export == 'xlsx':
+            try:
+                output = gradebook_xlsx(gradebook)
+            except RuntimeError as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            return FileResponse(
+                output, as_attachment=True, filename=f'{filename}.xlsx',
+                content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+            )
+        if export:
+            return Response({'error': 'export must be csv or xlsx'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(gradebook)
+
+    @action(detail=True, methods=['get'])
+    def attendance(self, request, pk=None):
+        """
+        Enrolled students x lessons attendance for the unit with each
+        student's attendance percentage. ?threshold=75 keeps only students
+        below 75%; ?export=csv streams it as a download.
+        """
+        unit = self.get_object()
+        matrix = cached_attendance_matrix(unit)
+        threshold = request.query_params.get('threshold')
+        if threshold:
+            try:
+                matrix = below_threshold(matrix, float(threshold))
+            except ValueError:
+                return Response({'error': 'threshold must be a percentage'}, status=status.HTTP_400_BAD_REQUEST)
+        export = request.query_params.get('export')
+        if export == 'csv':
+            filename = f"attendance-{re.sub(r'[^A-Za-z0-9_-]+', '-', unit.code)}"
+            response = StreamingHttpResponse(iter_csv(attendance_matrix_rows(matrix)), content_type='text/csv')
+            response['Content-Disposition'] = f'attachment; filename="{filename}.csv"'
+            return response
+        if export:
+            return Response({'error': 'export must be csv'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(matrix)
+
     @action(detail=True, methods=['post'])
     def generate_cats(self, request, pk=None):
         unit = self.get_object()
@@ -435,9 +544,8 @@ class LessonViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(
                 is_approved=True, 
                 is_active=True,
-                unit__course_group__enrolled_students__student=user,
-                unit__course_group__enrolled_students__is_active=True
-            ).distinct()
+                unit__course_group_id__in=student_course_group_ids(user.id)
+            )
 
         if self.action == 'list':
             # Resources prefetch also needs to be filtered for students
@@ -446,9 +554,8 @@ class LessonViewSet(viewsets.ModelViewSet):
                 resource_qs = resource_qs.filter(
                     is_approved=True, 
                     is_active=True,
-                    lesson__unit__course_group__enrolled_students__student=user,
-                    lesson__unit__course_group__enrolled_students__is_active=True
-                ).distinct()
+                    lesson__unit__course_group_id__in=student_course_group_ids(user.id)
+                )
             queryset = queryset.prefetch_related(Prefetch('resources', queryset=resource_qs))
 
         return queryset
@@ -544,9 +651,8 @@ class ResourceViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(
                 is_approved=True, 
                 is_active=True,
-                lesson__unit__course_group__enrolled_students__student=user,
-                lesson__unit__course_group__enrolled_students__is_active=True
-            ).distinct()
+                lesson__unit__course_group_id__in=student_course_group_ids(user.id)
+            )
         return queryset
 
     def get_permissions(self):
@@ -596,6 +702,7 @@ class ResourceViewSet(viewsets.ModelViewSet):
 class AssessmentViewSet(viewsets.ModelViewSet):
     queryset = Assessment.objects.all()
     serializer_class = AssessmentSerializer
+    filter_backends = [*api_settings.DEFAULT_FILTER_BACKENDS, AvailabilityFilterBackend]
 
     def get_queryset(self):
         queryset = Assessment.objects.all().select_related('unit', 'module')
@@ -606,29 +713,103 @@ class AssessmentViewSet(viewsets.ModelViewSet):
         if module_id is not None:
             queryset = queryset.filter(module_id=module_id)
 
+        # Window state and question count are computed by the database, not per row
+        queryset = queryset.annotate(
+            annotated_availability=availability_expression(),
+            annotated_question_count=Count('questions', distinct=True)
+        )
+
         # Students only see available (not expired) assessments
         user = self.request.user
         if user.is_authenticated and user.role == 'Student':
-            now = timezone.now()
             queryset = queryset.filter(
                 is_approved=True, 
                 is_active=True,
-                unit__course_group__enrolled_students__student=user,
-                unit__course_group__enrolled_students__is_active=True
-            ).distinct()
-            queryset = queryset.exclude(
-                scheduled_end__isnull=False,
-                scheduled_end__lt=now,
-                allow_late_submission=False
-            )
+                unit__course_group_id__in=student_course_group_ids(user.id)
+            ).exclude(annotated_availability=AVAILABILITY_CLOSED)
 
         return queryset
 
     def get_permissions(self):
+        if self.action in ['item_analysis', 'similarity']:
+            return [IsStaff()]
         if self.request.method in permissions.SAFE_METHODS:
             return [permissions.IsAuthenticated()]
         return [IsStaff()]
 
+    def get_serializer_class(self):
+        if getattr(self.request.user, 'role', None) == 'Student':
+            return StudentAssessmentSerializer
+        return AssessmentSerializer
+
+    def _paper_questions(self, assessment_id):
+        """Questions from the precompiled student-safe paper, with absolute image URLs."""
+        version, payload = get_paper(assessment_id)
+        questions = payload['questions']
+        if any(q['image'] for q in questions):
+            questions = [
+                {**q, 'image': self.request.build_absolute_uri(q['image'])} if q['image'] else q
+                for q in questions
+            ]
+        return version, questions
+
+    def retrieve(self, request, *args, **kwargs):
+        response = super().retrieve(request, *args, **kwargs)
+        if request.user.role == 'Student':
+            # Serve the shared snapshot instead of re-serializing every question
+            # (this also keeps answer keys away from students)
+            version, questions = self._paper_questions(response.data['id'])
+            response.data['questions'] = student_paper(response.data, request.user.id, questions)
+            response.data['paper_version'] = version
+        return response
+
+    @action(detail=True, methods=['get'], permission_classes=[permissions.IsAuthenticated])
+    def paper(self, request, pk=None):
+        """
+        Student-safe question paper (no correct answers), served from the stored
+        snapshot; students get their own shuffled/drawn variant of it.
+        """
+        assessment = self.get_object()
+        version, questions = self._paper_questions(assessment.id)
+        if request.user.role == 'Student':
+            questions = student_paper(assessment, request.user.id, questions)
+        return Response({'assessment': assessment.id, 'version': version, 'questions': questions})
+
+    @action(detail=True, methods=['get'])
+    def item_analysis(self, request, pk=None):
+        """
+        Per-question difficulty, discrimination and MCQ option picks, plus the
+        score distribution. Cached until a submission or answer changes.
+        """
+        assessment = self.get_object()
+        return Response(cached_item_analysis(assessment.id))
+
+    @action(detail=True, methods=['get'])
+    def similarity(self, request, pk=None):
+        """
+        Clusters of submissions with suspiciously similar text (content, file
+        text and long answers), from the matches recorded as they came in.
+        ?threshold= raises the minimum estimated similarity (0-1).
+        """
+        assessment = self.get_object()
+        try:
+            threshold = float(request.query_params.get('threshold') or 0)
+        except ValueError:
+            return Response({'error': 'threshold must be a number'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(similarity_report(assessment.id, threshold))
+
+    @action(detail=True, methods=['post'], permission_classes=[IsStaff])
+    def regrade(self, request, pk=None):
+        """
+        Re-score auto-graded answers against the current answer key.
+        Small cohorts are done before responding (200); larger ones run in the
+        background (202) - poll /api/regrade-jobs/{id}/ for progress.
+        """
+        assessment = self.get_object()
+        job = start_regrade(assessment, requested_by=request.user)
+        response_status = status.HTTP_202_ACCEPTED if job.status == 'Pending' else status.HTTP_200_OK
+        return Response(RegradeJobSerializer(job).data, status=response_status)
+
     @action(detail=True, methods=['post'], permission_classes=[IsHOD])
     def activate(self, request, pk=None):
         assessment = self.get_object()
@@ -666,19 +847,45 @@ class AssessmentViewSet(viewsets.ModelViewSet):
         return Response({'status': 'assessment marked incomplete'})
 
 
-class SubmissionViewSet(viewsets.ModelViewSet):
+class SubmissionViewSet(StreamingListMixin, viewsets.ModelViewSet):
     queryset = Submission.objects.all()
     serializer_class = SubmissionSerializer
 
     def get_permissions(self):
-        if self.request.method == 'PATCH':  # For grading
+        if self.request.method == 'PATCH' or self.action in ['grade_answers', 'bulk_grade']:  # For grading
             return [IsTrainer()]
         return [permissions.IsAuthenticated()]
 
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return SubmissionListSerializer
+        return SubmissionSerializer
+
     def get_queryset(self):
-        if self.request.user.role == 'Student':
-            return Submission.objects.filter(student=self.request.user)
-        return Submission.objects.all()
+        user = self.request.user
+        queryset = Submission.objects.select_related('student', 'assessment')
+        if user.role == 'Student':
+            queryset = queryset.filter(student=user)
+        elif user.role == 'Trainer':
+            # Trainers only see submissions for the units assigned to them
+            queryset = queryset.filter(assessment__unit__trainer=user)
+
+        if self.action == 'list':
+            params = self.request.query_params
+            if params.get('assessment', '').isdigit():
+                queryset = queryset.filter(assessment_id=params['assessment'])
+            if params.get('unit', '').isdigit():
+                queryset = queryset.filter(assessment__unit_id=params['unit'])
+            for flag in ('is_graded', 'is_late'):
+                value = params.get(flag, '').lower()
+                if value in ('true', '1', 'false', '0'):
+                    queryset = queryset.filter(**{flag: value in ('true', '1')})
+            return queryset.order_by('-submitted_at', '-id')
+
+        # Answers only load for a single submission (and the grading views)
+        return queryset.prefetch_related(
+            Prefetch('student_answers', queryset=StudentAnswer.objects.select_related('question', 'selected_option'))
+        )
 
     def perform_create(self, serializer):
         """Handle submission with automatic expiry check"""
@@ -725,9 +932,19 @@ class SubmissionViewSet(viewsets.ModelViewSet):
                 submission.feedback = 'Automatic zero: Submission after deadline'
                 submission.save()
 
+            schedule_fingerprint(submission.id)
             return submission
 
-        return serializer.save(student=self.request.user)
+        submission = serializer.save(student=self.request.user)
+        schedule_fingerprint(submission.id)
+        return submission
+
+    def perform_update(self, serializer):
+        submission = serializer.save()
+        # Grading doesn't change the text; an edited answer or file does
+        if {'content', 'file'} & set(serializer.validated_data):
+            schedule_fingerprint(submission.id)
+        return submission
 
     @action(detail=False, methods=['get'])
     def by_assessment(self, request):
@@ -736,9 +953,10 @@ class SubmissionViewSet(viewsets.ModelViewSet):
         if not assessment_id:
             return Response({'error': 'assessment_id required'}, status=status.HTTP_400_BAD_REQUEST)
 
-        submissions = Submission.objects.filter(
-            assessment_id=assessment_id
-        ).select_related('student', 'assessment')
+        submissions = self.get_queryset().filter(assessment_id=assessment_id)
+
+        if wants_stream(request):
+            return self.stream_queryset(submissions.order_by('id'))
 
         serializer = self.get_serializer(submissions, many=True)
         return Response(serializer.data)
@@ -747,48 +965,79 @@ class SubmissionViewSet(viewsets.ModelViewSet):
     def grade_answers(self, request, pk=None):
         """Grade specific answers and update final score"""
         submission = self.get_object()
-        graded_answers = request.data.get('graded_answers', [])
-        general_feedback = request.data.get('feedback', '')
-
-        for answer_data in graded_answers:
-            answer_id = answer_data.get('answer_id')
-            points_earned = answer_data.get('points_earned')
-            feedback = answer_data.get('feedback', '')
-
-            StudentAnswer.objects.filter(
-                id=answer_id,
-                submission=submission
-            ).update(
-                points_earned=points_earned,
-                feedback=feedback
+        try:
+            apply_manual_grades(
+                request.data.get('graded_answers', []),
+                submission_ids=[submission.id],
+                submission_feedback={submission.id: request.data.get('feedback', '')}
             )
+        except DjangoValidationError as e:
+            return Response({'error': e.messages}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Calculate final score (auto-graded + manual)
-        total_earned = StudentAnswer.objects.filter(
-            submission=submission
-        ).aggregate(total=Sum('points_earned'))['total'] or 0
+        submission.refresh_from_db()
+        return Response(self.get_serializer(submission).data)
 
-        submission.grade = total_earned
-        submission.feedback = general_feedback
-        submission.is_graded = True
-        submission.save()
+    @action(detail=False, methods=['post'])
+    def bulk_grade(self, request):
+        """
+        Grade answers across many submissions in one call, e.g. one question
+        for the whole class: {"graded_answers": [{"answer_id", "points_earned",
+        "feedback"}], "feedback": {"<submission id>": "..."}}. With
+        "assessment", every answer must belong to that assessment. Only the
+        submissions whose answers are marked are regraded; trainers can only
+        mark answers in their own units.
+        """
+        graded_answers = request.data.get('graded_answers', [])
+        submission_feedback = request.data.get('feedback') or {}
+        if not isinstance(submission_feedback, dict):
+            return Response({'error': ['feedback must map submission ids to text']}, status=status.HTTP_400_BAD_REQUEST)
+
+        assessment_id = request.data.get('assessment')
+        if assessment_id is not None and not str(assessment_id).isdigit():
+            return Response({'error': ['assessment must be an id']}, status=status.HTTP_400_BAD_REQUEST)
+        submission_feedback = {
+            int(submission_id): str(text) for submission_id, text in submission_feedback.items()
+            if str(submission_id).isdigit()
+        }
+        try:
+            graded = apply_manual_grades(
+                graded_answers,
+                assessment_id=int(assessment_id) if assessment_id is not None else None,
+                trainer_id=request.user.id if request.user.role == 'Trainer' else None,
+                submission_feedback=submission_feedback
+            )
+        except DjangoValidationError as e:
+            return Response({'error': e.messages}, status=status.HTTP_400_BAD_REQUEST)
 
-        return Response(self.get_serializer(submission).data)
+        submissions = Submission.objects.filter(id__in=graded).order_by('id').values('id', 'grade', 'feedback')
+        return Response({'graded_answers': len(graded_answers), 'submissions': list(submissions)})
 
 
-class AttendanceViewSet(viewsets.ModelViewSet):
+class AttendanceViewSet(StreamingListMixin, viewsets.ModelViewSet):
     queryset = Attendance.objects.all()
     serializer_class = AttendanceSerializer
 
+    def get_queryset(self):
+        queryset = Attendance.objects.all()
+        if self.action == 'list':
+            queryset = queryset.select_related('student', 'lesson', 'marked_by')
+        return queryset
+
     def get_permissions(self):
         if self.request.method in permissions.SAFE_METHODS:
             return [permissions.IsAuthenticated()]
-        if self.action in ['mark_auto', 'bulk_mark', 'bulk_auto_mark']:
+        if self.action == 'mark_auto':
             return [permissions.IsAuthenticated()]
         return [IsTrainer()]
 
     @action(detail=False, methods=['post'], permission_classes=[permissions.IsAuthenticated])
     def mark_auto(self, request):
+        """
+        Mark the student Present for a lesson they opened (or the lesson an
+        assessment is linked to). Repeat views are answered from memory and
+        first views are written in batches by the attendance buffer: 201 when
+        the mark was written, 202 while it is queued, 200 when already marked.
+        """
         lesson_id = request.data.get('lesson_id')
         assessment_id = request.data.get('assessment_id')
 
@@ -799,84 +1048,70 @@ class AttendanceViewSet(viewsets.ModelViewSet):
 
         # If assessment_id is provided, try to find the linked lesson
         if not target_lesson_id and assessment_id:
-            try:
-                assessment = Assessment.objects.get(id=assessment_id)
-                if assessment.lesson:
-                    target_lesson_id = assessment.lesson.id
-                else:
-                    if assessment.is_approved:
-                        return Response({'status': 'assessment view acknowledged (no linked lesson)'}, status=status.HTTP_200_OK)
-                    return Response({'error': 'assessment not approved'}, status=status.HTTP_400_BAD_REQUEST)
-            except Assessment.DoesNotExist:
+            assessment = Assessment.objects.filter(id=assessment_id).values('lesson_id', 'is_approved').first()
+            if assessment is None:
                 return Response({'error': 'assessment not found'}, status=status.HTTP_404_NOT_FOUND)
+            if not assessment['lesson_id']:
+                if assessment['is_approved']:
+                    return Response({'status': 'assessment view acknowledged (no linked lesson)'}, status=status.HTTP_200_OK)
+                return Response({'error': 'assessment not approved'}, status=status.HTTP_400_BAD_REQUEST)
+            target_lesson_id = assessment['lesson_id']
 
-        if not target_lesson_id:
+        try:
+            target_lesson_id = int(target_lesson_id)
+        except (TypeError, ValueError):
             return Response({'error': 'target lesson could not be determined'}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Mark attendance
-        attendance, created = Attendance.objects.get_or_create(
-            lesson_id=target_lesson_id,
-            student=request.user,
-            defaults={'status': 'Present', 'marked_by': None}  # Null marked_by means system-auto
-        )
-
-        if not created and attendance.status == 'Absent':
-            attendance.status = 'Present'
-            attendance.save()
+        # Only the first view per process reaches the database
+        marked_at = attendance_buffer.recorded(target_lesson_id, request.user.id)
+        created = False
+        if marked_at is None:
+            if not Lesson.objects.filter(id=target_lesson_id).exists():
+                return Response({'error': 'lesson not found'}, status=status.HTTP_404_NOT_FOUND)
+            marked_at, created = attendance_buffer.mark(target_lesson_id, request.user.id)
 
+        if created is None:
+            response_status = status.HTTP_202_ACCEPTED
+        else:
+            response_status = status.HTTP_201_CREATED if created else status.HTTP_200_OK
         return Response({
             'status': 'Present',
-            'marked_at': attendance.marked_at,
+            'marked_at': marked_at,
             'message': 'Attendance marked successfully'
-        }, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
+        }, status=response_status)
 
     @action(detail=False, methods=['post'], permission_classes=[IsTrainer])
     def bulk_mark(self, request):
+        """
+        Mark a class: {"records": [{"lesson", "student", "status"}, ...]}.
+        Upserted in one statement; responds with the saved rows.
+        """
         records = request.data.get('records', [])
-        if not records:
+        if not records or not isinstance(records, list):
             return Response({'error': 'No records provided'}, status=status.HTTP_400_BAD_REQUEST)
 
-        results = []
-        for record in records:
-            lesson_id = record.get('lesson')
-            student_id = record.get('student')
-            status_val = record.get('status', 'Present')
-
-            attendance, created = Attendance.objects.update_or_create(
-                lesson_id=lesson_id,
-                student_id=student_id,
-                defaults={'status': status_val, 'marked_by': request.user}
-            )
-            results.append(AttendanceSerializer(attendance).data)
-
-        return Response(results, status=status.HTTP_201_CREATED)
+        try:
+            rows = parse_attendance_records(records)
+        except DjangoValidationError as e:
+            return Response({'error': e.messages}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(upsert_attendance(rows, request.user.id), status=status.HTTP_201_CREATED)
 
     @action(detail=False, methods=['post'], permission_classes=[IsTrainer])
     def bulk_auto_mark(self, request):
+        """Mark every active student of the lesson's class Present, in one upsert."""
         lesson_id = request.data.get('lesson_id')
         if not lesson_id:
             return Response({'error': 'lesson_id required'}, status=status.HTTP_400_BAD_REQUEST)
 
-        try:
-            lesson = Lesson.objects.get(id=lesson_id)
-            # Find all students enrolled in the lesson's course group
-            enrollments = StudentEnrollment.objects.filter(
-                course_group=lesson.unit.course_group,
-                is_active=True
-            )
-
-            results = []
-            for enrollment in enrollments:
-                attendance, created = Attendance.objects.update_or_create(
-                    lesson=lesson,
-                    student=enrollment.student,
-                    defaults={'status': 'Present', 'marked_by': request.user}
-                )
-                results.append(AttendanceSerializer(attendance).data)
-
-            return Response(results, status=status.HTTP_201_CREATED)
-        except Lesson.DoesNotExist:
+        lesson = Lesson.objects.filter(id=lesson_id).select_related('unit').first()
+        if lesson is None:
             return Response({'error': 'Lesson not found'}, status=status.HTTP_404_NOT_FOUND)
+        student_ids = StudentEnrollment.objects.filter(
+            course_group_id=lesson.unit.course_group_id,
+            is_active=True
+        ).values_list('student_id', flat=True)
+        rows = [(lesson.id, student_id, 'Present') for student_id in student_ids]
+        return Response(upsert_attendance(rows, request.user.id), status=status.HTTP_201_CREATED)
 
     @action(detail=False, methods=['get'], permission_classes=[IsTrainer | IsAdmin])
     def attendance_report(self, request):
@@ -947,10 +1182,16 @@ class AttendanceViewSet(viewsets.ModelViewSet):
                 return Response({'error': 'assessment not found'}, status=status.HTTP_404_NOT_FOUND)
 
 
-class StudentEnrollmentViewSet(viewsets.ModelViewSet):
+class StudentEnrollmentViewSet(StreamingListMixin, viewsets.ModelViewSet):
     queryset = StudentEnrollment.objects.all()
     serializer_class = StudentEnrollmentSerializer
 
+    def get_queryset(self):
+        queryset = StudentEnrollment.objects.all()
+        if self.action == 'list':
+            queryset = queryset.select_related('student', 'course_group__course', 'course_group__intake')
+        return queryset
+
     def get_permissions(self):
         if self.request.method in permissions.SAFE_METHODS:
             return [permissions.IsAuthenticated()]
@@ -993,11 +1234,7 @@ class ForumTopicViewSet(viewsets.ModelViewSet):
         if unit_id:
             queryset = queryset.filter(unit_id=unit_id)
         elif user.is_authenticated and user.role == 'Student':
-            enrolled_course_groups = StudentEnrollment.objects.filter(
-                student=user,
-                is_active=True
-            ).values_list('course_group_id', flat=True)
-            queryset = queryset.filter(unit__course_group_id__in=enrolled_course_groups)
+            queryset = queryset.filter(unit__course_group_id__in=student_course_group_ids(user.id))
         elif user.is_authenticated and user.role == 'Trainer':
             queryset = queryset.filter(unit__trainer=user)
 
@@ -1028,6 +1265,19 @@ class ForumMessageViewSet(viewsets.ModelViewSet):
         serializer.save(user=self.request.user)
 
 
+class RegradeJobViewSet(viewsets.ReadOnlyModelViewSet):
+    queryset = RegradeJob.objects.all()
+    serializer_class = RegradeJobSerializer
+    permission_classes = [IsStaff]
+
+    def get_queryset(self):
+        queryset = RegradeJob.objects.all().select_related('assessment', 'requested_by')
+        assessment_id = self.request.query_params.get('assessment', None)
+        if assessment_id is not None:
+            queryset = queryset.filter(assessment_id=assessment_id)
+        return queryset
+
+
 class NotificationViewSet(viewsets.ModelViewSet):
     queryset = Notification.objects.all()
     serializer_class = NotificationSerializer
@@ -1190,12 +1440,7 @@ class NotificationViewSet(viewsets.ModelViewSet):
         now = timezone.now()
         upcoming_days = 14  # Show deadlines for next 14 days
 
-        enrollments = StudentEnrollment.objects.filter(
-            student=request.user,
-            is_active=True
-        ).select_related('course_group')
-
-        course_group_ids = [e.course_group_id for e in enrollments]
+        course_group_ids = student_course_group_ids(request.user.id)
 
         upcoming_cats = Assessment.objects.filter(
             unit__course_group_id__in=course_group_ids,
@@ -3,7 +3,8 @@ from .models import (
     User, School, Course, Intake, Semester, CourseGroup, Unit, Lesson, Resource,
     Assessment, Submission, Attendance, StudentEnrollment, Module, LearningPath,
     Question, QuestionOption, Answer, StudentAnswer, Announcement, ForumTopic,
-    ForumMessage, Notification, StudentLessonProgress, LessonPlanActivity, ProjectLicense
+    ForumMessage, Notification, StudentLessonProgress, LessonPlanActivity, ProjectLicense,
+    RegradeJob, SimilarityMatch, UnitGrade
 )
 
 # Register your models here.
@@ -37,3 +38,19 @@ admin.site.register(ForumMessage)
 admin.site.register(Notification)
 admin.site.register(StudentLessonProgress)
 admin.site.register(LessonPlanActivity)
+
+@admin.register(RegradeJob)
+class RegradeJobAdmin(admin.ModelAdmin):
+    list_display = ('assessment', 'status', 'processed_submissions', 'total_submissions', 'created_at')
+    list_filter = ('status',)
+
+@admin.register(SimilarityMatch)
+class SimilarityMatchAdmin(admin.ModelAdmin):
+    list_display = ('assessment', 'submission_a', 'submission_b', 'similarity', 'found_at')
+    raw_id_fields = ('submission_a', 'submission_b')
+
+@admin.register(UnitGrade)
+class UnitGradeAdmin(admin.ModelAdmin):
+    list_display = ('student', 'unit', 'cat_score', 'assessment_score', 'total', 'pending_count', 'updated_at')
+    list_filter = ('unit',)
+    raw_id_fields = ('student',)
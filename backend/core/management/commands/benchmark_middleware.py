@@ -0,0 +1,74 @@
+import time
+
+from django.conf import settings
+from django.core.handlers.base import BaseHandler
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory, override_settings
+
+# The stock middleware stack from before the API fast path
+FULL_STACK = [
+    'corsheaders.middleware.CorsMiddleware',
+    'django.middleware.security.SecurityMiddleware',
+    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.middleware.common.CommonMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+]
+
+# Identical in both stacks and hits the database, so it only adds noise
+EXCLUDED = ['core.middleware.LicenseMiddleware']
+
+
+class Command(BaseCommand):
+    help = 'Compare per-request middleware cost of the full stack against the configured API fast path'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path',
+            default='/api/',
+            help='Request path to benchmark (default: the API root)'
+        )
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=2000,
+            help='Number of requests per stack'
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        iterations = options['iterations']
+
+        configured = [m for m in settings.MIDDLEWARE if m not in EXCLUDED]
+        full_ms = self._time_stack(FULL_STACK, path, iterations)
+        fast_ms = self._time_stack(configured, path, iterations)
+
+        self.stdout.write(f'\n=== Middleware benchmark: GET {path} x {iterations} ===')
+        self.stdout.write(f'Full stack:       {full_ms * 1000:8.1f} us/request')
+        self.stdout.write(f'Configured stack: {fast_ms * 1000:8.1f} us/request')
+        saving = full_ms - fast_ms
+        percent = (saving / full_ms * 100) if full_ms else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'Saving:           {saving * 1000:8.1f} us/request ({percent:.1f}%)'
+        ))
+
+    def _time_stack(self, middleware, path, iterations):
+        """Average milliseconds per request through a handler built from `middleware`."""
+        factory = RequestFactory()
+        with override_settings(MIDDLEWARE=middleware):
+            handler = BaseHandler()
+            handler.load_middleware()
+
+            # Warm up URL resolution, lazy imports and caches
+            for _ in range(min(50, iterations)):
+                handler.get_response(factory.get(path))
+
+            start = time.perf_counter()
+            for _ in range(iterations):
+                handler.get_response(factory.get(path))
+            elapsed = time.perf_counter() - start
+
+        return elapsed / iterations * 1000
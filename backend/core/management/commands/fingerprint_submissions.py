@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import Assessment, Submission
+from core.utils.similarity import fingerprint_assessment
+
+
+class Command(BaseCommand):
+    help = 'Compute similarity signatures for submissions (backfill, or after changing the similarity settings)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'assessment_ids',
+            nargs='*',
+            type=int,
+            help='Assessments to fingerprint; with none, every assessment with unfingerprinted submissions'
+        )
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Recompute existing signatures too, not only missing ones'
+        )
+
+    def handle(self, *args, **options):
+        only_missing = not options['all']
+        assessment_ids = options['assessment_ids']
+        for assessment_id in assessment_ids:
+            if not Assessment.objects.filter(pk=assessment_id).exists():
+                raise CommandError(f'Assessment {assessment_id} does not exist')
+        if not assessment_ids:
+            assessment_ids = list(
+                Submission.objects.filter(signature__isnull=True)
+                .order_by('assessment_id').values_list('assessment_id', flat=True).distinct()
+            )
+
+        if not assessment_ids:
+            self.stdout.write('No submissions to fingerprint')
+            return
+
+        for assessment_id in assessment_ids:
+            submissions, matches = fingerprint_assessment(assessment_id, only_missing=only_missing)
+            self.stdout.write(self.style.SUCCESS(
+                f'Assessment {assessment_id}: {submissions} submissions fingerprinted, {matches} matches recorded'
+            ))
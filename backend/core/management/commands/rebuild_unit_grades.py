@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import Unit
+from core.utils.unit_grades import refresh_unit_grades
+
+
+class Command(BaseCommand):
+    help = 'Recompute the materialized per-student unit grades (after a data import or to repair drift)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'unit_ids',
+            nargs='*',
+            type=int,
+            help='Units to rebuild; with none, every unit'
+        )
+
+    def handle(self, *args, **options):
+        unit_ids = options['unit_ids']
+        for unit_id in unit_ids:
+            if not Unit.objects.filter(pk=unit_id).exists():
+                raise CommandError(f'Unit {unit_id} does not exist')
+        if not unit_ids:
+            unit_ids = list(Unit.objects.order_by('id').values_list('id', flat=True))
+
+        rows = 0
+        for unit_id in unit_ids:
+            rows += refresh_unit_grades(unit_id)
+        self.stdout.write(self.style.SUCCESS(f'{rows} grades rebuilt across {len(unit_ids)} units'))
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import Assessment, RegradeJob
+from core.utils.regrade import run_regrade_job
+
+
+class Command(BaseCommand):
+    help = 'Regrade auto-graded answers of the given assessments, or finish any pending regrade jobs'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'assessment_ids',
+            nargs='*',
+            type=int,
+            help='Assessments to regrade now; with none, run every pending RegradeJob'
+        )
+
+    def handle(self, *args, **options):
+        if options['assessment_ids']:
+            jobs = []
+            for assessment_id in options['assessment_ids']:
+                assessment = Assessment.objects.filter(pk=assessment_id).first()
+                if assessment is None:
+                    raise CommandError(f'Assessment {assessment_id} does not exist')
+                jobs.append(RegradeJob.objects.create(
+                    assessment=assessment, total_submissions=assessment.submissions.count()
+                ))
+        else:
+            jobs = list(RegradeJob.objects.filter(status='Pending').order_by('created_at'))
+
+        if not jobs:
+            self.stdout.write('No pending regrade jobs')
+            return
+
+        for job in jobs:
+            job = run_regrade_job(job)
+            message = (f'{job.assessment}: {job.status}, {job.processed_submissions}/{job.total_submissions} '
+                       f'submissions, {job.answers_changed} answers changed')
+            if job.status == 'Failed':
+                self.stderr.write(self.style.ERROR(f'{message} ({job.error})'))
+            else:
+                self.stdout.write(self.style.SUCCESS(message))
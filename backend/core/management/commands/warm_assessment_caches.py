@@ -0,0 +1,106 @@
+import time
+from datetime import timedelta
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.test import RequestFactory
+from django.utils import timezone
+from rest_framework.test import force_authenticate
+
+from core.models import Assessment, StudentEnrollment
+from core.utils.papers import get_paper
+from core.utils.scopes import student_course_group_ids
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Prebuild papers, unit detail and student scopes shortly before approved assessments open'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lead-minutes',
+            type=int,
+            default=15,
+            help='Start warming this many minutes before scheduled_start'
+        )
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=60,
+            help='Seconds between passes when looping'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Run a single pass and exit (e.g. from cron) instead of looping'
+        )
+        parser.add_argument(
+            '--base-url',
+            default=getattr(settings, 'PUBLIC_API_BASE_URL', 'http://localhost:8000'),
+            help='Scheme and host students use to reach the API; cached URLs are built from it'
+        )
+
+    def handle(self, *args, **options):
+        self.lead = timedelta(minutes=options['lead_minutes'])
+        base = urlsplit(options['base_url'])
+        self.host = base.netloc
+        self.secure = base.scheme == 'https'
+
+        # Imported here so the command can be loaded without pulling in the API
+        from api.views import UnitViewSet
+        self.unit_detail_view = UnitViewSet.as_view({'get': 'retrieve'})
+        self.factory = RequestFactory()
+
+        while True:
+            close_old_connections()
+            try:
+                self.warm_pass()
+            except Exception as e:
+                if options['once']:
+                    raise
+                self.stderr.write(f'Warm-up pass failed: {e}')
+            if options['once']:
+                break
+            time.sleep(options['interval'])
+
+    def warm_pass(self):
+        now = timezone.now()
+        upcoming = Assessment.objects.filter(
+            is_approved=True,
+            is_active=True,
+            scheduled_start__gt=now,
+            scheduled_start__lte=now + self.lead
+        ).select_related('unit')
+
+        for assessment in upcoming:
+            started = time.perf_counter()
+
+            get_paper(assessment.id)
+
+            student_ids = StudentEnrollment.objects.filter(
+                course_group_id=assessment.unit.course_group_id,
+                is_active=True
+            ).values_list('student_id', flat=True)
+            students = User.objects.filter(id__in=list(student_ids), role=User.STUDENT)
+
+            warmed = 0
+            for student in students:
+                student_course_group_ids(student.id)
+                if self.warm_unit_detail(student, assessment.unit_id):
+                    warmed += 1
+
+            self.stdout.write(
+                f'Warmed {assessment} (opens {assessment.scheduled_start:%Y-%m-%d %H:%M}): '
+                f'paper + {warmed} students in {time.perf_counter() - started:.1f}s'
+            )
+
+    def warm_unit_detail(self, student, unit_id):
+        """Request the unit detail in-process as the student so it lands in the cache exactly as served."""
+        request = self.factory.get(f'/api/units/{unit_id}/', HTTP_HOST=self.host, secure=self.secure)
+        force_authenticate(request, user=student)
+        response = self.unit_detail_view(request, pk=str(unit_id))
+        return response.status_code == 200
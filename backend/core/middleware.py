@@ -1,5 +1,9 @@
 from django.http import JsonResponse
 from django.urls import resolve
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.contrib.messages.middleware import MessageMiddleware
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.middleware.csrf import CsrfViewMiddleware
 
 class LicenseMiddleware:
     """
@@ -38,3 +42,43 @@ class LicenseMiddleware:
             }, status=403)
             
         return self.get_response(request)
+
+
+# API fast path
+# The API authenticates with JWT only (see REST_FRAMEWORK settings), so the
+# session, CSRF, auth and message middleware do nothing useful for /api/
+# requests. These subclasses skip themselves on /api/ and behave exactly like
+# the stock middleware everywhere else, so /admin/ keeps its full stack.
+# Subclassing (rather than wrapping) keeps Django's admin system checks happy.
+
+API_PATH_PREFIX = '/api/'
+
+
+def is_api_request(request):
+    return request.path_info.startswith(API_PATH_PREFIX)
+
+
+class APIExemptMixin:
+    def __call__(self, request):
+        if is_api_request(request):
+            return self.get_response(request)
+        return super().__call__(request)
+
+
+class APIExemptSessionMiddleware(APIExemptMixin, SessionMiddleware):
+    pass
+
+
+class APIExemptCsrfViewMiddleware(APIExemptMixin, CsrfViewMiddleware):
+    def process_view(self, request, callback, callback_args, callback_kwargs):
+        if is_api_request(request):
+            return None
+        return super().process_view(request, callback, callback_args, callback_kwargs)
+
+
+class APIExemptAuthenticationMiddleware(APIExemptMixin, AuthenticationMiddleware):
+    pass
+
+
+class APIExemptMessageMiddleware(APIExemptMixin, MessageMiddleware):
+    pass
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:59
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0022_assessment_created_at_assessment_updated_at_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AssessmentPaper',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveIntegerField(default=1)),
+                ('payload', models.JSONField(default=dict)),
+                ('is_stale', models.BooleanField(default=True)),
+                ('built_at', models.DateTimeField(auto_now=True)),
+                ('assessment', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='paper', to='core.assessment')),
+            ],
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:12
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0024_regradejob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DraftAnswer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('answer_text', models.TextField(blank=True)),
+                ('saved_at', models.DateTimeField()),
+                ('assessment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='draft_answers', to='core.assessment')),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='draft_answers', to='core.question')),
+                ('selected_option', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='core.questionoption')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='draft_answers', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('student', 'question')},
+            },
+        ),
+    ]
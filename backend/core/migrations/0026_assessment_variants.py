@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0025_draftanswer'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='assessment',
+            name='questions_per_student',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='assessment',
+            name='shuffle_options',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='assessment',
+            name='shuffle_questions',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:52
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0027_similarity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UnitGrade',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cat_earned', models.DecimalField(decimal_places=2, default=0, max_digits=8)),
+                ('cat_possible', models.PositiveIntegerField(default=0)),
+                ('cat_score', models.DecimalField(blank=True, decimal_places=2, max_digits=6, null=True)),
+                ('assessment_earned', models.DecimalField(decimal_places=2, default=0, max_digits=8)),
+                ('assessment_possible', models.PositiveIntegerField(default=0)),
+                ('assessment_score', models.DecimalField(blank=True, decimal_places=2, max_digits=6, null=True)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=6)),
+                ('graded_count', models.PositiveIntegerField(default=0)),
+                ('pending_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField()),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='unit_grades', to=settings.AUTH_USER_MODEL)),
+                ('unit', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='grades', to='core.unit')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['unit', 'total'], name='core_unitgr_unit_id_59f63a_idx')],
+                'unique_together': {('student', 'unit')},
+            },
+        ),
+    ]
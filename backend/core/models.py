@@ -281,6 +281,10 @@ class Assessment(models.Model):
     scheduled_start = models.DateTimeField(null=True, blank=True)
     scheduled_end = models.DateTimeField(null=True, blank=True)
     allow_late_submission = models.BooleanField(default=False)
+    # Per-student variants, derived from a seed rather than stored (core.utils.variants)
+    shuffle_questions = models.BooleanField(default=False)
+    shuffle_options = models.BooleanField(default=False)
+    questions_per_student = models.PositiveIntegerField(null=True, blank=True)
     is_approved = models.BooleanField(default=False)
     is_active = models.BooleanField(default=True)
     audit_feedback = models.TextField(blank=True)
@@ -291,31 +295,97 @@ class Assessment(models.Model):
         return f"{self.assessment_type}: {self.title} for {self.unit.name}"
     
     def is_available(self):
-        from django.utils import timezone
-        now = timezone.now()
-        if not self.scheduled_start:
-            return self.is_approved
-        return self.is_approved and now >= self.scheduled_start
+        return assessment_window_flags(self)[0]
     
     def is_expired(self):
-        from django.utils import timezone
-        now = timezone.now()
-        if not self.scheduled_end:
-            return False
-        return now > self.scheduled_end
+        return assessment_window_flags(self)[1]
     
     def can_submit(self):
-        if not self.is_approved:
-            return False
-        if not self.scheduled_start:
-            return True
-        from django.utils import timezone
-        now = timezone.now()
-        if now < self.scheduled_start:
-            return False
-        if self.scheduled_end and now > self.scheduled_end:
-            return self.allow_late_submission
-        return True
+        return assessment_window_flags(self)[2]
+
+
+# Where an assessment is in its submission window. The same rules exist in
+# Python (assessment_availability) and in SQL (availability_expression) so
+# lists can be filtered and sorted in the database.
+AVAILABILITY_UNAPPROVED = 'unapproved'
+AVAILABILITY_NOT_STARTED = 'not_started'
+AVAILABILITY_OPEN = 'open'
+AVAILABILITY_LATE = 'late'
+AVAILABILITY_CLOSED = 'closed'
+# Sort order for ?ordering=availability: what a student can act on first
+AVAILABILITY_STATES = [
+    AVAILABILITY_OPEN, AVAILABILITY_LATE, AVAILABILITY_NOT_STARTED, AVAILABILITY_CLOSED, AVAILABILITY_UNAPPROVED
+]
+SUBMITTABLE_STATES = {AVAILABILITY_OPEN, AVAILABILITY_LATE}
+
+
+def assessment_availability(assessment, now=None):
+    """
+    An assessment's window state, one of AVAILABILITY_STATES. Works on
+    Assessment instances and on serialized assessment dicts, so cached
+    payloads can refresh it without touching the DB.
+    """
+    from django.utils import timezone
+    from django.utils.dateparse import parse_datetime
+
+    def field(name):
+        value = assessment[name] if isinstance(assessment, dict) else getattr(assessment, name)
+        return parse_datetime(value) if isinstance(value, str) else value
+
+    now = now or timezone.now()
+    start = field('scheduled_start')
+    end = field('scheduled_end')
+    if not field('is_approved'):
+        return AVAILABILITY_UNAPPROVED
+    if start and now < start:
+        return AVAILABILITY_NOT_STARTED
+    if end and now > end:
+        return AVAILABILITY_LATE if field('allow_late_submission') else AVAILABILITY_CLOSED
+    return AVAILABILITY_OPEN
+
+
+def availability_expression(now=None):
+    """SQL counterpart of assessment_availability(), for annotate()."""
+    from django.utils import timezone
+
+    now = now or timezone.now()
+    return models.Case(
+        models.When(is_approved=False, then=models.Value(AVAILABILITY_UNAPPROVED)),
+        models.When(scheduled_start__gt=now, then=models.Value(AVAILABILITY_NOT_STARTED)),
+        models.When(scheduled_end__lt=now, allow_late_submission=True, then=models.Value(AVAILABILITY_LATE)),
+        models.When(scheduled_end__lt=now, then=models.Value(AVAILABILITY_CLOSED)),
+        default=models.Value(AVAILABILITY_OPEN),
+        output_field=models.CharField()
+    )
+
+
+def availability_rank_expression(field='annotated_availability'):
+    """Position of an annotated availability in AVAILABILITY_STATES, for order_by()."""
+    return models.Case(
+        *[models.When(**{field: state}, then=models.Value(rank)) for rank, state in enumerate(AVAILABILITY_STATES)],
+        output_field=models.IntegerField()
+    )
+
+
+def assessment_window_flags(assessment, now=None, availability=None):
+    """
+    (is_available, is_expired, can_submit) for an assessment's submission
+    window, from its availability (computed unless given). Takes instances
+    and serialized dicts, like assessment_availability().
+    """
+    from django.utils import timezone
+    from django.utils.dateparse import parse_datetime
+
+    now = now or timezone.now()
+    if availability is None:
+        availability = assessment_availability(assessment, now)
+    end = assessment['scheduled_end'] if isinstance(assessment, dict) else assessment.scheduled_end
+    if isinstance(end, str):
+        end = parse_datetime(end)
+
+    is_available = availability in (AVAILABILITY_OPEN, AVAILABILITY_LATE, AVAILABILITY_CLOSED)
+    is_expired = bool(end) and now > end
+    return is_available, is_expired, availability in SUBMITTABLE_STATES
 
 
 class StudentAssessmentProgress(models.Model):
@@ -376,6 +446,21 @@ class Answer(models.Model):
             return f"TF Answer: {self.is_correct_for_tf}"
         return f"Answer: {self.answer_text[:50]}"
 
+class AssessmentPaper(models.Model):
+    """
+    Precompiled, student-safe question paper for an assessment (no answer keys).
+    `version` is bumped whenever questions, options or answers change, which
+    also marks the stored payload stale until it is rebuilt.
+    """
+    assessment = models.OneToOneField(Assessment, on_delete=models.CASCADE, related_name='paper')
+    version = models.PositiveIntegerField(default=1)
+    payload = models.JSONField(default=dict)
+    is_stale = models.BooleanField(default=True)
+    built_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Paper v{self.version} for {self.assessment_id}"
+
 class StudentAnswer(models.Model):
     submission = models.ForeignKey('Submission', on_delete=models.CASCADE, related_name='student_answers')
     question = models.ForeignKey(Question, on_delete=models.CASCADE)
@@ -388,6 +473,25 @@ class StudentAnswer(models.Model):
     def __str__(self):
         return f"Answer by {self.submission.student.username} for Q{self.question.order}"
 
+class DraftAnswer(models.Model):
+    """
+    Autosaved, not yet submitted answer: the latest state per student and
+    question while an assessment is in progress. Promoted to StudentAnswer
+    (and deleted) when the student submits.
+    """
+    student = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='draft_answers')
+    assessment = models.ForeignKey(Assessment, on_delete=models.CASCADE, related_name='draft_answers')
+    question = models.ForeignKey(Question, on_delete=models.CASCADE, related_name='draft_answers')
+    selected_option = models.ForeignKey(QuestionOption, on_delete=models.SET_NULL, null=True, blank=True)
+    answer_text = models.TextField(blank=True)
+    saved_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ['student', 'question']
+
+    def __str__(self):
+        return f"Draft by {self.student_id} for Q{self.question_id}"
+
 class Submission(models.Model):
     assessment = models.ForeignKey(Assessment, on_delete=models.CASCADE, related_name='submissions')
     student = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='submissions')
@@ -404,6 +508,98 @@ class Submission(models.Model):
     def __str__(self):
         return f"Submission by {self.student.username} for {self.assessment}"
 
+class RegradeJob(models.Model):
+    """
+    Re-scores an assessment's auto-graded answers against its current key
+    (after a trainer fixes a wrong answer). Progress is tracked per submission.
+    """
+    STATUS_CHOICES = [
+        ('Pending', 'Pending'),
+        ('Running', 'Running'),
+        ('Completed', 'Completed'),
+        ('Failed', 'Failed')
+    ]
+    assessment = models.ForeignKey(Assessment, on_delete=models.CASCADE, related_name='regrade_jobs')
+    requested_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='regrade_jobs')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='Pending')
+    total_submissions = models.PositiveIntegerField(default=0)
+    processed_submissions = models.PositiveIntegerField(default=0)
+    answers_changed = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Regrade of {self.assessment} ({self.status})"
+
+class SubmissionSignature(models.Model):
+    """
+    MinHash fingerprint of a submission's text (content, extractable file
+    text and long answers) for similarity checks; see core.utils.similarity.
+    """
+    submission = models.OneToOneField(Submission, on_delete=models.CASCADE, related_name='signature')
+    assessment = models.ForeignKey(Assessment, on_delete=models.CASCADE, related_name='submission_signatures')
+    minhash = models.JSONField(default=list)
+    shingle_count = models.PositiveIntegerField(default=0)
+    computed_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Signature of submission {self.submission_id}"
+
+class SignatureBand(models.Model):
+    """LSH index entry: signatures sharing an (assessment, bucket) are candidate matches."""
+    signature = models.ForeignKey(SubmissionSignature, on_delete=models.CASCADE, related_name='bands')
+    assessment = models.ForeignKey(Assessment, on_delete=models.CASCADE, related_name='+')
+    bucket = models.BigIntegerField()
+
+    class Meta:
+        indexes = [models.Index(fields=['assessment', 'bucket'])]
+
+class SimilarityMatch(models.Model):
+    """A pair of submissions whose estimated similarity passed SIMILARITY_THRESHOLD (submission_a has the lower id)."""
+    assessment = models.ForeignKey(Assessment, on_delete=models.CASCADE, related_name='similarity_matches')
+    submission_a = models.ForeignKey(Submission, on_delete=models.CASCADE, related_name='+')
+    submission_b = models.ForeignKey(Submission, on_delete=models.CASCADE, related_name='+')
+    similarity = models.FloatField()
+    found_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ['submission_a', 'submission_b']
+        ordering = ['-similarity']
+
+    def __str__(self):
+        return f"Submissions {self.submission_a_id} ~ {self.submission_b_id} ({self.similarity:.0%})"
+
+class UnitGrade(models.Model):
+    """
+    A student's final result for a unit: graded CAT marks scaled to the unit's
+    cat_total_points and other assessments scaled to assessment_total_points,
+    over its approved, active assessments. Kept up to date by
+    core.utils.unit_grades so reports read one row instead of every submission.
+    """
+    student = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='unit_grades')
+    unit = models.ForeignKey(Unit, on_delete=models.CASCADE, related_name='grades')
+    cat_earned = models.DecimalField(max_digits=8, decimal_places=2, default=0)
+    cat_possible = models.PositiveIntegerField(default=0)
+    cat_score = models.DecimalField(max_digits=6, decimal_places=2, null=True, blank=True)
+    assessment_earned = models.DecimalField(max_digits=8, decimal_places=2, default=0)
+    assessment_possible = models.PositiveIntegerField(default=0)
+    assessment_score = models.DecimalField(max_digits=6, decimal_places=2, null=True, blank=True)
+    total = models.DecimalField(max_digits=6, decimal_places=2, default=0)
+    graded_count = models.PositiveIntegerField(default=0)
+    pending_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ['student', 'unit']
+        indexes = [models.Index(fields=['unit', 'total'])]
+
+    def __str__(self):
+        return f"{self.student_id} in {self.unit_id}: {self.total}"
+
 class Attendance(models.Model):
     STATUS_CHOICES = [
         ('Present', 'Present'),
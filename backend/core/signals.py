@@ -0,0 +1,163 @@
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from core.models import (Attendance, Unit, Module, Lesson, LessonPlanActivity, Resource, Assessment, Question,
+                         QuestionOption, Answer, StudentEnrollment, StudentLessonProgress,
+                         StudentResourceProgress, StudentAssessmentProgress, Submission, StudentAnswer)
+from core.utils.cache_versions import bump_version
+from core.utils.papers import invalidate_paper
+from core.utils.unit_grades import (schedule_refresh, refresh_assessment_grades, refresh_course_group_grades,
+                                    refresh_unit_grades)
+
+
+def _assessment_for_question(question_id):
+    return Question.objects.filter(pk=question_id).values_list('assessment_id', flat=True).first()
+
+
+def _unit_for_lesson(lesson_id):
+    return Lesson.objects.filter(pk=lesson_id).values_list('unit_id', flat=True).first()
+
+
+# Assessment papers
+
+@receiver([post_save, post_delete], sender=Question)
+def question_changed(sender, instance, **kwargs):
+    invalidate_paper(instance.assessment_id)
+
+
+@receiver([post_save, post_delete], sender=QuestionOption)
+@receiver([post_save, post_delete], sender=Answer)
+def question_part_changed(sender, instance, **kwargs):
+    # When a whole question is deleted its own signal already covers the paper
+    assessment_id = _assessment_for_question(instance.question_id)
+    if assessment_id is not None:
+        invalidate_paper(assessment_id)
+
+
+# Cached unit detail and student visibility scopes
+
+@receiver([post_save, post_delete], sender=Unit)
+def unit_changed(sender, instance, **kwargs):
+    bump_version('unit', instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Module)
+@receiver([post_save, post_delete], sender=Lesson)
+@receiver([post_save, post_delete], sender=Assessment)
+def unit_content_changed(sender, instance, **kwargs):
+    bump_version('unit', instance.unit_id)
+
+
+@receiver([post_save, post_delete], sender=Resource)
+def resource_changed(sender, instance, **kwargs):
+    unit_id = _unit_for_lesson(instance.lesson_id)
+    if unit_id is not None:
+        bump_version('unit', unit_id)
+
+
+@receiver([post_save, post_delete], sender=LessonPlanActivity)
+def lesson_plan_changed(sender, instance, **kwargs):
+    unit_id = instance.unit_id or (_unit_for_lesson(instance.lesson_id) if instance.lesson_id else None)
+    if unit_id is not None:
+        bump_version('unit', unit_id)
+
+
+@receiver([post_save, post_delete], sender=StudentLessonProgress)
+@receiver([post_save, post_delete], sender=StudentResourceProgress)
+@receiver([post_save, post_delete], sender=StudentAssessmentProgress)
+def student_progress_changed(sender, instance, **kwargs):
+    bump_version('progress', instance.student_id)
+
+
+@receiver([post_save, post_delete], sender=StudentEnrollment)
+def enrollment_changed(sender, instance, **kwargs):
+    bump_version('enrollments', instance.student_id)
+    bump_version('roster', instance.course_group_id)
+
+
+# Attendance matrix (bulk marking bumps this itself)
+
+@receiver([post_save, post_delete], sender=Attendance)
+def attendance_changed(sender, instance, **kwargs):
+    unit_id = _unit_for_lesson(instance.lesson_id)
+    if unit_id is not None:
+        bump_version('attendance', unit_id)
+
+
+# Submission-derived analytics (bulk grading paths bump this themselves)
+
+@receiver([post_save, post_delete], sender=Submission)
+def submission_changed(sender, instance, **kwargs):
+    bump_version('submissions', instance.assessment_id)
+
+
+@receiver([post_save, post_delete], sender=StudentAnswer)
+def student_answer_changed(sender, instance, **kwargs):
+    assessment_id = Submission.objects.filter(pk=instance.submission_id).values_list('assessment_id', flat=True).first()
+    if assessment_id is not None:
+        bump_version('submissions', assessment_id)
+
+
+# Materialized unit grades (bulk grading paths schedule their own refresh)
+
+# Fields a whole unit's grades are computed from; other edits (titles,
+# schedules, the saves made by papers and variants) leave them alone
+UNIT_GRADE_FIELDS = ('course_group', 'cat_total_points', 'assessment_total_points')
+ASSESSMENT_GRADE_FIELDS = ('unit', 'is_active', 'is_approved', 'assessment_type', 'points')
+
+
+def _stored_grade_fields(sender, instance, fields, update_fields):
+    """
+    The stored values of `fields` ({attname: value}) when a save may change
+    them, or None when it can't: a new row has no stored values ({} then),
+    and a save limited by update_fields to other fields skips the lookup.
+    """
+    if instance._state.adding:
+        return {}
+    attnames = [sender._meta.get_field(name).attname for name in fields]
+    if update_fields is not None and not set(update_fields) & (set(fields) | set(attnames)):
+        return None
+    stored = sender.objects.filter(pk=instance.pk).values(*attnames).first()
+    if stored is not None and all(stored[attname] == getattr(instance, attname) for attname in attnames):
+        return None
+    return stored or {}
+
+
+@receiver(pre_save, sender=Unit)
+def unit_weights_changing(sender, instance, update_fields=None, **kwargs):
+    instance._grade_fields_changed = _stored_grade_fields(sender, instance, UNIT_GRADE_FIELDS, update_fields) is not None
+
+
+@receiver(post_save, sender=Unit)
+def unit_weights_changed(sender, instance, **kwargs):
+    if getattr(instance, '_grade_fields_changed', True):
+        schedule_refresh(refresh_unit_grades, instance.pk)
+
+
+@receiver(pre_save, sender=Assessment)
+def counted_assessment_changing(sender, instance, update_fields=None, **kwargs):
+    stored = _stored_grade_fields(sender, instance, ASSESSMENT_GRADE_FIELDS, update_fields)
+    instance._grade_fields_changed = stored is not None
+    # Moving an assessment changes the grades of the unit it leaves too
+    instance._previous_unit_id = (stored or {}).get('unit_id')
+
+
+@receiver([post_save, post_delete], sender=Assessment)
+def counted_assessments_changed(sender, instance, **kwargs):
+    # (De)activation, approval, points and type all change every student's scaled score
+    if not getattr(instance, '_grade_fields_changed', True):
+        return
+    schedule_refresh(refresh_unit_grades, instance.unit_id)
+    previous_unit_id = getattr(instance, '_previous_unit_id', None)
+    if previous_unit_id not in (None, instance.unit_id):
+        schedule_refresh(refresh_unit_grades, previous_unit_id)
+
+
+@receiver([post_save, post_delete], sender=Submission)
+def submission_grade_changed(sender, instance, **kwargs):
+    schedule_refresh(refresh_assessment_grades, instance.assessment_id, [instance.student_id])
+
+
+@receiver([post_save, post_delete], sender=StudentEnrollment)
+def class_list_changed(sender, instance, **kwargs):
+    schedule_refresh(refresh_course_group_grades, instance.course_group_id, [instance.student_id])
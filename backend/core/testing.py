@@ -0,0 +1,27 @@
+"""Fixture helpers shared by the api and core test modules."""
+from django.contrib.auth import get_user_model
+
+from core.models import School, Course, Intake, Semester, CourseGroup, Unit
+
+User = get_user_model()
+
+
+def create_user(username, role='Student', **fields):
+    """An activated user whose password is 'password'."""
+    fields.setdefault('is_activated', True)
+    return User.objects.create_user(username=username, password='password', role=role, **fields)
+
+
+def create_course_group():
+    """A class (course group 'TC-01') with its school, course, intake and semester."""
+    school = School.objects.create(name='Test School')
+    course = Course.objects.create(name='Test Course', code='TC', school=school, duration='1 year')
+    intake = Intake.objects.create(name='Intake 1', course=course)
+    semester = Semester.objects.create(name='Sem 1', start_date='2024-01-01', end_date='2024-06-01')
+    return CourseGroup.objects.create(course=course, intake=intake, semester=semester, course_code='TC-01')
+
+
+def create_unit(course_group, **fields):
+    """Unit 'TU-101' in course_group; fields override the defaults."""
+    fields = {'name': 'Test Unit', 'code': 'TU-101', 'semester_number': 1, 'total_lessons': 10, **fields}
+    return Unit.objects.create(course_group=course_group, **fields)
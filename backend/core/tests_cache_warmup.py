@@ -0,0 +1,76 @@
+from datetime import timedelta
+from io import StringIO
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+from core.models import Lesson, Assessment, AssessmentPaper, Question, StudentEnrollment, assessment_window_flags
+from core.utils.cache_versions import get_versions
+from core.testing import create_user, create_course_group, create_unit
+
+class CacheWarmupTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.student = create_user('student')
+
+        self.course_group = create_course_group()
+        self.unit = create_unit(self.course_group)
+        Lesson.objects.create(unit=self.unit, title='Lesson 1', order=1, is_approved=True, is_active=True)
+        self.enrollment = StudentEnrollment.objects.create(student=self.student, course_group=self.course_group)
+
+        self.assessment = Assessment.objects.create(
+            unit=self.unit, assessment_type='CAT', title='CAT 1', points=10, due_date=timezone.now(),
+            is_approved=True, scheduled_start=timezone.now() + timedelta(minutes=5)
+        )
+        Question.objects.create(assessment=self.assessment, question_text='Define OOP', question_type='SHORT')
+
+        self.client.force_authenticate(user=self.student)
+
+    def _unit_detail_key_prefix(self):
+        unit_version, progress_version = get_versions(('unit', self.unit.id), ('progress', self.student.id))
+        return f'unit-detail:{self.unit.id}:{unit_version}:{self.student.id}:{progress_version}:'
+
+    def test_unit_detail_cached_and_invalidated(self):
+        url = f'/api/units/{self.unit.id}/'
+        first = self.client.get(url)
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(first.data['lessons']), 1)
+
+        Lesson.objects.create(unit=self.unit, title='Lesson 2', order=2, is_approved=True, is_active=True)
+        second = self.client.get(url)
+        self.assertEqual(len(second.data['lessons']), 2)
+
+    def test_cached_unit_detail_respects_enrollment(self):
+        url = f'/api/units/{self.unit.id}/'
+        self.client.get(url)
+        self.enrollment.is_active = False
+        self.enrollment.save()
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_window_flags_refreshed_on_cached_detail(self):
+        data = {'is_approved': True, 'scheduled_start': (timezone.now() - timedelta(minutes=1)).isoformat(),
+                'scheduled_end': None, 'allow_late_submission': False}
+        self.assertEqual(assessment_window_flags(data), (True, False, True))
+        self.assertEqual(self.assessment.is_available(), False)
+
+    def test_warmup_prebuilds_paper_and_unit_detail(self):
+        out = StringIO()
+        call_command('warm_assessment_caches', once=True, base_url='http://testserver', stdout=out)
+
+        self.assertIn('paper + 1 students', out.getvalue())
+        self.assertFalse(AssessmentPaper.objects.get(assessment=self.assessment).is_stale)
+        self.assertIsNotNone(cache.get(self._unit_detail_key_prefix() + 'http://testserver/'))
+
+        # The student's first request is served from what the warm-up built
+        response = self.client.get(f'/api/units/{self.unit.id}/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(response.data['assessments'][0]['can_submit'])
+
+    def test_warmup_skips_assessments_outside_window(self):
+        self.assessment.scheduled_start = timezone.now() + timedelta(hours=3)
+        self.assessment.save()
+        out = StringIO()
+        call_command('warm_assessment_caches', once=True, stdout=out)
+        self.assertEqual(out.getvalue(), '')
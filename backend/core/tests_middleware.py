@@ -0,0 +1,40 @@
+from django.http import HttpResponse
+from django.test import TestCase, RequestFactory
+from core.middleware import APIExemptSessionMiddleware, APIExemptCsrfViewMiddleware, APIExemptAuthenticationMiddleware
+
+class APIFastPathMiddlewareTest(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def _run(self, path, method='get'):
+        seen = {}
+
+        def view(request):
+            seen['session'] = hasattr(request, 'session')
+            seen['user'] = hasattr(request, 'user')
+            return HttpResponse('ok')
+
+        chain = APIExemptSessionMiddleware(APIExemptAuthenticationMiddleware(view))
+        response = chain(getattr(self.factory, method)(path))
+        return response, seen
+
+    def test_api_requests_skip_session_and_auth(self):
+        response, seen = self._run('/api/units/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(seen, {'session': False, 'user': False})
+
+    def test_admin_requests_keep_full_stack(self):
+        response, seen = self._run('/admin/login/')
+        self.assertEqual(seen, {'session': True, 'user': True})
+
+    def test_csrf_only_enforced_outside_api(self):
+        csrf = APIExemptCsrfViewMiddleware(lambda request: HttpResponse('ok'))
+        view = lambda request: HttpResponse('ok')
+
+        api_request = self.factory.post('/api/units/')
+        self.assertIsNone(csrf.process_view(api_request, view, (), {}))
+
+        admin_request = self.factory.post('/admin/login/')
+        admin_request._dont_enforce_csrf_checks = False
+        response = csrf.process_view(admin_request, view, (), {})
+        self.assertEqual(response.status_code, 403)
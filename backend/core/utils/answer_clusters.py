@@ -0,0 +1,78 @@
+from difflib import SequenceMatcher
+
+from core.models import StudentAnswer
+from core.utils.grading import normalize_answer
+from core.utils.minhash import estimated_similarity, minhash_signature
+
+CLUSTERED_TYPES = ('SHORT', 'FILL', 'ESSAY')
+# Answers at least this long are compared by MinHash signature rather than
+# a character diff, which is quadratic in the text length
+LONG_TEXT_CHARS = 200
+
+
+def _similar(cluster, text, signature, threshold):
+    representative = cluster['normalized']
+    if cluster['signature'] is not None and signature is not None:
+        return estimated_similarity(cluster['signature'], signature) >= threshold
+    matcher = SequenceMatcher(None, representative, text, autojunk=False)
+    # The cheap upper bounds rule most pairs out before the full comparison
+    return (matcher.real_quick_ratio() >= threshold and matcher.quick_ratio() >= threshold
+            and matcher.ratio() >= threshold)
+
+
+def cluster_answers(question, threshold=1.0):
+    """
+    A question's answers grouped so each distinct answer is graded once.
+    Answers with the same normalized text (case, punctuation and spacing
+    ignored) always share a cluster; with threshold < 1 a group is also
+    merged into the first, larger cluster whose text is at least that
+    similar. Largest clusters come first. `points_earned` is the cluster's
+    common mark (None while unmarked or mixed).
+    """
+    groups = {}
+    for row in (StudentAnswer.objects.filter(question=question).order_by('id')
+                .values('id', 'submission_id', 'submission__student__username', 'answer_text',
+                        'points_earned', 'feedback')):
+        groups.setdefault(normalize_answer(row['answer_text']), []).append(row)
+
+    # Each long group's signature is computed once, not once per comparison
+    signatures = {}
+    if threshold < 1:
+        signatures = {normalized: minhash_signature(normalized)[0]
+                      for normalized in groups if len(normalized) >= LONG_TEXT_CHARS}
+
+    clusters = []
+    for normalized, members in sorted(groups.items(), key=lambda item: (-len(item[1]), item[0])):
+        signature = signatures.get(normalized)
+        if threshold < 1:
+            target = next((cluster for cluster in clusters
+                           if _similar(cluster, normalized, signature, threshold)), None)
+            if target is not None:
+                target['members'].extend(members)
+                target['variants'] += 1
+                continue
+        clusters.append({'normalized': normalized, 'members': list(members), 'variants': 1, 'signature': signature})
+
+    result = []
+    for cluster in clusters:
+        members = cluster['members']
+        marks = {member['points_earned'] for member in members}
+        result.append({
+            'text': members[0]['answer_text'],
+            'size': len(members),
+            'variants': cluster['variants'],
+            'points_earned': marks.pop() if len(marks) == 1 else None,
+            'graded': sum(member['points_earned'] is not None for member in members),
+            'answers': [
+                {
+                    'id': member['id'],
+                    'submission': member['submission_id'],
+                    'student_name': member['submission__student__username'],
+                    'answer_text': member['answer_text'],
+                    'points_earned': member['points_earned'],
+                    'feedback': member['feedback'],
+                }
+                for member in members
+            ],
+        })
+    return result
@@ -0,0 +1,346 @@
+import atexit
+import hashlib
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import DatabaseError, connection
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from core.models import Attendance, Lesson, StudentEnrollment
+from core.utils.cache_versions import bump_version, get_versions
+
+logger = logging.getLogger(__name__)
+
+STATUSES = {value for value, _ in Attendance.STATUS_CHOICES}
+# Statuses that count towards a student's attendance percentage
+ATTENDED = ('Present', 'Late')
+MATRIX_TIMEOUT = 60 * 60
+
+
+def _as_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_attendance_records(records):
+    """
+    [{'lesson', 'student', 'status'}] from a request -> [(lesson_id,
+    student_id, status)]. Status defaults to Present. The referenced lessons
+    and students are checked with one query each; raises ValidationError
+    listing every bad row.
+    """
+    errors = []
+    rows = []
+    for row, record in enumerate(records, start=1):
+        if not isinstance(record, dict):
+            errors.append(f'Row {row}: expected an object')
+            continue
+        lesson_id, student_id = _as_int(record.get('lesson')), _as_int(record.get('student'))
+        status = record.get('status') or 'Present'
+        if lesson_id is None or student_id is None:
+            errors.append(f'Row {row}: lesson and student are required')
+        elif status not in STATUSES:
+            errors.append(f'Row {row}: status must be one of {", ".join(sorted(STATUSES))}')
+        else:
+            rows.append((row, lesson_id, student_id, status))
+
+    lessons = set(Lesson.objects.filter(id__in={r[1] for r in rows}).values_list('id', flat=True))
+    students = set(get_user_model().objects.filter(id__in={r[2] for r in rows}).values_list('id', flat=True))
+    for row, lesson_id, student_id, _ in rows:
+        if lesson_id not in lessons:
+            errors.append(f'Row {row}: lesson {lesson_id} not found')
+        elif student_id not in students:
+            errors.append(f'Row {row}: student {student_id} not found')
+    if errors:
+        raise ValidationError(errors)
+    return [r[1:] for r in rows]
+
+
+def upsert_attendance(records, marked_by_id):
+    """
+    Insert or update Attendance on (lesson, student) for [(lesson_id,
+    student_id, status)] in one batched statement (later duplicates win;
+    marked_at keeps the first mark), then read the rows back with their
+    student, lesson and marker names in one joined query. The number of
+    queries does not depend on the size of the class. Bulk writes send no
+    signals, so the affected units' attendance version is bumped here.
+    """
+    statuses = {(lesson_id, student_id): status for lesson_id, student_id, status in records}
+    kwargs = {}
+    if connection.features.supports_update_conflicts_with_target:
+        kwargs['unique_fields'] = ['lesson', 'student']
+    Attendance.objects.bulk_create(
+        [Attendance(lesson_id=lesson_id, student_id=student_id, status=status, marked_by_id=marked_by_id)
+         for (lesson_id, student_id), status in statuses.items()],
+        update_conflicts=True,
+        update_fields=['status', 'marked_by'],
+        batch_size=500,
+        **kwargs
+    )
+
+    lesson_ids = {lesson_id for lesson_id, _ in statuses}
+    student_ids = {student_id for _, student_id in statuses}
+    saved = (
+        Attendance.objects.filter(lesson_id__in=lesson_ids, student_id__in=student_ids)
+        .order_by('lesson_id', 'student__username')
+        .values('id', 'lesson', 'student', 'status', 'marked_at', 'marked_by',
+                student_name=F('student__username'), lesson_title=F('lesson__title'),
+                marked_by_name=F('marked_by__username'), unit=F('lesson__unit'))
+    )
+    rows = [row for row in saved if (row['lesson'], row['student']) in statuses]
+    for unit_id in {row.pop('unit') for row in rows}:
+        bump_version('attendance', unit_id)
+    return rows
+
+
+def build_attendance_matrix(unit):
+    """
+    Enrolled students x lessons attendance for a unit. A lesson counts as
+    held once it is marked taught or anyone's attendance was taken; students
+    without a mark for a held lesson are Absent, cells of lessons not yet
+    held are None. percentage = attended (Present or Late) / held lessons,
+    with the per-student counts from one grouped query.
+    """
+    lessons = list(
+        Lesson.objects.filter(unit=unit).order_by('order', 'id')
+        .annotate(marks=Count('attendances'))
+        .values('id', 'title', 'order', 'session_date', 'is_taught', 'marks')
+    )
+    for lesson in lessons:
+        marks = lesson.pop('marks')
+        lesson['held'] = lesson['is_taught'] or marks > 0
+    column = {lesson['id']: i for i, lesson in enumerate(lessons)}
+    held = sum(lesson['held'] for lesson in lessons)
+
+    enrolled = StudentEnrollment.objects.filter(course_group_id=unit.course_group_id, is_active=True)
+    students = {}
+    for enrollment in (enrolled.order_by('student__username')
+                       .values('student_id', 'student__username', 'student__first_name', 'student__last_name')):
+        name = f"{enrollment['student__first_name']} {enrollment['student__last_name']}".strip()
+        students.setdefault(enrollment['student_id'], {
+            'id': enrollment['student_id'],
+            'username': enrollment['student__username'],
+            'name': name or enrollment['student__username'],
+            'statuses': ['Absent' if lesson['held'] else None for lesson in lessons],
+        })
+
+    marks = Attendance.objects.filter(lesson__unit=unit, student_id__in=enrolled.values('student_id'))
+    for student_id, lesson_id, status in marks.values_list('student_id', 'lesson_id', 'status'):
+        students[student_id]['statuses'][column[lesson_id]] = status
+    counts = {
+        row['student_id']: row for row in marks.order_by().values('student_id').annotate(
+            present=Count('id', filter=Q(status='Present')),
+            late=Count('id', filter=Q(status='Late')),
+            attended=Count('id', filter=Q(status__in=ATTENDED)),
+        )
+    }
+
+    for row in students.values():
+        count = counts.get(row['id'], {'present': 0, 'late': 0, 'attended': 0})
+        row['present'], row['late'] = count['present'], count['late']
+        row['absent'] = held - row['present'] - row['late']
+        row['percentage'] = round(count['attended'] / held * 100, 1) if held else None
+
+    return {
+        'unit': {'id': unit.id, 'code': unit.code, 'name': unit.name},
+        'lessons': lessons,
+        'held_lessons': held,
+        'students': list(students.values()),
+    }
+
+
+def cached_attendance_matrix(unit):
+    """build_attendance_matrix() cached until a mark is taken, the class list or the unit's lessons change."""
+    versions = get_versions(('unit', unit.id), ('roster', unit.course_group_id), ('attendance', unit.id))
+    digest = hashlib.sha1(':'.join(map(str, versions)).encode()).hexdigest()
+    key = f'attendance-matrix:{unit.id}:{digest}'
+    matrix = cache.get(key)
+    if matrix is None:
+        matrix = build_attendance_matrix(unit)
+        cache.set(key, matrix, MATRIX_TIMEOUT)
+    return matrix
+
+
+def below_threshold(matrix, threshold):
+    """The matrix with only students whose percentage is under `threshold` (at-risk list)."""
+    return {
+        **matrix,
+        'threshold': threshold,
+        'students': [row for row in matrix['students']
+                     if row['percentage'] is not None and row['percentage'] < threshold],
+    }
+
+
+def attendance_matrix_rows(matrix):
+    """Header row, then one flat row per student, for the CSV export."""
+    yield (
+        ['Username', 'Name']
+        + [f"{lesson['order']}. {lesson['title']}" for lesson in matrix['lessons']]
+        + ['Present', 'Late', 'Absent', 'Attendance %']
+    )
+    for row in matrix['students']:
+        yield [row['username'], row['name'], *row['statuses'],
+               row['present'], row['late'], row['absent'], row['percentage']]
+
+
+def write_auto_attendance(marks):
+    """
+    Record automatic Present marks for (lesson_id, student_id) pairs in a
+    fixed number of queries: missing rows are inserted in one batch, Absent
+    ones become Present and any other existing mark is left alone, so
+    writing the same pairs twice changes nothing. Pairs whose lesson or
+    student has been deleted are dropped. Returns the set of pairs that were
+    inserted.
+    """
+    lessons = dict(Lesson.objects.filter(id__in={lesson_id for lesson_id, _ in marks}).values_list('id', 'unit_id'))
+    students = set(get_user_model().objects.filter(id__in={student_id for _, student_id in marks})
+                   .values_list('id', flat=True))
+    marks = {mark for mark in marks if mark[0] in lessons and mark[1] in students}
+    if not marks:
+        return set()
+
+    existing = {}
+    for attendance_id, lesson_id, student_id, status in (
+        Attendance.objects.filter(lesson_id__in={lesson_id for lesson_id, _ in marks},
+                                  student_id__in={student_id for _, student_id in marks})
+        .values_list('id', 'lesson_id', 'student_id', 'status')
+    ):
+        if (lesson_id, student_id) in marks:
+            existing[lesson_id, student_id] = (attendance_id, status)
+
+    created = marks - set(existing)
+    # Null marked_by means system-auto; a concurrent insert of the same pair is ignored
+    Attendance.objects.bulk_create(
+        [Attendance(lesson_id=lesson_id, student_id=student_id, status='Present', marked_by=None)
+         for lesson_id, student_id in created],
+        ignore_conflicts=True,
+        batch_size=500
+    )
+    absent = [attendance_id for attendance_id, status in existing.values() if status == 'Absent']
+    if absent:
+        Attendance.objects.filter(pk__in=absent, status='Absent').update(status='Present')
+
+    if created or absent:
+        # Bulk writes send no signals
+        for unit_id in {lessons[lesson_id] for lesson_id, _ in marks}:
+            bump_version('attendance', unit_id)
+    return created
+
+
+class AttendanceBuffer:
+    """
+    Process-local ingestion buffer for automatic attendance (lesson and
+    assessment views). Pairs this process has already recorded are answered
+    from memory without touching the database; first views are queued and
+    a background thread writes them with write_auto_attendance() every
+    ATTENDANCE_FLUSH_INTERVAL seconds (and at exit). A class opening a
+    lesson at once therefore costs one batched write per interval per
+    process, and marked_at is the time of that write. With an interval of 0
+    first views are written straight through.
+    """
+
+    # The memory of recorded pairs is dropped past this size; forgotten pairs
+    # are simply written again, which is harmless
+    MAX_REMEMBERED = 100000
+
+    def __init__(self):
+        self._recorded = {}
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._flusher = None
+
+    @property
+    def interval(self):
+        return getattr(settings, 'ATTENDANCE_FLUSH_INTERVAL', 5)
+
+    def recorded(self, lesson_id, student_id):
+        """When this process first saw the student view the lesson, or None."""
+        with self._lock:
+            return self._recorded.get((lesson_id, student_id))
+
+    def mark(self, lesson_id, student_id):
+        """
+        Record a view. Returns (first seen at, created): created is True or
+        False once written, None while the mark waits in the buffer.
+        """
+        key = (lesson_id, student_id)
+        now = timezone.now()
+        if not self.interval:
+            created = key in write_auto_attendance({key})
+            with self._lock:
+                return self._remember(key, now), created
+
+        with self._lock:
+            if key in self._recorded:
+                return self._recorded[key], False
+            self._pending.add(key)
+            marked_at = self._remember(key, now)
+        self._ensure_flusher()
+        return marked_at, None
+
+    def _remember(self, key, marked_at):
+        if len(self._recorded) >= self.MAX_REMEMBERED:
+            self._recorded.clear()
+        return self._recorded.setdefault(key, marked_at)
+
+    def flush(self):
+        """
+        Write every pending mark to the database; returns how many. If the
+        database fails the batch is queued again for the next flush and the
+        error re-raised.
+        """
+        with self._lock:
+            batch, self._pending = self._pending, set()
+        if not batch:
+            return 0
+        try:
+            write_auto_attendance(batch)
+        except DatabaseError:
+            with self._lock:
+                self._pending |= batch
+            raise
+        return len(batch)
+
+    def reset(self):
+        """Drop pending marks and the memory of recorded ones (e.g. after restoring the database)."""
+        with self._lock:
+            self._recorded.clear()
+            self._pending.clear()
+
+    def _ensure_flusher(self):
+        if self._flusher is not None and self._flusher.is_alive():
+            return
+        with self._lock:
+            if self._flusher is None or not self._flusher.is_alive():
+                self._flusher = threading.Thread(target=self._run, name='attendance-flusher', daemon=True)
+                self._flusher.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval or 1)
+            try:
+                self.flush()
+            except DatabaseError:
+                # The marks were queued again; the next interval tries again
+                logger.exception('Failed to flush automatic attendance')
+            finally:
+                connection.close()
+
+
+attendance_buffer = AttendanceBuffer()
+
+
+@atexit.register
+def _flush_on_exit():
+    try:
+        attendance_buffer.flush()
+    except Exception:
+        logger.exception('Failed to flush automatic attendance at exit')
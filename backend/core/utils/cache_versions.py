@@ -0,0 +1,36 @@
+import time
+
+from django.core.cache import cache
+
+# Version counters for cached data. Cache keys embed the current version of
+# everything they depend on, so bumping a version invalidates every entry
+# built from it without having to find and delete those entries.
+
+
+def _version_key(namespace, obj_id):
+    return f'version:{namespace}:{obj_id}'
+
+
+def _new_version():
+    # Clock-based rather than a counter: if a version entry is ever evicted it
+    # comes back with a value that no existing cache key can contain.
+    return time.time_ns()
+
+
+def get_versions(*pairs):
+    """Current versions for (namespace, id) pairs, in the same order."""
+    keys = [_version_key(namespace, obj_id) for namespace, obj_id in pairs]
+    found = cache.get_many(keys)
+    missing = {key: _new_version() for key in keys if key not in found}
+    if missing:
+        cache.set_many(missing, timeout=None)
+        found.update(missing)
+    return [found[key] for key in keys]
+
+
+def get_version(namespace, obj_id):
+    return get_versions((namespace, obj_id))[0]
+
+
+def bump_version(namespace, obj_id):
+    cache.set(_version_key(namespace, obj_id), _new_version(), timeout=None)
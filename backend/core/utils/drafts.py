@@ -0,0 +1,278 @@
+import atexit
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, DataError, IntegrityError, connection, transaction
+from django.utils import timezone
+
+from core.models import DraftAnswer, Question, QuestionOption
+from core.utils.grading import get_answer_key
+from core.utils.variants import allowed_question_ids
+
+logger = logging.getLogger(__name__)
+
+# With DRAFT_SHARED_CACHE, buffered drafts are copied to the shared cache so
+# that a submission handled by another worker process still sees them; long
+# enough for any sitting
+DRAFT_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def _shared():
+    return getattr(settings, 'DRAFT_SHARED_CACHE', False)
+
+
+def _draft_key(student_id, question_id):
+    return f'draft:{student_id}:{question_id}'
+
+
+def _submitted_key(student_id, assessment_id):
+    return f'draft-submitted:{student_id}:{assessment_id}'
+
+
+def _superseded(draft, submitted):
+    """Whether a draft was saved before its attempt was last submitted ({_submitted_key: time})."""
+    submitted_at = submitted.get(_submitted_key(draft.student_id, draft.assessment_id))
+    return submitted_at is not None and draft.saved_at <= submitted_at
+
+
+def save_drafts(drafts):
+    """Upsert DraftAnswers on (student, question) in one batched statement."""
+    kwargs = {}
+    if connection.features.supports_update_conflicts_with_target:
+        kwargs['unique_fields'] = ['student', 'question']
+    DraftAnswer.objects.bulk_create(
+        drafts,
+        update_conflicts=True,
+        update_fields=['selected_option', 'answer_text', 'saved_at'],
+        batch_size=500,
+        **kwargs
+    )
+
+
+def write_drafts(drafts):
+    """
+    save_drafts() for buffered drafts, which may have gone stale while they
+    waited: drafts saved before their attempt was submitted are dropped (they
+    would reappear after discard_drafts()), as are drafts of deleted
+    questions, and options deleted since are cleared. If the batch still
+    fails on a bad row, rows are written one at a time and the ones the
+    database rejects are dropped; other database errors propagate. Returns
+    the number of drafts written.
+    """
+    attempts = {_submitted_key(d.student_id, d.assessment_id): (d.student_id, d.assessment_id) for d in drafts}
+    submitted = cache.get_many(list(attempts))
+    drafts = [draft for draft in drafts if not _superseded(draft, submitted)]
+    questions = set(Question.objects.filter(id__in={d.question_id for d in drafts}).values_list('id', flat=True))
+    drafts = [draft for draft in drafts if draft.question_id in questions]
+    option_ids = {draft.selected_option_id for draft in drafts if draft.selected_option_id}
+    if option_ids:
+        options = set(QuestionOption.objects.filter(id__in=option_ids).values_list('id', flat=True))
+        for draft in drafts:
+            if draft.selected_option_id not in options:
+                draft.selected_option_id = None
+    if not drafts:
+        return 0
+
+    try:
+        with transaction.atomic():
+            save_drafts(drafts)
+        written = len(drafts)
+    except (IntegrityError, DataError):
+        written = 0
+        for draft in drafts:
+            try:
+                with transaction.atomic():
+                    save_drafts([draft])
+                written += 1
+            except (IntegrityError, DataError):
+                logger.exception('Dropped autosaved answer of student %s to question %s',
+                                 draft.student_id, draft.question_id)
+
+    # Attempts submitted while this was being written: remove what came back
+    for key, submitted_at in cache.get_many(list(attempts)).items():
+        if submitted.get(key) != submitted_at:
+            student_id, assessment_id = attempts[key]
+            DraftAnswer.objects.filter(student_id=student_id, assessment_id=assessment_id,
+                                       saved_at__lte=submitted_at).delete()
+    return written
+
+
+class DraftBuffer:
+    """
+    Process-local write-coalescing buffer for autosaved answers.
+    Only the latest state per (student, question) is kept, and a background
+    thread writes whatever is pending with write_drafts() every
+    DRAFT_FLUSH_INTERVAL seconds (and at exit). Autosaving on every keystroke
+    therefore costs the database one batched write per interval per process.
+    With DRAFT_SHARED_CACHE each autosave is also copied to the shared cache
+    for load_drafts() on other processes. With an interval of 0 drafts are written straight through.
+    """
+
+    def __init__(self):
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._flusher = None
+
+    @property
+    def interval(self):
+        return getattr(settings, 'DRAFT_FLUSH_INTERVAL', 5)
+
+    def put(self, student_id, assessment_id, resolved_answers):
+        """Buffer [(question, option, answer_text)] for a student's attempt."""
+        now = timezone.now()
+        drafts = {
+            question.id: DraftAnswer(
+                student_id=student_id,
+                assessment_id=assessment_id,
+                question_id=question.id,
+                selected_option_id=option.id if option else None,
+                answer_text=answer_text,
+                saved_at=now
+            )
+            for question, option, answer_text in resolved_answers
+        }
+        if not self.interval:
+            save_drafts(list(drafts.values()))
+            return
+
+        with self._lock:
+            self._pending.setdefault((student_id, assessment_id), {}).update(drafts)
+        if _shared():
+            cache.set_many({
+                _draft_key(student_id, question_id): (assessment_id, draft.selected_option_id, draft.answer_text, now)
+                for question_id, draft in drafts.items()
+            }, DRAFT_CACHE_TIMEOUT)
+        self._ensure_flusher()
+
+    def pending(self, student_id, assessment_id):
+        """Unflushed drafts of one attempt, by question id."""
+        with self._lock:
+            return dict(self._pending.get((student_id, assessment_id), {}))
+
+    def discard(self, student_id, assessment_id):
+        with self._lock:
+            self._pending.pop((student_id, assessment_id), None)
+
+    def flush(self):
+        """
+        Write every pending draft to the database; returns how many were
+        written. If the database fails the batch is put back (behind any
+        newer autosave) for the next flush and the error re-raised.
+        """
+        with self._lock:
+            batch, self._pending = self._pending, {}
+
+        drafts = [draft for attempt in batch.values() for draft in attempt.values()]
+        if not drafts:
+            return 0
+        try:
+            return write_drafts(drafts)
+        except DatabaseError:
+            with self._lock:
+                for attempt, queued in batch.items():
+                    pending = self._pending.setdefault(attempt, {})
+                    for question_id, draft in queued.items():
+                        pending.setdefault(question_id, draft)
+            raise
+
+    def _ensure_flusher(self):
+        if self._flusher is not None and self._flusher.is_alive():
+            return
+        with self._lock:
+            if self._flusher is None or not self._flusher.is_alive():
+                self._flusher = threading.Thread(target=self._run, name='draft-flusher', daemon=True)
+                self._flusher.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval or 1)
+            try:
+                self.flush()
+            except DatabaseError:
+                # The drafts were put back; the next interval tries again
+                logger.exception('Failed to flush autosaved answers')
+            finally:
+                connection.close()
+
+
+draft_buffer = DraftBuffer()
+
+
+@atexit.register
+def _flush_on_exit():
+    try:
+        draft_buffer.flush()
+    except Exception:
+        logger.exception('Failed to flush autosaved answers at exit')
+
+
+def load_drafts(student_id, assessment_id):
+    """
+    A student's saved drafts for an assessment, by question id: the stored
+    ones, overlaid with any newer unflushed ones from this process or (with
+    DRAFT_SHARED_CACHE) any other, leaving out those saved before the last
+    submission.
+    """
+    drafts = {
+        draft.question_id: draft
+        for draft in DraftAnswer.objects.filter(student_id=student_id, assessment_id=assessment_id)
+    }
+    question_ids = get_answer_key(assessment_id).question_order if _shared() else []
+    cached = cache.get_many([_draft_key(student_id, question_id) for question_id in question_ids]
+                            + [_submitted_key(student_id, assessment_id)])
+    unflushed = []
+    for question_id in question_ids:
+        entry = cached.get(_draft_key(student_id, question_id))
+        if entry is not None and entry[0] == assessment_id:
+            _, option_id, answer_text, saved_at = entry
+            unflushed.append(DraftAnswer(
+                student_id=student_id, assessment_id=assessment_id, question_id=question_id,
+                selected_option_id=option_id, answer_text=answer_text, saved_at=saved_at
+            ))
+    unflushed.extend(draft_buffer.pending(student_id, assessment_id).values())
+    for draft in unflushed:
+        saved = drafts.get(draft.question_id)
+        if not _superseded(draft, cached) and (saved is None or draft.saved_at >= saved.saved_at):
+            drafts[draft.question_id] = draft
+    return drafts
+
+
+def merge_drafts(student_id, assessment, answers_data):
+    """
+    Final answers for a submission: the posted answers, plus the latest draft
+    of any question the student answered earlier but didn't post again.
+    """
+    key = get_answer_key(assessment.id)
+    allowed_ids = allowed_question_ids(assessment, student_id, key.question_order)
+    posted = {str(a.get('question_id')) for a in answers_data if isinstance(a, dict)}
+    merged = list(answers_data)
+    for question_id, draft in load_drafts(student_id, assessment.id).items():
+        # Skip drafts for questions edited away since they were saved
+        if str(question_id) in posted or question_id not in key.questions:
+            continue
+        if allowed_ids is not None and question_id not in allowed_ids:
+            continue
+        option_id = draft.selected_option_id if draft.selected_option_id in key.options else None
+        merged.append({
+            'question_id': question_id,
+            'selected_option_id': option_id,
+            'answer_text': draft.answer_text,
+        })
+    return merged
+
+
+def discard_drafts(student_id, assessment_id):
+    """
+    Drop an attempt's drafts once it is submitted. The submission time is
+    recorded in the cache, so drafts of the attempt still buffered by any
+    process (or in a flush already under way) are not written afterwards.
+    """
+    cache.set(_submitted_key(student_id, assessment_id), timezone.now(), DRAFT_CACHE_TIMEOUT)
+    if _shared():
+        cache.delete_many([_draft_key(student_id, question_id)
+                           for question_id in get_answer_key(assessment_id).question_order])
+    draft_buffer.discard(student_id, assessment_id)
+    DraftAnswer.objects.filter(student_id=student_id, assessment_id=assessment_id).delete()
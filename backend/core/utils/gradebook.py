@@ -0,0 +1,200 @@
+import csv
+import hashlib
+import re
+import tempfile
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.core.cache import cache
+
+from core.models import Assessment, StudentEnrollment, Submission
+from core.utils.cache_versions import get_versions
+
+try:
+    from openpyxl import Workbook
+except ImportError:
+    Workbook = None
+
+GRADEBOOK_TIMEOUT = 60 * 60
+# Assessment types weighted into the unit's cat_total_points; every other
+# type counts towards assessment_total_points
+CAT_TYPES = ('CAT', 'Test')
+CENTS = Decimal('0.01')
+# Characters Excel (and openpyxl) refuse in a sheet title
+SHEET_TITLE_INVALID = re.compile(r'[\\/?*\[\]:]+')
+
+
+def _number(value):
+    return None if value is None else round(float(value), 2)
+
+
+def counted_assessments(unit):
+    """The assessments that count towards a unit's grades (gradebook and UnitGrade alike)."""
+    return Assessment.objects.filter(unit=unit, is_approved=True, is_active=True)
+
+
+def weighted_score(earned, possible, weight):
+    """Decimal `earned` out of `possible` points scaled to `weight`, to the cent (None when nothing is possible)."""
+    if not possible:
+        return None
+    return (Decimal(earned) / possible * weight).quantize(CENTS, rounding=ROUND_HALF_UP)
+
+
+def build_gradebook(unit):
+    """
+    Students x assessments matrix for a unit's counted assessments, from
+    three queries (assessments, roster, submissions). Each student row has
+    one cell per assessment (None when nothing was submitted) and totals
+    weighted to the unit's cat_total_points / assessment_total_points, as
+    UnitGrade does. Only graded submissions count towards totals; missing
+    and ungraded work counts as 0 and ungraded work is reported as `pending`.
+    """
+    assessments = list(
+        counted_assessments(unit)
+        .order_by('due_date', 'id')
+        .values('id', 'title', 'assessment_type', 'points', 'due_date')
+    )
+    for assessment in assessments:
+        assessment['category'] = 'cat' if assessment['assessment_type'] in CAT_TYPES else 'assessment'
+    column = {assessment['id']: i for i, assessment in enumerate(assessments)}
+
+    students = {}
+    for enrollment in (StudentEnrollment.objects.filter(course_group_id=unit.course_group_id, is_active=True)
+                       .values('student_id', 'student__username', 'student__first_name', 'student__last_name')):
+        students[enrollment['student_id']] = _student_row(enrollment, len(assessments))
+
+    for submission in (Submission.objects.filter(assessment_id__in=list(column))
+                       .order_by('submitted_at', 'id')
+                       .values('student_id', 'student__username', 'student__first_name', 'student__last_name',
+                               'assessment_id', 'grade', 'auto_graded_score', 'is_graded', 'is_late', 'submitted_at')):
+        # Students who submitted but have since left the class still appear
+        row = students.get(submission['student_id'])
+        if row is None:
+            row = students[submission['student_id']] = _student_row(submission, len(assessments))
+        row['cells'][column[submission['assessment_id']]] = {
+            'grade': _number(submission['grade']),
+            'auto_graded_score': _number(submission['auto_graded_score']),
+            'is_graded': submission['is_graded'],
+            'is_late': submission['is_late'],
+            'submitted_at': submission['submitted_at'],
+        }
+
+    possible = {'cat': 0, 'assessment': 0}
+    for assessment in assessments:
+        possible[assessment['category']] += assessment['points']
+    weights = {'cat': unit.cat_total_points, 'assessment': unit.assessment_total_points}
+
+    rows = sorted(students.values(), key=lambda row: row['username'].lower())
+    for row in rows:
+        earned = {'cat': Decimal('0'), 'assessment': Decimal('0')}
+        for assessment, cell in zip(assessments, row['cells']):
+            if cell is None:
+                continue
+            if cell['is_graded'] and cell['grade'] is not None:
+                earned[assessment['category']] += Decimal(str(cell['grade']))
+            else:
+                row['pending'] += 1
+        scores = {
+            category: weighted_score(earned[category], possible[category], weights[category])
+            for category in ('cat', 'assessment')
+        }
+        for category, score in scores.items():
+            row[f'{category}_score'] = _number(score)
+        row['total'] = _number(sum(score or 0 for score in scores.values()))
+
+    return {
+        'unit': {
+            'id': unit.id, 'code': unit.code, 'name': unit.name,
+            'cat_total_points': unit.cat_total_points,
+            'assessment_total_points': unit.assessment_total_points,
+        },
+        'assessments': assessments,
+        'students': rows,
+    }
+
+
+def _student_row(values, width):
+    name = f"{values['student__first_name']} {values['student__last_name']}".strip()
+    return {
+        'id': values['student_id'],
+        'username': values['student__username'],
+        'name': name or values['student__username'],
+        'cells': [None] * width,
+        'pending': 0,
+    }
+
+
+def cached_gradebook(unit):
+    """
+    build_gradebook() cached until the unit's content, its class list or a
+    submission to one of its assessments changes.
+    """
+    assessment_ids = list(Assessment.objects.filter(unit=unit).order_by('id').values_list('id', flat=True))
+    versions = get_versions(
+        ('unit', unit.id), ('roster', unit.course_group_id),
+        *[('submissions', assessment_id) for assessment_id in assessment_ids]
+    )
+    digest = hashlib.sha1(':'.join(map(str, versions)).encode()).hexdigest()
+    key = f'gradebook:{unit.id}:{digest}'
+    gradebook = cache.get(key)
+    if gradebook is None:
+        gradebook = build_gradebook(unit)
+        cache.set(key, gradebook, GRADEBOOK_TIMEOUT)
+    return gradebook
+
+
+def gradebook_rows(gradebook):
+    """Header row, then one flat row per student, for the CSV/XLSX exports."""
+    assessments = gradebook['assessments']
+    unit = gradebook['unit']
+    yield (
+        ['Username', 'Name']
+        + [f"{a['title']} ({a['assessment_type']}, /{a['points']})" for a in assessments]
+        + [f"CAT /{unit['cat_total_points']}", f"Assessments /{unit['assessment_total_points']}", 'Total', 'Pending']
+    )
+    for row in gradebook['students']:
+        cells = []
+        for cell in row['cells']:
+            if cell is None:
+                cells.append('')
+            elif not cell['is_graded'] or cell['grade'] is None:
+                cells.append('pending')
+            else:
+                cells.append(f"{cell['grade']}{' (late)' if cell['is_late'] else ''}")
+        yield [row['username'], row['name'], *cells, row['cat_score'], row['assessment_score'], row['total'], row['pending']]
+
+
+class _Echo:
+    """File-like object whose write() hands the line back, for streaming csv.writer output."""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(rows):
+    """CSV lines for rows, one at a time, for a StreamingHttpResponse (None -> empty cell)."""
+    writer = csv.writer(_Echo())
+    for row in rows:
+        yield writer.writerow(['' if value is None else value for value in row])
+
+
+def iter_gradebook_csv(gradebook):
+    return iter_csv(gradebook_rows(gradebook))
+
+
+def gradebook_xlsx(gradebook):
+    """
+    The gradebook as an .xlsx in a temporary file, written row by row with
+    openpyxl's write-only mode so memory stays flat for large classes.
+    Returns the open file, rewound; raises RuntimeError without openpyxl.
+    """
+    if Workbook is None:
+        raise RuntimeError('XLSX export requires openpyxl')
+    workbook = Workbook(write_only=True)
+    title = SHEET_TITLE_INVALID.sub('-', gradebook['unit']['code']).strip('-')[:31]
+    sheet = workbook.create_sheet(title=title or 'Gradebook')
+    for row in gradebook_rows(gradebook):
+        sheet.append(row)
+    output = tempfile.TemporaryFile()
+    workbook.save(output)
+    output.seek(0)
+    return output
@@ -0,0 +1,426 @@
+import re
+import unicodedata
+from collections import defaultdict
+from decimal import Decimal, InvalidOperation
+from functools import lru_cache
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Case, DecimalField, F, OuterRef, Subquery, Sum, TextField, Value, When
+from django.db.models.functions import Coalesce
+
+from core.models import Question, QuestionOption, Answer, StudentAnswer, Submission
+from core.utils.cache_versions import bump_version, get_version
+from core.utils.unit_grades import schedule_refresh, refresh_assessment_grades, refresh_submission_grades
+from core.utils.variants import allowed_question_ids
+
+# Accepted answers for SHORT and FILL questions live in Answer.answer_text,
+# one variant per line:
+#   plain text      compared after normalizing case, spacing and sentence
+#                   punctuation (symbols such as "#", "+" or "%" still count)
+#   9.81 ± 0.05     numeric, within the tolerance (also "+-" or "+/-");
+#                   a bare number matches any equal number ("2" == "2.0")
+#   re:colou?r      regular expression that must match the whole answer
+
+MATCHED_TYPES = ('SHORT', 'FILL')
+REGEX_PREFIX = 're:'
+NUMBER = r'[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?'
+NUMERIC_VARIANT = re.compile(rf'^({NUMBER})\s*(?:(?:±|\+/-|\+-)\s*({NUMBER}))?$')
+NUMERIC_RESPONSE = re.compile(rf'^{NUMBER}$')
+# Punctuation that carries meaning in short answers ("C#", "50%", "and/or")
+KEPT_PUNCTUATION = frozenset('#%&*@/\\_')
+ANSWER_KEY_CACHE_SIZE = 64
+REGRADE_BATCH_SIZE = 200
+
+
+def normalize_answer(text):
+    """Casefold, drop sentence punctuation (not KEPT_PUNCTUATION) and collapse whitespace."""
+    text = unicodedata.normalize('NFKC', text or '').casefold()
+    text = ''.join(c for c in text if c in KEPT_PUNCTUATION or not unicodedata.category(c).startswith('P'))
+    return ' '.join(text.split())
+
+
+def answer_key_errors(answer_text):
+    """Messages for the accepted-answer lines that can't be used, e.g. an invalid re: pattern."""
+    errors = []
+    for line in (answer_text or '').splitlines():
+        line = line.strip()
+        if not line.startswith(REGEX_PREFIX):
+            continue
+        try:
+            re.compile(line[len(REGEX_PREFIX):].strip(), re.IGNORECASE)
+        except re.error as e:
+            errors.append(f'Invalid pattern "{line}": {e}')
+    return errors
+
+
+def _parse_number(text):
+    text = (text or '').strip().replace(' ', '')
+    if not NUMERIC_RESPONSE.match(text):
+        return None
+    return float(text)
+
+
+class AnswerMatcher:
+    """The accepted answers of one SHORT/FILL question, compiled once."""
+
+    def __init__(self, variants):
+        self.texts = set()
+        self.numbers = []
+        self.patterns = []
+        for variant in variants:
+            self._add(variant.strip())
+
+    def __bool__(self):
+        return bool(self.texts or self.numbers or self.patterns)
+
+    def _add(self, variant):
+        if not variant:
+            return
+        if variant.startswith(REGEX_PREFIX):
+            try:
+                self.patterns.append(re.compile(variant[len(REGEX_PREFIX):].strip(), re.IGNORECASE))
+            except re.error:
+                pass  # Rejected when the key is written; older keys just don't match on it
+            return
+        numeric = NUMERIC_VARIANT.match(variant)
+        if numeric:
+            self.numbers.append((float(numeric.group(1)), abs(float(numeric.group(2) or 0))))
+            return
+        normalized = normalize_answer(variant)
+        if normalized:
+            self.texts.add(normalized)
+
+    def matches(self, response):
+        if self.texts and normalize_answer(response) in self.texts:
+            return True
+        if self.numbers:
+            value = _parse_number(response)
+            if value is not None and any(
+                abs(value - target) <= tolerance + 1e-9 * max(1.0, abs(target))
+                for target, tolerance in self.numbers
+            ):
+                return True
+        stripped = (response or '').strip()
+        return any(pattern.fullmatch(stripped) for pattern in self.patterns)
+
+
+class AnswerKey:
+    """
+    Everything needed to auto-grade one assessment: its questions, options,
+    answers and compiled SHORT/FILL matchers, loaded in three queries and
+    scored in memory. Use get_answer_key() to share one per paper version.
+    """
+
+    def __init__(self, assessment_id):
+        self.assessment_id = assessment_id
+        self.questions = {q.id: q for q in Question.objects.filter(assessment_id=assessment_id)}
+        self.options = {
+            o.id: o for o in QuestionOption.objects.filter(question__assessment_id=assessment_id)
+        }
+        self.answers = defaultdict(list)
+        for answer in Answer.objects.filter(question__assessment_id=assessment_id).order_by('id'):
+            self.answers[answer.question_id].append(answer)
+
+        # Paper order, which per-student variants are drawn from
+        self.question_order = [q.id for q in sorted(self.questions.values(), key=lambda q: (q.order, q.id))]
+
+        self.matchers = {}
+        for question in self.questions.values():
+            if question.question_type not in MATCHED_TYPES:
+                continue
+            matcher = AnswerMatcher(
+                line for answer in self.answers.get(question.id, []) for line in answer.answer_text.splitlines()
+            )
+            if matcher:
+                self.matchers[question.id] = matcher
+
+    def score(self, question, selected_option_id, answer_text):
+        """
+        (is_correct, points_earned) for one response, or (None, None) when the
+        question type needs a trainer to grade it.
+        """
+        if question.question_type == 'MCQ':
+            option = self.options.get(selected_option_id)
+            if option is None:
+                return None, None
+            return self._result(question, option.is_correct)
+
+        if question.question_type == 'TF':
+            answers = self.answers.get(question.id)
+            if not answers:
+                return None, None
+            is_true = (answer_text or '').lower() == 'true'
+            return self._result(question, is_true == answers[0].is_correct_for_tf)
+
+        matcher = self.matchers.get(question.id)
+        if matcher is not None:
+            return self._result(question, matcher.matches(answer_text))
+
+        return None, None
+
+    def _result(self, question, is_correct):
+        return is_correct, question.points if is_correct else 0
+
+
+@lru_cache(maxsize=ANSWER_KEY_CACHE_SIZE)
+def _cached_answer_key(assessment_id, version):
+    return AnswerKey(assessment_id)
+
+
+def get_answer_key(assessment_id):
+    """
+    AnswerKey for an assessment, reused within this process until the paper
+    changes (invalidate_paper bumps the 'paper' version).
+    """
+    return _cached_answer_key(assessment_id, get_version('paper', assessment_id))
+
+
+def resolve_answers(answers_data, key, allowed_ids=None):
+    """
+    Check raw answer dicts against an assessment's key.
+    Returns [(question, option, answer_text)]; raises ValidationError listing
+    every answer that names a question or option outside the paper, or a
+    question outside `allowed_ids` (the student's variant) when given.
+    """
+    errors = []
+    resolved = []
+    for index, answer_data in enumerate(answers_data):
+        if not isinstance(answer_data, dict):
+            errors.append(f'answers[{index}]: must be an object')
+            continue
+        question = key.questions.get(_as_int(answer_data.get('question_id')))
+        if question is None or (allowed_ids is not None and question.id not in allowed_ids):
+            errors.append(f'answers[{index}]: question {answer_data.get("question_id")} is not part of this assessment')
+            continue
+
+        selected_option_id = _as_int(answer_data.get('selected_option_id'))
+        option = key.options.get(selected_option_id)
+        if selected_option_id is not None and (option is None or option.question_id != question.id):
+            errors.append(f'answers[{index}]: option {selected_option_id} does not belong to question {question.id}')
+            continue
+
+        resolved.append((question, option, answer_data.get('answer_text') or ''))
+
+    if errors:
+        raise ValidationError(errors)
+    return resolved
+
+
+def build_student_answers(submission, answers_data, key, allowed_ids=None):
+    """Validate raw answer dicts against the key and build unsaved, scored StudentAnswers."""
+    student_answers = []
+    for question, option, answer_text in resolve_answers(answers_data, key, allowed_ids):
+        is_correct, points_earned = key.score(question, option.id if option else None, answer_text)
+        student_answers.append(StudentAnswer(
+            submission=submission,
+            question=question,
+            selected_option=option,
+            answer_text=answer_text,
+            is_correct=is_correct,
+            points_earned=points_earned
+        ))
+    return student_answers
+
+
+def grade_submission(submission, answers_data):
+    """
+    Save and auto-grade a student's answers for a submission.
+    A fixed number of queries whatever the paper size: the answer key (cached
+    per paper version), one bulk insert and one update of the submission,
+    all in one transaction.
+    Returns (student_answers, auto_graded_score).
+    """
+    key = get_answer_key(submission.assessment_id)
+    allowed_ids = allowed_question_ids(submission.assessment, submission.student_id, key.question_order)
+    student_answers = build_student_answers(submission, answers_data, key, allowed_ids)
+    auto_graded_score = sum((a.points_earned for a in student_answers if a.is_correct), 0)
+
+    with transaction.atomic():
+        created = StudentAnswer.objects.bulk_create(student_answers)
+        Submission.objects.filter(pk=submission.pk).update(auto_graded_score=auto_graded_score)
+    submission.auto_graded_score = auto_graded_score
+    # Bulk writes send no signals
+    bump_version('submissions', submission.assessment_id)
+
+    if created and created[0].pk is None:
+        # Backends that can't return ids from a bulk insert (MySQL)
+        created = list(
+            StudentAnswer.objects.filter(submission=submission).select_related('question', 'selected_option')
+        )
+    return created, auto_graded_score
+
+
+def regrade_assessment(assessment_id, batch_size=REGRADE_BATCH_SIZE, on_progress=None):
+    """
+    Re-score every auto-gradable answer of an assessment against its current
+    key and refresh the submission totals. Works through submissions in
+    batches: two queries to load a batch, then bulk updates of only the
+    answers and submissions whose marks changed. Answers to questions that
+    need a trainer keep their manual marks. Returns the number of answers
+    changed; on_progress(processed_submissions) is called after each batch.
+    """
+    key = get_answer_key(assessment_id)
+    submission_ids = list(
+        Submission.objects.filter(assessment_id=assessment_id).order_by('id').values_list('id', flat=True)
+    )
+    changed = 0
+    for start in range(0, len(submission_ids), batch_size):
+        changed += _regrade_batch(key, submission_ids[start:start + batch_size])
+        if on_progress is not None:
+            on_progress(min(start + batch_size, len(submission_ids)))
+    bump_version('submissions', assessment_id)
+    schedule_refresh(refresh_assessment_grades, assessment_id)
+    return changed
+
+
+def _regrade_batch(key, submission_ids):
+    submissions = Submission.objects.filter(id__in=submission_ids).only(
+        'id', 'auto_graded_score', 'grade', 'is_graded'
+    )
+    answers_by_submission = defaultdict(list)
+    for answer in StudentAnswer.objects.filter(submission_id__in=submission_ids).only(
+        'id', 'submission_id', 'question_id', 'selected_option_id', 'answer_text', 'is_correct', 'points_earned'
+    ):
+        answers_by_submission[answer.submission_id].append(answer)
+
+    changed_answers = []
+    changed_submissions = []
+    for submission in submissions:
+        answers = answers_by_submission[submission.id]
+        if not answers:
+            continue  # File or text submissions: nothing to re-score
+        auto_graded_score = 0
+        for answer in answers:
+            question = key.questions.get(answer.question_id)
+            if question is None:
+                continue
+            is_correct, points_earned = key.score(question, answer.selected_option_id, answer.answer_text)
+            if is_correct is None:
+                continue
+            if is_correct:
+                auto_graded_score += points_earned
+            if answer.is_correct != is_correct or answer.points_earned != points_earned:
+                answer.is_correct = is_correct
+                answer.points_earned = points_earned
+                changed_answers.append(answer)
+
+        # Graded submissions keep grade == sum of all answer marks, as grade_answers sets it
+        grade = submission.grade
+        if submission.is_graded:
+            grade = sum((a.points_earned or 0 for a in answers), 0)
+        if submission.auto_graded_score != auto_graded_score or submission.grade != grade:
+            submission.auto_graded_score = auto_graded_score
+            submission.grade = grade
+            changed_submissions.append(submission)
+
+    with transaction.atomic():
+        StudentAnswer.objects.bulk_update(changed_answers, ['is_correct', 'points_earned'], batch_size=500)
+        Submission.objects.bulk_update(changed_submissions, ['auto_graded_score', 'grade'], batch_size=500)
+    return len(changed_answers)
+
+
+def apply_manual_grades(grades, submission_ids=None, assessment_id=None, trainer_id=None, submission_feedback=None):
+    """
+    Apply trainer marks to many answers, across any number of submissions.
+    `grades` is [{'answer_id', 'points_earned', 'feedback'?}]; a null mark
+    clears it and a missing feedback keeps the answer's current one. With `submission_ids` every
+    answer must belong to one of them and all of them get their grade
+    recomputed (even with no answers marked); otherwise the submissions
+    are those of the answers, which must belong to `assessment_id` when
+    given. With `trainer_id` the answers must be in that trainer's units.
+    `submission_feedback` maps submission id to its overall feedback.
+
+    Every row is checked first (the answer exists and belongs to the
+    submission, the mark is between 0 and the question's points), raising
+    ValidationError listing all the problems. Then, in one transaction, the
+    answers are written with a single bulk_update and each submission's
+    grade is set to the sum of its answer marks by a single UPDATE.
+    Returns the ids of the graded submissions.
+    """
+    if not isinstance(grades, list):
+        raise ValidationError('graded_answers must be a list')
+
+    answer_ids = {_as_int(grade.get('answer_id')) for grade in grades if isinstance(grade, dict)} - {None}
+    answers_queryset = StudentAnswer.objects.filter(id__in=answer_ids)
+    if trainer_id is not None:
+        answers_queryset = answers_queryset.filter(submission__assessment__unit__trainer_id=trainer_id)
+    answers = {
+        answer['id']: answer
+        for answer in answers_queryset.values(
+            'id', 'submission_id', 'submission__assessment_id', 'feedback', 'question__points'
+        )
+    }
+    allowed_submissions = set(submission_ids) if submission_ids is not None else None
+
+    errors = []
+    updates = {}
+    for row, grade in enumerate(grades, start=1):
+        if not isinstance(grade, dict):
+            errors.append(f'Row {row}: must be an object')
+            continue
+        answer = answers.get(_as_int(grade.get('answer_id')))
+        if (answer is None
+                or (allowed_submissions is not None and answer['submission_id'] not in allowed_submissions)
+                or (assessment_id is not None and answer['submission__assessment_id'] != assessment_id)):
+            errors.append(f'Row {row}: answer {grade.get("answer_id")} not found')
+            continue
+        points_earned = grade.get('points_earned')
+        if points_earned is not None:  # None clears the mark
+            try:
+                points_earned = Decimal(str(points_earned))
+            except InvalidOperation:
+                points_earned = Decimal('NaN')
+            if not points_earned.is_finite() or not 0 <= points_earned <= answer['question__points']:
+                errors.append(f'Row {row}: points_earned must be a number between 0 and {answer["question__points"]}')
+                continue
+        feedback = grade.get('feedback')
+        updates[answer['id']] = StudentAnswer(
+            id=answer['id'],
+            points_earned=points_earned,
+            feedback=answer['feedback'] if feedback is None else str(feedback)
+        )
+    if errors:
+        raise ValidationError(errors)
+
+    graded_submissions = set(allowed_submissions or ()) | {answers[answer_id]['submission_id'] for answer_id in updates}
+    submission_totals = (
+        StudentAnswer.objects.filter(submission=OuterRef('pk'))
+        .values('submission').annotate(total=Sum('points_earned')).values('total')
+    )
+    fields = {
+        'grade': Coalesce(
+            Subquery(submission_totals), Value(Decimal('0')),
+            output_field=DecimalField(max_digits=5, decimal_places=2)
+        ),
+        'is_graded': True,
+    }
+    feedback = {
+        submission_id: text for submission_id, text in (submission_feedback or {}).items()
+        if submission_id in graded_submissions
+    }
+    if feedback:
+        fields['feedback'] = Case(
+            *[When(pk=submission_id, then=Value(text)) for submission_id, text in feedback.items()],
+            default=F('feedback'),
+            output_field=TextField()
+        )
+
+    with transaction.atomic():
+        StudentAnswer.objects.bulk_update(list(updates.values()), ['points_earned', 'feedback'], batch_size=500)
+        Submission.objects.filter(pk__in=graded_submissions).update(**fields)
+
+    # Neither write sends signals
+    for assessment_id in set(
+        Submission.objects.filter(pk__in=graded_submissions).values_list('assessment_id', flat=True)
+    ):
+        bump_version('submissions', assessment_id)
+    schedule_refresh(refresh_submission_grades, graded_submissions)
+    return graded_submissions
+
+
+def _as_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
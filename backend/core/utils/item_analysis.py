@@ -0,0 +1,198 @@
+import warnings
+
+import numpy as np
+from django.core.cache import cache
+
+from core.models import Assessment, Question, QuestionOption, StudentAnswer, Submission
+from core.utils.cache_versions import get_versions
+from core.utils.variants import allowed_question_ids
+
+ANALYSIS_TIMEOUT = 60 * 60 * 24
+# Share of the cohort in each of the upper and lower groups for the discrimination index
+GROUP_FRACTION = 0.27
+PERCENTILES = (10, 25, 50, 75, 90)
+HISTOGRAM_BINS = 10
+
+
+def _number(value, digits=4):
+    """numpy scalar -> JSON-friendly float (NaN -> None)."""
+    if value is None or np.isnan(value):
+        return None
+    return round(float(value), digits)
+
+
+def _index(ids, values):
+    """Positions of `values` in the sorted id array `ids`."""
+    return np.searchsorted(ids, values)
+
+
+def build_score_matrix(assessment_id):
+    """
+    (submission_ids, questions, matrix, selected, served). matrix[s, q] is
+    the share of question q's points earned by submission s: 0 when
+    unanswered, NaN while waiting for a trainer or when q was not in the
+    student's variant (questions_per_student), which served[s, q] tells
+    apart. selected[s, q] is the picked option id (0 for none). One query
+    per table.
+    """
+    assessment = Assessment.objects.filter(pk=assessment_id).only('id', 'questions_per_student').first()
+    questions = list(
+        Question.objects.filter(assessment_id=assessment_id)
+        .order_by('order', 'id')
+        .values('id', 'order', 'question_text', 'question_type', 'points')
+    )
+    submissions = list(
+        Submission.objects.filter(assessment_id=assessment_id).order_by('id').values_list('id', 'student_id')
+    )
+    submission_ids = np.array([submission_id for submission_id, _ in submissions], dtype=np.int64)
+    answers = np.array(
+        list(StudentAnswer.objects.filter(submission__assessment_id=assessment_id)
+             .values_list('submission_id', 'question_id', 'points_earned', 'selected_option_id')),
+        dtype=object
+    ).reshape(-1, 4)
+
+    question_ids = np.array([q['id'] for q in questions], dtype=np.int64)
+    order = np.argsort(question_ids)
+    sorted_question_ids = question_ids[order]
+    points = np.array([q['points'] for q in questions], dtype=float)
+
+    matrix = np.zeros((len(submission_ids), len(questions)))
+    selected = np.zeros((len(submission_ids), len(questions)), dtype=np.int64)
+    served = np.ones((len(submission_ids), len(questions)), dtype=bool)
+    if assessment is not None and assessment.questions_per_student:
+        paper = [q['id'] for q in questions]
+        for row, (_, student_id) in enumerate(submissions):
+            allowed = allowed_question_ids(assessment, student_id, paper)
+            served[row] = [question_id in allowed for question_id in paper]
+        matrix[~served] = np.nan
+    if len(answers) and len(questions):
+        rows = _index(submission_ids, answers[:, 0].astype(np.int64))
+        cols = order[_index(sorted_question_ids, answers[:, 1].astype(np.int64))]
+        earned = np.array([np.nan if p is None else float(p) for p in answers[:, 2]])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            matrix[rows, cols] = np.where(points[cols] > 0, earned / points[cols], np.nan)
+        selected[rows, cols] = [0 if o is None else o for o in answers[:, 3]]
+    return submission_ids, questions, matrix, selected, served
+
+
+def analyze_assessment(assessment_id):
+    """
+    Item analysis for an assessment: per question difficulty (mean share of
+    points earned), the upper/lower 27% discrimination index, the corrected
+    item-total (point-biserial) correlation and, for MCQ, how often each
+    option was picked; plus the distribution of total scores.
+    """
+    submission_ids, questions, matrix, selected, served = build_score_matrix(assessment_id)
+    points = np.array([q['points'] for q in questions], dtype=float)
+    n_students = len(submission_ids)
+    served_counts = served.sum(axis=0)
+
+    totals = np.nansum(matrix * points, axis=1) if n_students else np.zeros(0)
+    possible = (served * points).sum(axis=1) if n_students else np.zeros(0)
+    max_points = possible.max() if n_students else points.sum()
+
+    # Students with different variants are ranked on the share of their own paper
+    with np.errstate(invalid='ignore', divide='ignore'):
+        ranking = np.argsort(np.where(possible > 0, totals / possible, 0), kind='stable')
+    group_size = max(1, int(round(n_students * GROUP_FRACTION))) if n_students else 0
+    lower, upper = ranking[:group_size], ranking[n_students - group_size:]
+
+    difficulty = discrimination = point_biserial = np.full(len(questions), np.nan)
+    with warnings.catch_warnings(), np.errstate(invalid='ignore', divide='ignore'):
+        # All-NaN columns (nothing graded yet) just come out as NaN
+        warnings.simplefilter('ignore', RuntimeWarning)
+        if n_students:
+            difficulty = np.nanmean(matrix, axis=0)
+        if n_students >= 2:
+            discrimination = np.nanmean(matrix[upper], axis=0) - np.nanmean(matrix[lower], axis=0)
+
+            # Correlate each item with the total of the other items, over the
+            # students who have a score for it
+            scored = ~np.isnan(matrix)
+            scores = np.where(scored, matrix, 0) * points
+            rest = totals[:, None] - scores
+            n_scored = scored.sum(axis=0)
+            item_dev = np.where(scored, scores - scores.sum(axis=0) / n_scored, 0)
+            rest_dev = np.where(scored, rest - (rest * scored).sum(axis=0) / n_scored, 0)
+            point_biserial = (item_dev * rest_dev).sum(axis=0) / np.sqrt(
+                (item_dev ** 2).sum(axis=0) * (rest_dev ** 2).sum(axis=0)
+            )
+
+    options_by_question = {}
+    for option in (QuestionOption.objects.filter(question__assessment_id=assessment_id)
+                   .order_by('order', 'id').values('id', 'question_id', 'option_text', 'is_correct')):
+        options_by_question.setdefault(option['question_id'], []).append(option)
+
+    items = []
+    for column, question in enumerate(questions):
+        item = {
+            'question': question['id'],
+            'order': question['order'],
+            'question_text': question['question_text'],
+            'question_type': question['question_type'],
+            'points': question['points'],
+            'served': int(served_counts[column]),
+            'difficulty': _number(difficulty[column]),
+            'discrimination': _number(discrimination[column]),
+            'point_biserial': _number(point_biserial[column]),
+        }
+        options = options_by_question.get(question['id'])
+        if question['question_type'] == 'MCQ' and options:
+            picks = selected[:, column]
+            option_ids = np.array([o['id'] for o in options])
+            counts = (picks[:, None] == option_ids[None, :]).sum(axis=0)
+            upper_counts = (picks[upper][:, None] == option_ids[None, :]).sum(axis=0)
+            lower_counts = (picks[lower][:, None] == option_ids[None, :]).sum(axis=0)
+            item['options'] = [
+                {
+                    'id': option['id'],
+                    'option_text': option['option_text'],
+                    'is_correct': option['is_correct'],
+                    'count': int(counts[i]),
+                    'share': _number(counts[i] / served_counts[column]) if served_counts[column] else None,
+                    'upper_count': int(upper_counts[i]),
+                    'lower_count': int(lower_counts[i]),
+                }
+                for i, option in enumerate(options)
+            ]
+            item['no_answer'] = int(((picks == 0) & served[:, column]).sum())
+        items.append(item)
+
+    return {
+        'assessment': assessment_id,
+        'students': n_students,
+        'max_points': _number(max_points, 2),
+        'distribution': _distribution(totals, possible),
+        'questions': items,
+    }
+
+
+def _distribution(totals, possible):
+    """Summary of total scores; the histogram is of each student's percentage of their own paper."""
+    if not len(totals):
+        return {'mean': None, 'std': None, 'min': None, 'max': None, 'percentiles': {}, 'histogram': []}
+    with np.errstate(invalid='ignore', divide='ignore'):
+        percent = np.where(possible > 0, totals / possible * 100, 0)
+    counts, edges = np.histogram(percent, bins=HISTOGRAM_BINS, range=(0, 100))
+    return {
+        'mean': _number(totals.mean(), 2),
+        'std': _number(totals.std(), 2),
+        'min': _number(totals.min(), 2),
+        'max': _number(totals.max(), 2),
+        'percentiles': {str(p): _number(v, 2) for p, v in zip(PERCENTILES, np.percentile(totals, PERCENTILES))},
+        'histogram': [
+            {'from_percent': int(edges[i]), 'to_percent': int(edges[i + 1]), 'count': int(counts[i])}
+            for i in range(HISTOGRAM_BINS)
+        ],
+    }
+
+
+def cached_item_analysis(assessment_id):
+    """analyze_assessment() cached until a submission or answer, or the paper, of the assessment changes."""
+    submissions_version, paper_version = get_versions(('submissions', assessment_id), ('paper', assessment_id))
+    key = f'item-analysis:{assessment_id}:{submissions_version}:{paper_version}'
+    result = cache.get(key)
+    if result is None:
+        result = analyze_assessment(assessment_id)
+        cache.set(key, result, ANALYSIS_TIMEOUT)
+    return result
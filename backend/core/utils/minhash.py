@@ -0,0 +1,71 @@
+import hashlib
+import re
+import zlib
+
+import numpy as np
+
+# Pure MinHash/LSH helpers with no Django imports; minhash_signature() is
+# what core.utils.similarity runs in its process pool.
+#
+# A document is reduced to its set of SHINGLE_SIZE-word shingles; each of
+# NUM_PERM universal hash functions keeps its minimum over that set. The
+# share of equal positions in two signatures estimates the Jaccard
+# similarity of the shingle sets. For LSH the signature is cut into BANDS
+# bands: documents sharing any whole band are candidates, so a pair with
+# similarity s becomes a candidate with probability 1 - (1 - s^r)^BANDS
+# (r = rows per band): about 50% at s = 0.38, over 99.9% at s = 0.7.
+
+SHINGLE_SIZE = 5
+NUM_PERM = 128
+BANDS = 32
+ROWS_PER_BAND = NUM_PERM // BANDS
+# Hash values and coefficients stay below 2^31, so a * x + b fits in uint64
+PRIME = (1 << 31) - 1
+
+_coefficients = np.random.default_rng(20240101)
+_A = _coefficients.integers(1, PRIME, NUM_PERM, dtype=np.uint64)
+_B = _coefficients.integers(0, PRIME, NUM_PERM, dtype=np.uint64)
+# Shingles hashed per permutation pass, to bound the size of the temporary matrix
+_CHUNK = 4096
+
+WORD = re.compile(r'\w+')
+
+
+def shingles(text):
+    """Set of SHINGLE_SIZE-word shingles of casefolded text (the whole text when shorter)."""
+    words = WORD.findall(text.casefold())
+    if len(words) <= SHINGLE_SIZE:
+        return {' '.join(words)} if words else set()
+    return {' '.join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+
+def minhash_signature(text):
+    """(signature as a list of NUM_PERM ints, shingle count); ([], 0) for empty text."""
+    hashes = np.fromiter(
+        (zlib.crc32(shingle.encode()) % PRIME for shingle in shingles(text)), dtype=np.uint64
+    )
+    if not len(hashes):
+        return [], 0
+    signature = np.full(NUM_PERM, PRIME, dtype=np.uint64)
+    for start in range(0, len(hashes), _CHUNK):
+        chunk = hashes[start:start + _CHUNK]
+        values = (np.outer(_A, chunk) + _B[:, None]) % PRIME
+        signature = np.minimum(signature, values.min(axis=1))
+    return signature.tolist(), len(hashes)
+
+
+def band_buckets(signature):
+    """One signed 64-bit bucket id per band; equal ids mean an equal band."""
+    buckets = []
+    for band in range(BANDS):
+        rows = signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND]
+        digest = hashlib.blake2b(f'{band}:{rows}'.encode(), digest_size=8).digest()
+        buckets.append(int.from_bytes(digest, 'big', signed=True))
+    return buckets
+
+
+def estimated_similarity(signature_a, signature_b):
+    """Estimated Jaccard similarity of two signatures' documents (0..1)."""
+    if not signature_a or len(signature_a) != len(signature_b):
+        return 0.0
+    return float(np.mean(np.asarray(signature_a) == np.asarray(signature_b)))
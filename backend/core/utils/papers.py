@@ -0,0 +1,86 @@
+from django.db.models import F
+
+from core.models import Assessment, AssessmentPaper, Question, QuestionOption
+from core.utils.cache_versions import bump_version
+
+
+def build_paper_payload(assessment_id):
+    """
+    Student-safe snapshot of an assessment's questions and options.
+    Same shape as QuestionSerializer output, minus `correct_answers` and
+    the options' `is_correct` flags. Two queries regardless of paper size.
+    """
+    questions = list(
+        Question.objects.filter(assessment_id=assessment_id)
+        .order_by('order', 'id')
+        .values('id', 'assessment_id', 'question_text', 'question_type', 'points', 'order', 'image')
+    )
+    options_by_question = {}
+    for option in (QuestionOption.objects
+                   .filter(question__assessment_id=assessment_id)
+                   .order_by('order', 'id')
+                   .values('id', 'question_id', 'option_text', 'order')):
+        options_by_question.setdefault(option['question_id'], []).append({
+            'id': option['id'],
+            'question': option['question_id'],
+            'option_text': option['option_text'],
+            'order': option['order'],
+        })
+
+    image_field = Question._meta.get_field('image')
+    paper = []
+    for question in questions:
+        image = question['image']
+        paper.append({
+            'id': question['id'],
+            'assessment': question['assessment_id'],
+            'question_text': question['question_text'],
+            'question_type': question['question_type'],
+            'points': question['points'],
+            'order': question['order'],
+            'image': image_field.storage.url(image) if image else None,
+            'options': options_by_question.get(question['id'], []),
+        })
+    return {'questions': paper}
+
+
+def invalidate_paper(assessment_id, unit_id=None):
+    """
+    Mark the stored paper stale. Bumping the version also voids any rebuild
+    already in flight; the 'paper' cache version retires cached answer keys
+    and the 'unit' one the cached unit detail (its question counts). The
+    unit is looked up unless the caller already has it.
+    """
+    bump_version('paper', assessment_id)
+    if unit_id is None:
+        unit_id = Assessment.objects.filter(pk=assessment_id).values_list('unit_id', flat=True).first()
+    if unit_id is not None:
+        bump_version('unit', unit_id)
+    AssessmentPaper.objects.filter(assessment_id=assessment_id).update(
+        is_stale=True, version=F('version') + 1
+    )
+
+
+def rebuild_paper(assessment_id):
+    """Rebuild and store the paper; returns (version, payload)."""
+    paper, _ = AssessmentPaper.objects.get_or_create(assessment_id=assessment_id)
+    payload = build_paper_payload(assessment_id)
+    # Only store it if nothing changed while we were building
+    AssessmentPaper.objects.filter(pk=paper.pk, version=paper.version).update(
+        payload=payload, is_stale=False
+    )
+    return paper.version, payload
+
+
+def get_paper(assessment_id):
+    """
+    Return (version, payload) for an assessment's paper with a single lookup,
+    rebuilding it first if it is missing or stale.
+    """
+    row = (AssessmentPaper.objects
+           .filter(assessment_id=assessment_id, is_stale=False)
+           .values_list('version', 'payload')
+           .first())
+    if row is not None:
+        return row
+    return rebuild_paper(assessment_id)
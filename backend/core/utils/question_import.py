@@ -0,0 +1,263 @@
+import csv
+import io
+import re
+
+from django.db import connection, transaction
+from django.db.models import Max
+
+from core.models import Question, QuestionOption, Answer
+from core.utils.grading import answer_key_errors
+from core.utils.papers import invalidate_paper
+
+# Every format is parsed into the same row shape, which is what the JSON
+# format takes directly (the same fields QuestionSerializer accepts):
+#   {"question_text", "question_type", "points", "order",
+#    "options": [{"option_text", "is_correct"}],
+#    "correct_answers": [{"answer_text"} | {"is_correct_for_tf"}]}
+#
+# CSV columns: question_type, question_text, points, options, answer
+#   options  "|"-separated option texts (MCQ)
+#   answer   MCQ: correct option text(s) or 1-based number(s), "|"-separated
+#            TF: true/false; SHORT/FILL: accepted answers, "|"-separated
+#
+# GIFT-like text, one question per paragraph ("//" lines are comments):
+#   ::Title:: 2 + 2 is {=4 ~5 ~22}           MCQ
+#   The sky is blue {TRUE}                   TF  (T/F/TRUE/FALSE)
+#   Capital of Kenya? {=Nairobi =Nairobi City}  SHORT
+#   Water boils at {=100} degrees.           FILL (text after the braces)
+#   Explain osmosis. {}                      ESSAY
+#   An optional leading "[3]" sets the points.
+
+QUESTION_TYPES = {code for code, _ in Question.QUESTION_TYPES}
+# Largest value a PositiveIntegerField holds on every supported database
+MAX_INTEGER = 2147483647
+FORMATS = ('json', 'csv', 'gift')
+BLANK = '_____'
+
+
+class QuestionImportError(ValueError):
+    """The whole import was rejected; `errors` is [{'row': n, 'errors': [...]}]."""
+
+    def __init__(self, errors):
+        super().__init__('Invalid question import')
+        self.errors = errors
+
+
+def parse_questions(content, import_format):
+    """Parse JSON (already decoded), CSV or GIFT text into import rows."""
+    if import_format == 'json':
+        if not isinstance(content, list):
+            raise QuestionImportError([{'row': 0, 'errors': ['questions must be a list']}])
+        return content
+    if import_format == 'csv':
+        return _parse_csv(content)
+    if import_format == 'gift':
+        return _parse_gift(content)
+    raise QuestionImportError([{'row': 0, 'errors': [f'format must be one of {", ".join(FORMATS)}']}])
+
+
+def _split(value):
+    return [part.strip() for part in (value or '').split('|') if part.strip()]
+
+
+def _parse_csv(text):
+    rows = []
+    for record in csv.DictReader(io.StringIO(text)):
+        record = {(key or '').strip().lower(): (value or '').strip() for key, value in record.items()}
+        question_type = record.get('question_type', '').upper()
+        row = {
+            'question_text': record.get('question_text', ''),
+            'question_type': question_type,
+            'points': record.get('points') or 1,
+            'options': [],
+            'correct_answers': [],
+        }
+        answers = _split(record.get('answer'))
+        if question_type == 'MCQ':
+            option_texts = _split(record.get('options'))
+            correct = set()
+            for answer in answers:
+                if answer.isdigit() and 1 <= int(answer) <= len(option_texts):
+                    correct.add(int(answer) - 1)
+                else:
+                    correct.update(i for i, text in enumerate(option_texts) if text == answer)
+            row['options'] = [
+                {'option_text': text, 'is_correct': i in correct} for i, text in enumerate(option_texts)
+            ]
+        elif question_type == 'TF':
+            if answers:
+                row['correct_answers'] = [{'is_correct_for_tf': _parse_bool(answers[0])}]
+        elif answers:
+            row['correct_answers'] = [{'answer_text': '\n'.join(answers)}]
+        rows.append(row)
+    return rows
+
+
+def _parse_bool(value):
+    value = str(value).strip().lower()
+    if value in ('true', 't', '1', 'yes'):
+        return True
+    if value in ('false', 'f', '0', 'no'):
+        return False
+    return None
+
+
+GIFT_TITLE = re.compile(r'^::.*?::\s*', re.DOTALL)
+GIFT_POINTS = re.compile(r'^\[(\d+)\]\s*')
+GIFT_ANSWERS = re.compile(r'(?<!\\)\{(.*?)(?<!\\)\}', re.DOTALL)
+GIFT_CHOICE = re.compile(r'(?<!\\)([=~])')
+GIFT_WEIGHT = re.compile(r'^%-?\d+(?:\.\d+)?%')
+
+
+def _gift_unescape(text):
+    return re.sub(r'\\([=~{}#:\\])', r'\1', text).strip()
+
+
+def _parse_gift(text):
+    rows = []
+    lines = [line for line in text.splitlines() if not line.lstrip().startswith('//')]
+    for block in re.split(r'\n\s*\n', '\n'.join(lines)):
+        block = GIFT_TITLE.sub('', block.strip())
+        if not block:
+            continue
+        points = 1
+        points_match = GIFT_POINTS.match(block)
+        if points_match:
+            points = int(points_match.group(1))
+            block = block[points_match.end():]
+
+        match = GIFT_ANSWERS.search(block)
+        if match is None:
+            rows.append({'question_text': _gift_unescape(block), 'question_type': '', 'points': points})
+            continue
+
+        before, body, after = block[:match.start()].strip(), match.group(1).strip(), block[match.end():].strip()
+        row = {'points': points, 'options': [], 'correct_answers': []}
+        choices = [
+            (marker, _gift_unescape(GIFT_WEIGHT.sub('', part.strip()).split('#')[0]))
+            for marker, part in zip(GIFT_CHOICE.findall(body), GIFT_CHOICE.split(body)[2::2])
+        ]
+
+        if not body:
+            row.update(question_type='ESSAY', question_text=_gift_unescape(before))
+        elif not choices:
+            row.update(question_type='TF', question_text=_gift_unescape(before),
+                       correct_answers=[{'is_correct_for_tf': _parse_bool(body.split('#')[0])}])
+        elif any(marker == '~' for marker, _ in choices):
+            row.update(question_type='MCQ', question_text=_gift_unescape(before), options=[
+                {'option_text': text, 'is_correct': marker == '='} for marker, text in choices
+            ])
+        else:
+            accepted = '\n'.join(text for _, text in choices)
+            if after:
+                row.update(question_type='FILL', question_text=f'{_gift_unescape(before)} {BLANK} {_gift_unescape(after)}')
+            else:
+                row.update(question_type='SHORT', question_text=_gift_unescape(before))
+            row['correct_answers'] = [{'answer_text': accepted}]
+        rows.append(row)
+    return rows
+
+
+def validate_rows(rows):
+    """Normalize rows in place; raises QuestionImportError listing every bad row (1-based)."""
+    errors = []
+    for index, row in enumerate(rows, start=1):
+        row_errors = _row_errors(row)
+        if row_errors:
+            errors.append({'row': index, 'errors': row_errors})
+    if errors:
+        raise QuestionImportError(errors)
+    return rows
+
+
+def _row_errors(row):
+    if not isinstance(row, dict):
+        return ['must be an object']
+    errors = []
+    row['question_text'] = str(row.get('question_text') or '').strip()
+    row['question_type'] = str(row.get('question_type') or '').strip().upper()
+    if not row['question_text']:
+        errors.append('question_text is required')
+    if row['question_type'] not in QUESTION_TYPES:
+        errors.append(f'question_type must be one of {", ".join(sorted(QUESTION_TYPES))}')
+
+    for field, default in (('points', 1), ('order', None)):
+        value = row.get(field)
+        if value in (None, ''):
+            row[field] = default
+            continue
+        try:
+            row[field] = int(value)
+            if not 0 <= row[field] <= MAX_INTEGER:
+                raise ValueError
+        except (TypeError, ValueError):
+            errors.append(f'{field} must be a whole number from 0 to {MAX_INTEGER}')
+
+    options = row.get('options') or []
+    answers = row.get('correct_answers') or []
+    if not isinstance(options, list) or not isinstance(answers, list):
+        return errors + ['options and correct_answers must be lists']
+    row['options'] = [
+        {'option_text': str(o.get('option_text') or '').strip(), 'is_correct': _parse_bool(o.get('is_correct')) is True}
+        for o in options if isinstance(o, dict)
+    ]
+    # The true/false flag only means something (and is only stored) for TF questions
+    is_tf = row['question_type'] == 'TF'
+    row['correct_answers'] = [
+        {'answer_text': str(a.get('answer_text') or ''),
+         'is_correct_for_tf': _parse_bool(a.get('is_correct_for_tf')) if is_tf else None}
+        for a in answers if isinstance(a, dict)
+    ]
+
+    if row['question_type'] == 'MCQ':
+        if len(row['options']) < 2 or any(not o['option_text'] for o in row['options']):
+            errors.append('MCQ questions need at least two non-empty options')
+        if not any(o['is_correct'] for o in row['options']):
+            errors.append('MCQ questions need a correct option')
+    elif row['question_type'] == 'TF':
+        if len(row['correct_answers']) != 1 or not isinstance(row['correct_answers'][0]['is_correct_for_tf'], bool):
+            errors.append('TF questions need one true/false answer')
+    for answer in row['correct_answers']:
+        errors.extend(answer_key_errors(answer['answer_text']))
+    return errors
+
+
+def import_questions(assessment, rows):
+    """
+    Validate every row, then create the questions, options and answers in one
+    transaction with three bulk inserts. Rows without an order go after the
+    assessment's existing questions. Returns the created questions.
+    """
+    validate_rows(rows)
+    with transaction.atomic():
+        next_order = (Question.objects.filter(assessment=assessment).aggregate(m=Max('order'))['m'] or 0) + 1
+        questions = []
+        for row in rows:
+            order = row['order']
+            if order is None:
+                order, next_order = next_order, next_order + 1
+            questions.append(Question(
+                assessment=assessment, question_text=row['question_text'],
+                question_type=row['question_type'], points=row['points'], order=order
+            ))
+
+        if connection.features.can_return_rows_from_bulk_insert:
+            Question.objects.bulk_create(questions)
+        else:
+            # Without RETURNING (MySQL) bulk-inserted rows come back without ids
+            for question in questions:
+                question.save()
+
+        options = []
+        answers = []
+        for question, row in zip(questions, rows):
+            options.extend(
+                QuestionOption(question=question, order=i, **option)
+                for i, option in enumerate(row['options'], start=1)
+            )
+            answers.extend(Answer(question=question, **answer) for answer in row['correct_answers'])
+        QuestionOption.objects.bulk_create(options)
+        Answer.objects.bulk_create(answers)
+
+    invalidate_paper(assessment.id, assessment.unit_id)
+    return questions
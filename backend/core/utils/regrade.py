@@ -0,0 +1,59 @@
+import threading
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from core.models import RegradeJob, Submission
+from core.utils.grading import regrade_assessment
+
+
+def start_regrade(assessment, requested_by=None):
+    """
+    Create a RegradeJob for an assessment and run it. Cohorts up to
+    REGRADE_INLINE_LIMIT submissions are regraded before returning; larger
+    ones run in a background thread once the current transaction commits.
+    Jobs left Pending (e.g. the worker was recycled) can be finished with
+    `manage.py regrade_assessments`.
+    """
+    total = Submission.objects.filter(assessment=assessment).count()
+    job = RegradeJob.objects.create(assessment=assessment, requested_by=requested_by, total_submissions=total)
+    if total <= getattr(settings, 'REGRADE_INLINE_LIMIT', 200):
+        return run_regrade_job(job)
+
+    transaction.on_commit(lambda: threading.Thread(target=_run_in_thread, args=(job.pk,), daemon=True).start())
+    return job
+
+
+def run_regrade_job(job):
+    """
+    Run a Pending job to completion, recording progress and the outcome on
+    the row. A job already claimed by another worker is returned untouched.
+    """
+    if not RegradeJob.objects.filter(pk=job.pk, status='Pending').update(status='Running'):
+        return job
+    job.status = 'Running'
+
+    def progress(processed):
+        job.processed_submissions = processed
+        RegradeJob.objects.filter(pk=job.pk).update(processed_submissions=processed)
+
+    try:
+        job.answers_changed = regrade_assessment(job.assessment_id, on_progress=progress)
+        job.status = 'Completed'
+    except Exception as e:
+        job.status = 'Failed'
+        job.error = str(e)
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'answers_changed', 'error', 'finished_at'])
+    return job
+
+
+def _run_in_thread(job_id):
+    try:
+        job = RegradeJob.objects.filter(pk=job_id).first()
+        if job is not None:
+            run_regrade_job(job)
+    finally:
+        # Background threads get their own DB connection; don't leak it
+        connection.close()
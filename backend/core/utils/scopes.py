@@ -0,0 +1,22 @@
+from django.core.cache import cache
+
+from core.models import StudentEnrollment
+from core.utils.cache_versions import get_version
+
+SCOPE_TIMEOUT = 60 * 60 * 6
+
+
+def student_course_group_ids(student_id):
+    """
+    Course groups a student is actively enrolled in (their visibility scope).
+    Cached per student and invalidated whenever one of their enrollments changes.
+    """
+    key = f'scope:course-groups:{student_id}:{get_version("enrollments", student_id)}'
+    ids = cache.get(key)
+    if ids is None:
+        ids = list(
+            StudentEnrollment.objects.filter(student_id=student_id, is_active=True)
+            .values_list('course_group_id', flat=True)
+        )
+        cache.set(key, ids, SCOPE_TIMEOUT)
+    return ids
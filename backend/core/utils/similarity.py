@@ -0,0 +1,244 @@
+import logging
+import multiprocessing
+import os
+import re
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+
+from core.models import Submission, StudentAnswer, SubmissionSignature, SignatureBand, SimilarityMatch
+from core.utils.minhash import band_buckets, estimated_similarity, minhash_signature
+
+try:
+    from pypdf import PdfReader
+except ImportError:
+    PdfReader = None
+
+logger = logging.getLogger(__name__)
+
+# Submissions are fingerprinted after they are saved: a thread loads the
+# text, a process pool computes the MinHash signature (CPU-bound), and the
+# thread stores it with its LSH buckets and records any candidate whose
+# estimated similarity passes SIMILARITY_THRESHOLD. A new submission is only
+# compared with submissions sharing a bucket, found through an index.
+
+TEXT_FILE_EXTENSIONS = {'.txt', '.md', '.csv', '.html', '.htm', '.rtf', '.py', '.java', '.c', '.cpp', '.js', '.sql'}
+XML_TAG = re.compile(r'<[^>]+>')
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _file_text(field_file):
+    """Text of an uploaded file when it can be extracted without heavy dependencies ('' otherwise)."""
+    name = field_file.name or ''
+    extension = os.path.splitext(name)[1].lower()
+    max_bytes = _setting('SIMILARITY_MAX_FILE_BYTES', 5 * 1024 * 1024)
+    try:
+        if field_file.size > max_bytes:
+            return ''
+        with field_file.open('rb') as handle:
+            if extension in TEXT_FILE_EXTENSIONS:
+                return handle.read().decode('utf-8', errors='ignore')
+            if extension == '.docx':
+                with zipfile.ZipFile(handle) as archive:
+                    xml = archive.read('word/document.xml').decode('utf-8', errors='ignore')
+                return XML_TAG.sub(' ', xml.replace('</w:p>', '\n'))
+            if extension == '.pdf' and PdfReader is not None:
+                return '\n'.join(page.extract_text() or '' for page in PdfReader(handle).pages)
+    except Exception:
+        # Missing or malformed files (pypdf and zipfile raise their own errors)
+        logger.warning('Could not extract text from %s', name, exc_info=True)
+    return ''
+
+
+def submission_text(submission):
+    """Everything written in a submission: its content, file text and long answers."""
+    min_chars = _setting('SIMILARITY_MIN_ANSWER_CHARS', 200)
+    parts = [submission.content or '']
+    if submission.file:
+        parts.append(_file_text(submission.file))
+    parts.extend(
+        text for text in StudentAnswer.objects.filter(submission=submission)
+        .order_by('question__order', 'question_id').values_list('answer_text', flat=True)
+        if len(text) >= min_chars
+    )
+    return '\n'.join(part for part in parts if part.strip())
+
+
+def store_signature(submission, signature, shingle_count):
+    """
+    Save a submission's signature and buckets and (re)record its matches:
+    only submissions sharing a bucket are loaded and compared. Signatures of
+    fewer than SIMILARITY_MIN_SHINGLES shingles are stored empty and never match.
+    Returns the number of matches recorded.
+    """
+    threshold = _setting('SIMILARITY_THRESHOLD', 0.5)
+    if shingle_count < _setting('SIMILARITY_MIN_SHINGLES', 5):
+        # Too little text to compare: any two "N/A" answers would match
+        signature = []
+    buckets = band_buckets(signature) if signature else []
+    with transaction.atomic():
+        record, _ = SubmissionSignature.objects.update_or_create(
+            submission=submission,
+            defaults={'assessment_id': submission.assessment_id, 'minhash': signature, 'shingle_count': shingle_count}
+        )
+        SignatureBand.objects.filter(signature=record).delete()
+        SignatureBand.objects.bulk_create(
+            SignatureBand(signature=record, assessment_id=submission.assessment_id, bucket=bucket) for bucket in buckets
+        )
+        SimilarityMatch.objects.filter(Q(submission_a=submission) | Q(submission_b=submission)).delete()
+        if not buckets:
+            return 0
+
+        candidate_ids = (
+            SignatureBand.objects.filter(assessment_id=submission.assessment_id, bucket__in=buckets)
+            .exclude(signature=record).values('signature_id')
+        )
+        matches = []
+        for other_id, other_signature in (SubmissionSignature.objects.filter(id__in=candidate_ids)
+                                          .values_list('submission_id', 'minhash')):
+            similarity = estimated_similarity(signature, other_signature)
+            if similarity >= threshold:
+                a, b = sorted((submission.id, other_id))
+                matches.append(SimilarityMatch(
+                    assessment_id=submission.assessment_id, submission_a_id=a, submission_b_id=b, similarity=similarity
+                ))
+        SimilarityMatch.objects.bulk_create(matches)
+    return len(matches)
+
+
+_process_pool = None
+_dispatcher = None
+_pool_lock = threading.Lock()
+
+
+def _pools():
+    """(process pool, dispatcher threads), created on first use in each web process."""
+    global _process_pool, _dispatcher
+    with _pool_lock:
+        if _process_pool is None:
+            workers = _setting('SIMILARITY_WORKERS', 2)
+            # Workers only ever run the numpy-only minhash_signature(). They come
+            # from a forkserver: forking this threaded web process could copy a
+            # lock some other thread holds and deadlock the child
+            context = multiprocessing.get_context('forkserver')
+            context.set_forkserver_preload(['core.utils.minhash'])
+            _process_pool = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+            _dispatcher = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='similarity')
+    return _process_pool, _dispatcher
+
+
+def fingerprint_submission(submission_id):
+    """Compute and store one submission's signature (inline when SIMILARITY_WORKERS is 0)."""
+    submission = Submission.objects.filter(pk=submission_id).first()
+    if submission is None:
+        return 0
+    text = submission_text(submission)
+    if _setting('SIMILARITY_WORKERS', 2):
+        signature, shingle_count = _pools()[0].submit(minhash_signature, text).result()
+    else:
+        signature, shingle_count = minhash_signature(text)
+    return store_signature(submission, signature, shingle_count)
+
+
+def _fingerprint_in_thread(submission_id):
+    try:
+        fingerprint_submission(submission_id)
+    except Exception:
+        logger.exception('Failed to fingerprint submission %s', submission_id)
+    finally:
+        # Dispatcher threads get their own DB connection; don't leak it
+        connection.close()
+
+
+def schedule_fingerprint(submission_id):
+    """Fingerprint a submission once the current transaction commits, off the request thread."""
+    if not _setting('SIMILARITY_WORKERS', 2):
+        transaction.on_commit(lambda: fingerprint_submission(submission_id))
+        return
+    transaction.on_commit(lambda: _pools()[1].submit(_fingerprint_in_thread, submission_id))
+
+
+def fingerprint_assessment(assessment_id, only_missing=False):
+    """
+    Fingerprint an assessment's submissions (e.g. to backfill), computing the
+    signatures across the process pool. Returns (submissions, matches).
+    """
+    submissions = Submission.objects.filter(assessment_id=assessment_id).order_by('id')
+    if only_missing:
+        submissions = submissions.filter(signature__isnull=True)
+    submissions = list(submissions)
+    texts = [submission_text(submission) for submission in submissions]
+    if _setting('SIMILARITY_WORKERS', 2) and len(texts) > 1:
+        signatures = _pools()[0].map(minhash_signature, texts, chunksize=16)
+    else:
+        signatures = map(minhash_signature, texts)
+    matches = 0
+    for submission, (signature, shingle_count) in zip(submissions, signatures):
+        matches += store_signature(submission, signature, shingle_count)
+    return len(submissions), matches
+
+
+def similarity_report(assessment_id, threshold=None):
+    """
+    Clusters of suspiciously similar submissions: connected components of
+    the recorded matches at or above `threshold`, most similar first.
+    """
+    threshold = max(threshold or 0, _setting('SIMILARITY_THRESHOLD', 0.5))
+    pairs = list(
+        SimilarityMatch.objects.filter(assessment_id=assessment_id, similarity__gte=threshold)
+        .values_list('submission_a_id', 'submission_b_id', 'similarity')
+    )
+
+    parent = {}
+
+    def find(node):
+        parent.setdefault(node, node)
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    for a, b, _ in pairs:
+        parent[find(a)] = find(b)
+
+    students = {
+        row['id']: row for row in Submission.objects.filter(id__in=list(parent))
+        .values('id', 'student_id', 'student__username', 'submitted_at')
+    }
+    clusters = {}
+    for a, b, similarity in pairs:
+        cluster = clusters.setdefault(find(a), {'members': set(), 'pairs': []})
+        cluster['members'].update((a, b))
+        cluster['pairs'].append({'submission_a': a, 'submission_b': b, 'similarity': round(similarity, 3)})
+
+    report = []
+    for cluster in clusters.values():
+        cluster['pairs'].sort(key=lambda pair: -pair['similarity'])
+        report.append({
+            'size': len(cluster['members']),
+            'max_similarity': cluster['pairs'][0]['similarity'],
+            'submissions': [
+                {
+                    'id': submission_id,
+                    'student': students[submission_id]['student_id'],
+                    'student_name': students[submission_id]['student__username'],
+                    'submitted_at': students[submission_id]['submitted_at'],
+                }
+                for submission_id in sorted(cluster['members'])
+            ],
+            'pairs': cluster['pairs'],
+        })
+    report.sort(key=lambda cluster: (-cluster['max_similarity'], -cluster['size']))
+    return {
+        'assessment': assessment_id,
+        'threshold': threshold,
+        'fingerprinted': SubmissionSignature.objects.filter(assessment_id=assessment_id).count(),
+        'clusters': report,
+    }
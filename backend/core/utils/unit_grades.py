@@ -0,0 +1,146 @@
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from core.models import Assessment, StudentEnrollment, Submission, Unit, UnitGrade
+from core.utils.gradebook import CAT_TYPES, counted_assessments, weighted_score
+
+# UnitGrade rows are recomputed, never adjusted in place: a refresh reads the
+# unit's counted assessments and the affected students' submissions (latest
+# per assessment, as in the gradebook) and upserts their rows in one batched
+# statement. Signals schedule a refresh of the (unit, student) they touch
+# once the transaction commits; bulk grading paths, which send no signals,
+# schedule theirs explicitly. `manage.py rebuild_unit_grades` recomputes
+# everything.
+
+UPDATE_FIELDS = [
+    'cat_earned', 'cat_possible', 'cat_score', 'assessment_earned', 'assessment_possible',
+    'assessment_score', 'total', 'graded_count', 'pending_count', 'updated_at',
+]
+
+
+def compute_unit_grades(unit, student_ids=None):
+    """
+    {student_id: UnitGrade field values} for the unit's class (and anyone who
+    submitted work), or only `student_ids`. Three queries.
+    """
+    categories = {}
+    possible = {'cat': 0, 'assessment': 0}
+    for assessment in counted_assessments(unit).values('id', 'assessment_type', 'points'):
+        category = 'cat' if assessment['assessment_type'] in CAT_TYPES else 'assessment'
+        categories[assessment['id']] = category
+        possible[category] += assessment['points']
+
+    enrollments = StudentEnrollment.objects.filter(course_group_id=unit.course_group_id, is_active=True)
+    submissions = Submission.objects.filter(assessment_id__in=list(categories))
+    if student_ids is not None:
+        enrollments = enrollments.filter(student_id__in=student_ids)
+        submissions = submissions.filter(student_id__in=student_ids)
+
+    latest = {}
+    for submission in (submissions.order_by('submitted_at', 'id')
+                       .values('student_id', 'assessment_id', 'grade', 'is_graded')):
+        latest[submission['student_id'], submission['assessment_id']] = submission
+
+    students = dict.fromkeys(enrollments.values_list('student_id', flat=True))
+    students.update(dict.fromkeys(student_id for student_id, _ in latest))
+    grades = {
+        student_id: {'earned': {'cat': Decimal('0'), 'assessment': Decimal('0')}, 'graded': 0, 'pending': 0}
+        for student_id in students
+    }
+    for (student_id, assessment_id), submission in latest.items():
+        grade = grades[student_id]
+        if submission['is_graded'] and submission['grade'] is not None:
+            grade['earned'][categories[assessment_id]] += submission['grade']
+            grade['graded'] += 1
+        else:
+            grade['pending'] += 1
+
+    rows = {}
+    for student_id, grade in grades.items():
+        cat_score = weighted_score(grade['earned']['cat'], possible['cat'], unit.cat_total_points)
+        assessment_score = weighted_score(grade['earned']['assessment'], possible['assessment'],
+                                          unit.assessment_total_points)
+        rows[student_id] = {
+            'cat_earned': grade['earned']['cat'],
+            'cat_possible': possible['cat'],
+            'cat_score': cat_score,
+            'assessment_earned': grade['earned']['assessment'],
+            'assessment_possible': possible['assessment'],
+            'assessment_score': assessment_score,
+            'total': (cat_score or 0) + (assessment_score or 0),
+            'graded_count': grade['graded'],
+            'pending_count': grade['pending'],
+        }
+    return rows
+
+
+def refresh_unit_grades(unit_id, student_ids=None):
+    """
+    Recompute the UnitGrade rows of a unit (only `student_ids` when given),
+    dropping rows of students who no longer belong to it. Returns the number
+    of rows written.
+    """
+    unit = (Unit.objects.filter(pk=unit_id)
+            .only('id', 'course_group_id', 'cat_total_points', 'assessment_total_points').first())
+    if unit is None:
+        return 0
+    if student_ids is not None:
+        student_ids = list(student_ids)
+    rows = compute_unit_grades(unit, student_ids)
+
+    now = timezone.now()
+    grades = [UnitGrade(student_id=student_id, unit_id=unit.id, updated_at=now, **values)
+              for student_id, values in rows.items()]
+    kwargs = {}
+    if connection.features.supports_update_conflicts_with_target:
+        kwargs['unique_fields'] = ['student', 'unit']
+    with transaction.atomic():
+        stale = UnitGrade.objects.filter(unit_id=unit.id).exclude(student_id__in=list(rows))
+        if student_ids is not None:
+            stale = stale.filter(student_id__in=student_ids)
+        stale.delete()
+        if grades:
+            UnitGrade.objects.bulk_create(
+                grades,
+                update_conflicts=True,
+                update_fields=UPDATE_FIELDS,
+                batch_size=500,
+                **kwargs
+            )
+    return len(grades)
+
+
+def refresh_assessment_grades(assessment_id, student_ids=None):
+    """Refresh the rows of an assessment's unit (only `student_ids` when given)."""
+    unit_id = Assessment.objects.filter(pk=assessment_id).values_list('unit_id', flat=True).first()
+    if unit_id is None:
+        return 0
+    return refresh_unit_grades(unit_id, student_ids)
+
+
+def refresh_submission_grades(submission_ids):
+    """Refresh the rows of the students and units some submissions belong to."""
+    affected = {}
+    for unit_id, student_id in (Submission.objects.filter(pk__in=list(submission_ids))
+                                .values_list('assessment__unit_id', 'student_id').distinct()):
+        affected.setdefault(unit_id, set()).add(student_id)
+    return sum(refresh_unit_grades(unit_id, student_ids) for unit_id, student_ids in affected.items())
+
+
+def refresh_course_group_grades(course_group_id, student_ids=None):
+    """Refresh the rows of every unit taught to a class."""
+    return sum(
+        refresh_unit_grades(unit_id, student_ids)
+        for unit_id in Unit.objects.filter(course_group_id=course_group_id).values_list('id', flat=True)
+    )
+
+
+def schedule_refresh(refresh, *args):
+    """
+    Run one of the refresh_* functions once the current transaction commits:
+    grading requests don't wait on it inside their transaction, and after a
+    cascading delete the rows being removed are really gone.
+    """
+    transaction.on_commit(lambda: refresh(*args))
@@ -0,0 +1,68 @@
+import hashlib
+import hmac
+import random
+
+from django.conf import settings
+
+# Each student's variant of an assessment (question order, option order and,
+# with questions_per_student, which questions they get) is derived from an
+# HMAC of the assessment and student ids. Nothing is stored per student: the
+# shared paper is reshuffled on delivery and grading re-derives the same
+# question set. Editing the question list mid-exam changes the variants.
+
+
+def _rng(assessment_id, student_id, salt=''):
+    message = f'{assessment_id}:{student_id}:{salt}'.encode()
+    digest = hmac.new(settings.SECRET_KEY.encode(), message, hashlib.sha256).digest()
+    return random.Random(int.from_bytes(digest[:8], 'big'))
+
+
+def _field(assessment, name):
+    return assessment[name] if isinstance(assessment, dict) else getattr(assessment, name)
+
+
+def student_question_ids(assessment_id, student_id, question_ids, shuffle=False, limit=None):
+    """
+    A student's questions, in delivery order, from the paper's question ids
+    (in paper order). `limit` draws that many from the pool.
+    """
+    ids = list(question_ids)
+    rng = _rng(assessment_id, student_id)
+    if limit and limit < len(ids):
+        picked = set(rng.sample(ids, limit))
+        ids = [question_id for question_id in ids if question_id in picked]
+    if shuffle:
+        rng.shuffle(ids)
+    return ids
+
+
+def allowed_question_ids(assessment, student_id, question_ids):
+    """Set of question ids a student may answer, or None when everyone gets the whole paper."""
+    limit = _field(assessment, 'questions_per_student')
+    if not limit:
+        return None
+    return set(student_question_ids(_field(assessment, 'id'), student_id, question_ids, limit=limit))
+
+
+def student_paper(assessment, student_id, questions):
+    """
+    A student's variant of serialized paper questions. `assessment` may be an
+    Assessment or its serialized dict; questions are not copied unless changed.
+    """
+    shuffle_questions = _field(assessment, 'shuffle_questions')
+    shuffle_options = _field(assessment, 'shuffle_options')
+    limit = _field(assessment, 'questions_per_student')
+    if not (shuffle_questions or shuffle_options or limit):
+        return questions
+
+    assessment_id = _field(assessment, 'id')
+    by_id = {question['id']: question for question in questions}
+    variant = []
+    for question_id in student_question_ids(assessment_id, student_id, list(by_id), shuffle_questions, limit):
+        question = by_id[question_id]
+        if shuffle_options and question.get('options'):
+            options = list(question['options'])
+            _rng(assessment_id, student_id, question_id).shuffle(options)
+            question = {**question, 'options': options}
+        variant.append(question)
+    return variant
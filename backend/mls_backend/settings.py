@@ -53,11 +53,12 @@ MIDDLEWARE = [
     'core.middleware.LicenseMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
+    # Session/CSRF/auth/messages are skipped for /api/ (JWT only), kept for /admin/
+    'core.middleware.APIExemptSessionMiddleware',
     'django.middleware.common.CommonMiddleware',
-    'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
-    'django.contrib.messages.middleware.MessageMiddleware',
+    'core.middleware.APIExemptCsrfViewMiddleware',
+    'core.middleware.APIExemptAuthenticationMiddleware',
+    'core.middleware.APIExemptMessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
@@ -109,6 +110,32 @@ if database_url:
         print(f"Warning: DATABASE_URL parsing failed: {e}. Falling back to sqlite.")
 
 
+# Cache
+# Shared by every worker process and the warm_assessment_caches loop, so it
+# must not be per-process memory. Database-backed by default (works on shared
+# hosting; run `python manage.py createcachetable`); set REDIS_URL to use Redis.
+# Django's default of 300 entries would be culled long before a term's classes
+# are warmed (one unit detail per student, plus papers, gradebooks and
+# matrices), so size it for them; CULL_FREQUENCY=4 drops a quarter when full.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'mls_cache',
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.environ.get('CACHE_MAX_ENTRIES', 50000)),
+            'CULL_FREQUENCY': 4,
+        },
+    }
+}
+
+redis_url = os.environ.get('REDIS_URL')
+if redis_url:
+    CACHES['default'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': redis_url,
+    }
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -172,8 +199,73 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    'DEFAULT_FILTER_BACKENDS': (
+        'api.filters.IdsFilterBackend',
+    ),
+    'DEFAULT_RENDERER_CLASSES': [
+        'rest_framework.renderers.JSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'rest_framework.parsers.JSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
 }
 
+# MessagePack as an opt-in wire format (Accept / Content-Type: application/msgpack).
+# JSON stays first, so it remains the default.
+try:
+    import msgpack
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'].append('api.renderers.MessagePackRenderer')
+    REST_FRAMEWORK['DEFAULT_PARSER_CLASSES'].append('api.parsers.MessagePackParser')
+except ImportError:
+    pass
+
+# Upper bound for ?ids=1,2,3 multi-id fetches on list endpoints
+IDS_FILTER_MAX = 100
+
+# Public scheme + host of the API; used by background jobs that build cached
+# responses outside a request (warm_assessment_caches)
+PUBLIC_API_BASE_URL = os.environ.get('PUBLIC_API_BASE_URL', 'http://localhost:8000')
+
+# Most questions accepted by one /api/questions/import/ call
+QUESTION_IMPORT_MAX = 500
+
+# Autosaved exam answers are buffered per process and written in one batch
+# every this many seconds; 0 writes each autosave straight through
+DRAFT_FLUSH_INTERVAL = int(os.environ.get('DRAFT_FLUSH_INTERVAL', 5))
+# Also copy each autosave to the shared cache, so a submission handled by a
+# different worker process includes drafts that worker hasn't flushed yet.
+# That is one cheap round trip per autosave on Redis, but several queries
+# per answered question on the database cache (more than writing the drafts
+# directly), so it is only on with Redis. Without it, a submission can miss
+# up to DRAFT_FLUSH_INTERVAL seconds of another worker's autosaves for
+# questions the client doesn't post again.
+DRAFT_SHARED_CACHE = os.environ.get('DRAFT_SHARED_CACHE', 'True' if redis_url else 'False') == 'True'
+
+# Automatic attendance from lesson/assessment views is deduplicated per
+# process and first views are inserted in one batch every this many
+# seconds; 0 writes each first view straight through
+ATTENDANCE_FLUSH_INTERVAL = int(os.environ.get('ATTENDANCE_FLUSH_INTERVAL', 5))
+
+# Submission similarity checks: pairs at or above SIMILARITY_THRESHOLD
+# (estimated Jaccard similarity of 5-word shingles) are reported. Signatures
+# are computed by SIMILARITY_WORKERS processes; 0 computes them inline.
+SIMILARITY_THRESHOLD = float(os.environ.get('SIMILARITY_THRESHOLD', 0.5))
+SIMILARITY_WORKERS = int(os.environ.get('SIMILARITY_WORKERS', 2))
+SIMILARITY_MIN_ANSWER_CHARS = 200
+# Texts with fewer shingles than this are too short to compare
+SIMILARITY_MIN_SHINGLES = 5
+
+# Assessments with more submissions than this are regraded in a background
+# thread instead of during the request
+REGRADE_INLINE_LIMIT = int(os.environ.get('REGRADE_INLINE_LIMIT', 200))
+
+# /api/batch/ limits: max sub-requests per call and how many run concurrently
+BATCH_MAX_REQUESTS = int(os.environ.get('BATCH_MAX_REQUESTS', 20))
+BATCH_MAX_WORKERS = int(os.environ.get('BATCH_MAX_WORKERS', 4))
+
 # Render/Heroku SSL Proxy handling
 SECURE_PROXY_SSL_HEADER = ('HTTP_X_FORWARDED_PROTO', 'https')
 
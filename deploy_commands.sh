@@ -7,6 +7,7 @@ pip install -r requirements.txt
 
 echo "=== Step 2: Running migrations ==="
 python manage.py migrate
+python manage.py createcachetable
 
 echo "=== Step 3: Collecting static files ==="
 python manage.py collectstatic --noinput
@@ -434,7 +434,9 @@ const AssessmentAuthoring: React.FC = () => {
                                         placeholder="Enter model answer for grading reference..."
                                     />
                                     <p style={{ fontSize: '0.75rem', color: 'var(--text-muted)', marginTop: '0.5rem' }}>
-                                        This will require manual grading by the trainer.
+                                        {questions[activeQuestion].question_type === 'ESSAY'
+                                            ? 'This will require manual grading by the trainer.'
+                                            : 'Auto-graded: put each accepted answer on its own line. Case, spacing and punctuation are ignored. Use "9.81 ± 0.05" for a numeric range or "re:colou?r" for a pattern. Leave empty to grade manually.'}
                                     </p>
                                 </div>
                             )}
@@ -47,6 +47,14 @@ const AssessmentSubmission: React.FC = () => {
                 setAssessment(response.data);
                 if (response.data.questions && response.data.questions.length > 0) {
                     setMode('interactive');
+                    // Restore answers autosaved before a reload or lost connection
+                    api.get('student-answers/drafts/', { params: { assessment: response.data.id } }).then(res => {
+                        const restored: Record<number, any> = {};
+                        res.data.forEach((draft: { question_id: number; selected_option_id: number | null; answer_text: string }) => {
+                            restored[draft.question_id] = draft.selected_option_id ?? draft.answer_text;
+                        });
+                        setAnswers(prev => ({ ...restored, ...prev }));
+                    }).catch(err => console.error('Failed to load autosaved answers', err));
                 }
                 // Auto-mark attendance
                 api.post('attendance/mark_auto/', { assessment_id: response.data.id }).catch(err => {
@@ -59,6 +67,28 @@ const AssessmentSubmission: React.FC = () => {
         fetchAssessment();
     }, [assessmentId]);
 
+    const formatAnswers = (current: Record<number, any>) => Object.keys(current).map(qId => {
+        const question = assessment?.questions?.find(q => q.id === parseInt(qId));
+        return {
+            question_id: parseInt(qId),
+            selected_option_id: question?.question_type === 'MCQ' ? current[parseInt(qId)] : null,
+            answer_text: question?.question_type !== 'MCQ' ? current[parseInt(qId)].toString() : ''
+        };
+    });
+
+    // Autosave in-progress answers so a dropped connection doesn't lose work;
+    // the server keeps only the latest answer per question
+    useEffect(() => {
+        if (mode !== 'interactive' || success || !assessment || Object.keys(answers).length === 0) return;
+        const timer = setTimeout(() => {
+            api.post('student-answers/autosave/', {
+                assessment_id: assessment.id,
+                answers: formatAnswers(answers)
+            }).catch(err => console.error('Autosave failed', err));
+        }, 1500);
+        return () => clearTimeout(timer);
+    }, [answers, mode, success, assessment]);
+
     const handleFileChange = (e: React.ChangeEvent<HTMLInputElement>) => {
         if (e.target.files) {
             setFile(e.target.files[0]);
@@ -90,18 +120,9 @@ const AssessmentSubmission: React.FC = () => {
                 });
 
                 const submissionId = submissionRes.data.id;
-                const formattedAnswers = Object.keys(answers).map(qId => {
-                    const question = assessment?.questions?.find(q => q.id === parseInt(qId));
-                    return {
-                        question_id: parseInt(qId),
-                        selected_option_id: question?.question_type === 'MCQ' ? answers[parseInt(qId)] : null,
-                        answer_text: question?.question_type !== 'MCQ' ? answers[parseInt(qId)].toString() : ''
-                    };
-                });
-
                 await api.post('student-answers/submit_answers/', {
                     submission_id: submissionId,
-                    answers: formattedAnswers
+                    answers: formatAnswers(answers)
                 });
             }
             setSuccess(true);
@@ -1,7 +1,7 @@
 import React, { useState, useEffect } from 'react';
 import { useNavigate, useSearchParams } from 'react-router-dom';
 import DashboardLayout from '../components/DashboardLayout';
-import api from '../services/api';
+import api, { batchGet } from '../services/api';
 import {
     BookOpen, CheckCircle2, Clock, Lock, AlertCircle,
     FileText, MessageSquare, Bell, HelpCircle,
@@ -190,10 +190,10 @@ const StudentDashboard: React.FC = () => {
         if (!user || !user.is_activated) return;
         setLoading(true);
         try {
-            const [unitsRes, annRes, notifRes] = await Promise.all([
-                api.get('units/'),
-                api.get('announcements/'),
-                api.get('notifications/')
+            const [unitsRes, annRes, notifRes] = await batchGet([
+                'units/',
+                'announcements/',
+                'notifications/'
             ]);
             setUnits(unitsRes.data);
             setAnnouncements(annRes.data);
@@ -41,4 +41,22 @@ api.interceptors.response.use(
   }
 );
 
+export interface BatchResponse<T = any> {
+  path: string;
+  status: number;
+  data: T;
+}
+
+// Fetch several GET endpoints in one round trip through /api/batch/.
+// Rejects like Promise.all if any sub-request failed.
+export const batchGet = async (paths: string[]): Promise<BatchResponse[]> => {
+  const response = await api.post('batch/', { requests: paths });
+  const results: BatchResponse[] = response.data.responses;
+  const failed = results.find((r) => r.status >= 400);
+  if (failed) {
+    return Promise.reject(new Error(`Batch request ${failed.path} failed with status ${failed.status}`));
+  }
+  return results;
+};
+
 export default api;